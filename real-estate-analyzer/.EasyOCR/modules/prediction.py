@@ -29,31 +29,48 @@ class Attention(nn.Module):
         """
         batch_size = batch_H.size(0)
         num_steps = batch_max_length + 1  # +1 for [s] at end of sentence.
+        if not is_train:
+            return self._decode(batch_H, num_steps)
 
         output_hiddens = torch.FloatTensor(batch_size, num_steps, self.hidden_size).fill_(0).to(device)
         hidden = (torch.FloatTensor(batch_size, self.hidden_size).fill_(0).to(device),
                   torch.FloatTensor(batch_size, self.hidden_size).fill_(0).to(device))
 
-        if is_train:
-            for i in range(num_steps):
-                # one-hot vectors for a i-th char. in a batch
-                char_onehots = self._char_to_onehot(text[:, i], onehot_dim=self.num_classes)
-                # hidden : decoder's hidden s_{t-1}, batch_H : encoder's hidden H, char_onehots : one-hot(y_{t-1})
-                hidden, alpha = self.attention_cell(hidden, batch_H, char_onehots)
-                output_hiddens[:, i, :] = hidden[0]  # LSTM hidden index (0: hidden, 1: Cell)
-            probs = self.generator(output_hiddens)
-
-        else:
-            targets = torch.LongTensor(batch_size).fill_(0).to(device)  # [GO] token
-            probs = torch.FloatTensor(batch_size, num_steps, self.num_classes).fill_(0).to(device)
-
-            for i in range(num_steps):
-                char_onehots = self._char_to_onehot(targets, onehot_dim=self.num_classes)
-                hidden, alpha = self.attention_cell(hidden, batch_H, char_onehots)
-                probs_step = self.generator(hidden[0])
-                probs[:, i, :] = probs_step
-                _, next_input = probs_step.max(1)
-                targets = next_input
+        for i in range(num_steps):
+            # one-hot vectors for a i-th char. in a batch
+            char_onehots = self._char_to_onehot(text[:, i], onehot_dim=self.num_classes)
+            # hidden : decoder's hidden s_{t-1}, batch_H : encoder's hidden H, char_onehots : one-hot(y_{t-1})
+            hidden, alpha = self.attention_cell(hidden, batch_H, char_onehots)
+            output_hiddens[:, i, :] = hidden[0]  # LSTM hidden index (0: hidden, 1: Cell)
+        probs = self.generator(output_hiddens)
+
+        return probs  # batch_size x num_steps x num_classes
+
+    @torch.inference_mode()
+    def _decode(self, batch_H, num_steps):
+        """
+        greedy decoding for inference.
+        the decode buffers are allocated once per call instead of on every step, the previous character's
+        one-hot vector is written in place into one batch_size x num_classes buffer (zero_ + scatter_),
+        and i2h(batch_H), which does not change across steps, is computed once.
+        """
+        batch_size, _, num_channel = batch_H.size()
+        batch_H_proj = self.attention_cell.i2h(batch_H)
+
+        probs = batch_H.new_empty(batch_size, num_steps, self.num_classes)
+        hidden = (batch_H.new_zeros(batch_size, self.hidden_size), batch_H.new_zeros(batch_size, self.hidden_size))
+        targets = torch.zeros(batch_size, dtype=torch.long, device=batch_H.device)  # [GO] token
+        char_onehots = batch_H.new_empty(batch_size, self.num_classes)
+        context = batch_H.new_empty(batch_size, 1, num_channel)
+        concat_context = batch_H.new_empty(batch_size, num_channel + self.num_classes)
+
+        for i in range(num_steps):
+            char_onehots.zero_().scatter_(1, targets.unsqueeze(1), 1)
+            hidden, alpha = self.attention_cell.decode_step(hidden, batch_H, batch_H_proj, char_onehots,
+                                                            context, concat_context)
+            probs_step = self.generator(hidden[0])
+            probs[:, i, :] = probs_step
+            torch.argmax(probs_step, 1, out=targets)
 
         return probs  # batch_size x num_steps x num_classes
 
@@ -79,6 +96,17 @@ class AttentionCell(nn.Module):
         concat_context = torch.cat([context, char_onehots], 1)  # batch_size x (num_channel + num_embedding)
         cur_hidden = self.rnn(concat_context, prev_hidden)
         return cur_hidden, alpha
+
+    def decode_step(self, prev_hidden, batch_H, batch_H_proj, char_onehots, context, concat_context):
+        """forward() for inference: batch_H_proj = i2h(batch_H) is precomputed, context/concat_context are reused buffers"""
+        prev_hidden_proj = self.h2h(prev_hidden[0]).unsqueeze(1)
+        e = self.score(torch.tanh(batch_H_proj + prev_hidden_proj))  # batch_size x num_encoder_step * 1
+
+        alpha = F.softmax(e, dim=1)
+        torch.bmm(alpha.permute(0, 2, 1), batch_H, out=context)  # batch_size x 1 x num_channel
+        torch.cat([context.squeeze(1), char_onehots], 1, out=concat_context)
+        cur_hidden = self.rnn(concat_context, prev_hidden)
+        return cur_hidden, alpha
     
 class CTC_Prediction(nn.Module):
     def __init__(self, input_size, num_classes):
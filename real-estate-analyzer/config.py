@@ -1,12 +1,15 @@
 import os
 import cv2
-import easyocr
 import google.generativeai as genai
 import firebase_admin # type: ignore
 from firebase_admin import credentials, firestore # type: ignore
 from flask import Flask # type: ignore
 from dotenv import load_dotenv
 import warnings
+from utils.ocr_cache import OCRCache
+from utils.ocr_models import create_reader
+from utils.form_templates import TemplateRegistry
+from utils.recognition_broker import RecognitionBroker
 
 warnings.filterwarnings("ignore", message="Could not initialize NNPACK")
 
@@ -15,6 +18,74 @@ load_dotenv()
 confm_key = os.getenv("CONFIRM_KEY")
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 
+# OCR 실행 방식: 'sequential'(기본, 문서를 하나씩 처리) / 'concurrent'(두 문서와 페이지를 동시에 처리)
+#              / 'batched'(모든 페이지의 줄을 먼저 검출한 뒤 줄 이미지를 폭별로 묶어 한 번에 인식)
+OCR_EXECUTION_MODE = os.getenv('OCR_EXECUTION_MODE', 'sequential')
+# 동시 실행 시 사용할 최대 스레드 수
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', min(4, os.cpu_count() or 1)))
+# 'batched' 실행 시 인식 모델 한 번 호출에 넣을 최대 줄 수
+OCR_RECOG_BATCH_SIZE = int(os.getenv('OCR_RECOG_BATCH_SIZE', 16))
+# true 이면 'batched' 실행의 인식 단계를 요청 간 마이크로 배칭 브로커가 맡아, 동시에 들어온 요청의 줄을 합쳐 인식
+OCR_RECOG_BROKER = os.getenv('OCR_RECOG_BROKER', 'false').lower() == 'true'
+# 브로커가 첫 요청 이후 다른 요청을 기다리는 시간(ms)과 한 번에 합칠 최대 줄 수
+OCR_BROKER_WINDOW_MS = float(os.getenv('OCR_BROKER_WINDOW_MS', 10))
+OCR_BROKER_MAX_LINES = int(os.getenv('OCR_BROKER_MAX_LINES', 256))
+# 인식 모델 양자화: 'none'(fp32) / 'dynamic'(LSTM·Linear 동적 int8, 기본) / 'static'(dynamic + 합성곱 스택 정적 int8)
+OCR_QUANTIZATION = os.getenv('OCR_QUANTIZATION', 'dynamic')
+# 정적 양자화 보정에 사용할 줄 이미지 폴더
+OCR_QUANT_CALIBRATION_DIR = os.getenv('OCR_QUANT_CALIBRATION_DIR')
+# 인식 모델 실행 백엔드: 'torch'(기본) / 'torchscript' / 'onnx' (scripts/export_recognizer.py 로 먼저 내보내야 함)
+OCR_RECOG_BACKEND = os.getenv('OCR_RECOG_BACKEND', 'torch')
+# onnx 인식 백엔드의 ONNX Runtime 세션 스레드 수 (비우면 라이브러리 기본값)
+# 세션 옵션에만 적용되며, torch / torchscript 는 프로세스 전체 torch 스레드 수(gunicorn 의 OCR_WORKER_TORCH_THREADS)를 씁니다.
+OCR_RECOG_THREADS = int(os.getenv('OCR_RECOG_THREADS', 0)) or None
+# 빌드 시 만든 모델 가중치 스냅샷(scripts/build_model_snapshot.py)을 메모리 매핑으로 불러올지 여부 (없거나 오래됐으면 기존 방식)
+OCR_MODEL_SNAPSHOT = os.getenv('OCR_MODEL_SNAPSHOT', 'true').lower() == 'true'
+# true 이면 업로드 파일과 페이지 이미지를 디스크에 쓰지 않고 메모리(numpy 배열)로만 처리
+OCR_IN_MEMORY = os.getenv('OCR_IN_MEMORY', 'false').lower() == 'true'
+# true 이면 PDF 를 한 페이지씩 렌더링하며 래스터화 → 전처리 → 인식을 겹쳐서 실행 (페이지 수와 무관한 메모리 사용)
+OCR_STREAMING = os.getenv('OCR_STREAMING', 'false').lower() == 'true'
+# 스트리밍 파이프라인 단계 사이 큐의 최대 페이지 수
+OCR_STREAM_QUEUE_SIZE = int(os.getenv('OCR_STREAM_QUEUE_SIZE', 2))
+# 전처리(노이즈 제거) 프로필: 'fast'(중앙값 필터) / 'balanced'(노이즈 큰 타일만 NLM) / 'quality'(전체 NLM, 기본)
+OCR_PREPROCESS_PROFILE = os.getenv('OCR_PREPROCESS_PROFILE', 'quality')
+# PDF 렌더링 방식: 'color'(기본, 200 DPI 컬러) / 'gray'(흑백, 페이지 크기와 목표 글자 높이로 DPI 결정)
+OCR_RENDER_MODE = os.getenv('OCR_RENDER_MODE', 'color')
+# 'gray' 모드에서 본문 글자 크기(pt)가 렌더링 후 몇 픽셀 높이가 되게 할지 (기본 10pt → 28px, 약 200 DPI)
+OCR_RENDER_TEXT_PT = float(os.getenv('OCR_RENDER_TEXT_PT', 10))
+OCR_RENDER_TEXT_PX = int(os.getenv('OCR_RENDER_TEXT_PX', 28))
+# 여러 페이지 PDF 를 렌더링할 때 동시에 실행할 pdftoppm 프로세스 수
+OCR_RENDER_THREADS = int(os.getenv('OCR_RENDER_THREADS', 1))
+# true 이면 가벼운 전처리로 먼저 인식하고, 신뢰도가 낮은 박스/페이지만 전체 전처리로 다시 인식 (캐스케이드)
+OCR_CASCADE = os.getenv('OCR_CASCADE', 'false').lower() == 'true'
+# 캐스케이드 재인식 기준 신뢰도와, 페이지 전체를 다시 처리할 낮은 신뢰도 박스 비율
+OCR_CASCADE_MIN_CONFIDENCE = float(os.getenv('OCR_CASCADE_MIN_CONFIDENCE', 0.5))
+OCR_CASCADE_PAGE_RATIO = float(os.getenv('OCR_CASCADE_PAGE_RATIO', 0.3))
+# 줄 검출 방식: 'craft'(기본, EasyOCR CRAFT 검출) / 'projection'(투영 프로필 분할 후 바로 인식, 품질이 나쁘면 CRAFT 로 대체)
+OCR_SEGMENTATION = os.getenv('OCR_SEGMENTATION', 'craft')
+# true 이면 계약서 페이지가 등록된 양식(form_templates/, scripts/register_form_template.py 로 등록)과 맞을 때
+# 페이지 전체 검출 없이 필드 박스('라벨: 값')와 특약사항 등 자유 기재 영역만 인식 (등록된 템플릿이 없으면 아무 일도 하지 않음)
+OCR_FORM_TEMPLATES = os.getenv('OCR_FORM_TEMPLATES', 'false').lower() == 'true'
+OCR_FORM_TEMPLATE_DIR = os.getenv('OCR_FORM_TEMPLATE_DIR', 'form_templates')
+# 양식 매칭 최소 점수 (선 배치 정규화 상관계수, 템플릿에 min_score 가 있으면 그 값을 사용)
+OCR_FORM_MIN_SCORE = float(os.getenv('OCR_FORM_MIN_SCORE', 0.7))
+# true 이면 PDF 페이지에 텍스트 레이어가 있을 때 pdftotext 로 바로 추출하고, 없는 페이지만 OCR
+OCR_TEXT_LAYER = os.getenv('OCR_TEXT_LAYER', 'true').lower() == 'true'
+# OCR 결과 캐시 (업로드 파일 해시 기반, 메모리 LRU + 디스크 저장)
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', 'ocr_cache')
+OCR_CACHE_MAX_ENTRIES = int(os.getenv('OCR_CACHE_MAX_ENTRIES', 64))
+# 디스크 캐시 최대 용량(MB), 넘으면 오래된 결과부터 지움 (0 이면 제한 없음)
+OCR_CACHE_DISK_MAX_MB = float(os.getenv('OCR_CACHE_DISK_MAX_MB', 512))
+# 전처리 로직이나 모델을 바꾸면 이 값을 올려 기존 캐시를 무효화합니다.
+OCR_CACHE_VERSION = os.getenv('OCR_CACHE_VERSION', 'v1')
+# 비동기 OCR 작업(/ocr/jobs) 워커 수, 대기열 최대 길이, 완료 결과 보관 시간(초)
+OCR_JOB_WORKERS = int(os.getenv('OCR_JOB_WORKERS', 1))
+OCR_JOB_QUEUE_SIZE = int(os.getenv('OCR_JOB_QUEUE_SIZE', 8))
+OCR_JOB_RESULT_TTL = int(os.getenv('OCR_JOB_RESULT_TTL', 3600))
+# 작업 상태/결과 파일 디렉터리 (gunicorn 워커끼리 공유해 어느 워커로 조회해도 같은 결과, 비우면 프로세스 메모리에만 보관)
+OCR_JOB_STATE_DIR = os.getenv('OCR_JOB_STATE_DIR', os.path.join(OCR_CACHE_DIR, 'jobs'))
+
 # --- 2. Flask 앱 초기화 ---
 app = Flask(__name__)
 app.secret_key = 'safesign_robust'
@@ -26,19 +97,38 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 # EasyOCR 리더 초기화
 print("EasyOCR 리더를 초기화합니다...")
 try:
-    reader = easyocr.Reader(
-        ['ko'],
-        model_storage_directory='.EasyOCR/model',
-        user_network_directory='.EasyOCR/user_network',
-        recog_network='finetuned',
-        download_enabled=False,
-        gpu=False
-    )
-    print("✅ EasyOCR 리더 초기화 완료 (커스텀 모델: finetuned).")
+    reader = create_reader(quantization=OCR_QUANTIZATION, calibration_dir=OCR_QUANT_CALIBRATION_DIR,
+                           backend=OCR_RECOG_BACKEND, threads=OCR_RECOG_THREADS,
+                           snapshot_dir=os.path.join('.EasyOCR/model', 'snapshot') if OCR_MODEL_SNAPSHOT else None)
+    print(f"✅ EasyOCR 리더 초기화 완료 (커스텀 모델: finetuned, 양자화: {OCR_QUANTIZATION}, 백엔드: {OCR_RECOG_BACKEND}).")
 except Exception as e:
     print(f"🚨 EasyOCR 초기화 실패: {e}")
     reader = None
 
+# 인식 모델 마이크로 배칭 브로커 (리더의 인식 모델을 전담)
+recognition_broker = None
+if OCR_RECOG_BROKER and reader is not None:
+    recognition_broker = RecognitionBroker(reader, OCR_BROKER_WINDOW_MS, OCR_BROKER_MAX_LINES, OCR_RECOG_BATCH_SIZE)
+    print(f"✅ 인식 브로커 활성화 (대기 {OCR_BROKER_WINDOW_MS:g}ms, 최대 {OCR_BROKER_MAX_LINES}줄)")
+
+# OCR 결과 캐시 초기화 (모델 파일이 바뀌면 키가 달라지도록 파일 크기/수정 시각을 버전에 포함)
+ocr_cache = None
+if OCR_CACHE_ENABLED:
+    recog_model_path = os.path.join('.EasyOCR/model', 'finetuned.pth')
+    model_stamp = ''
+    if os.path.exists(recog_model_path):
+        model_stamp = f"{os.path.getsize(recog_model_path)}-{int(os.path.getmtime(recog_model_path))}"
+    ocr_cache = OCRCache(OCR_CACHE_DIR, OCR_CACHE_MAX_ENTRIES, version=f"{OCR_CACHE_VERSION}|finetuned|{model_stamp}|{OCR_QUANTIZATION}|{OCR_RECOG_BACKEND}",
+                         disk_max_bytes=int(OCR_CACHE_DISK_MAX_MB * 1024 * 1024) or None)
+    print(f"✅ OCR 결과 캐시 활성화 (경로: {OCR_CACHE_DIR}, 메모리 최대 {OCR_CACHE_MAX_ENTRIES}건, "
+          f"디스크 최대 {f'{OCR_CACHE_DISK_MAX_MB:g}MB' if OCR_CACHE_DISK_MAX_MB else '제한 없음'})")
+
+# 양식 템플릿 불러오기 (보정된 템플릿이 없으면 None)
+form_templates = None
+if OCR_FORM_TEMPLATES:
+    form_templates = TemplateRegistry(OCR_FORM_TEMPLATE_DIR, OCR_FORM_MIN_SCORE) or None
+    print(f"✅ 양식 템플릿 {len(form_templates.templates) if form_templates else 0}개 로드 (경로: {OCR_FORM_TEMPLATE_DIR})")
+
 # Gemini 모델 초기화
 model = None
 if not GOOGLE_API_KEY:
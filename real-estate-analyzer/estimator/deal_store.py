@@ -0,0 +1,177 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+class DealStore:
+    """
+    국토교통부 RTMS 실거래 응답을 (건물 유형, 거래 유형, LAWD_CD, DEAL_YMD) 단위로 보관하는 SQLite 저장소
+    - months: 저장한 달과 조회 시각
+    - deals : 그 달 해당 구(LAWD_CD)의 모든 거래 (동/지번으로 바로 찾을 수 있도록 색인)
+    - queries: 시세 추정 요청 기록 (자주 조회되는 구를 미리 받아 두는 데 사용, scripts/ingest_rtms.py --schedule)
+    지난 달(조회 시점에 이미 두 달 전이 된 달)의 거래는 더 바뀌지 않는 것으로 보고 계속 쓰며,
+    이번 달과 전달은 신고가 계속 들어오므로 ttl 초가 지나면 다시 조회하도록 없는 것으로 취급합니다.
+    여러 달은 get_many / put_many 로 연결 하나, 질의 몇 번에 읽고 씁니다.
+    조회 기록은 메모리에 모았다가 query_flush_size 건이 쌓이거나 query_flush_seconds 가 지나면(또는 종료 시) 한 번에 씁니다.
+    """
+
+    def __init__(self, path, ttl=6 * 3600, query_flush_size=50, query_flush_seconds=60):
+        self.path = path
+        self.ttl = ttl
+        self.query_flush_size = query_flush_size
+        self.query_flush_seconds = query_flush_seconds
+        self._pending_queries = []
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'stores': 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS months (
+                    building_type TEXT, log_type TEXT, lawd_cd TEXT, deal_ymd TEXT,
+                    fetched_at REAL, row_count INTEGER,
+                    PRIMARY KEY (building_type, log_type, lawd_cd, deal_ymd)
+                );
+                CREATE TABLE IF NOT EXISTS deals (
+                    building_type TEXT, log_type TEXT, lawd_cd TEXT, deal_ymd TEXT,
+                    dong TEXT, jibun TEXT, amount INTEGER, monthly_rent INTEGER, area REAL, deal_date TEXT
+                );
+                CREATE INDEX IF NOT EXISTS deals_by_lot
+                    ON deals (building_type, log_type, lawd_cd, deal_ymd, dong, jibun);
+                CREATE TABLE IF NOT EXISTS queries (
+                    building_type TEXT, log_type TEXT, lawd_cd TEXT, queried_at REAL
+                );
+            """)
+        atexit.register(self.flush_queries)
+
+    @contextmanager
+    def _connect(self):
+        """호출마다 연결을 열고 닫습니다. (스레드끼리 연결을 공유하지 않고, WAL 모드라 읽기와 쓰기가 서로 막지 않음)"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def is_fresh(self, deal_ymd, fetched_at, now=None):
+        """그 달이 끝나고 한 달이 더 지난 뒤 조회했으면 확정, 아니면 ttl 안에서만 유효합니다."""
+        now = now or time.time()
+        year, month = int(deal_ymd[:4]), int(deal_ymd[4:])
+        year, month = (year + 1, month - 10) if month > 10 else (year, month + 2)
+        closed_at = datetime(year, month, 1).timestamp()
+        return fetched_at >= closed_at or now - fetched_at < self.ttl
+
+    def _fresh_months(self, conn, building_type, log_type, lawd_cd, months):
+        """months 중 저장돼 있고 다시 조회할 필요가 없는 달과, 저장돼 있지만 다시 조회할 때가 된 달의 수"""
+        rows = conn.execute(
+            f"SELECT deal_ymd, fetched_at FROM months WHERE building_type=? AND log_type=? AND lawd_cd=? "
+            f"AND deal_ymd IN ({', '.join('?' * len(months))})",
+            (building_type, log_type, lawd_cd, *months)).fetchall()
+        fresh = {deal_ymd for deal_ymd, fetched_at in rows if self.is_fresh(deal_ymd, fetched_at)}
+        return fresh, len(rows) - len(fresh)
+
+    def fresh_months(self, building_type, log_type, lawd_cd, months):
+        """months 중 저장돼 있고 다시 조회할 필요가 없는 달의 집합"""
+        months = list(months)
+        if not months:
+            return set()
+        with self._connect() as conn:
+            return self._fresh_months(conn, building_type, log_type, lawd_cd, months)[0]
+
+    def get_many(self, building_type, log_type, lawd_cd, months, dong, jibun):
+        """
+        여러 달에서 그 동/지번의 거래를 {YYYYMM: [(금액, 월세, 전용면적, 계약일)]} 로 반환합니다.
+        저장하지 않았거나 다시 조회할 때가 된 달은 빠집니다. (연결 하나, 질의 두 번)
+        """
+        months = list(months)
+        if not months:
+            return {}
+        key = (building_type, log_type, lawd_cd)
+        with self._connect() as conn:
+            fresh, stale = self._fresh_months(conn, *key, months)
+            found = {yyyymm: [] for yyyymm in months if yyyymm in fresh}
+            if found:
+                rows = conn.execute(
+                    f"SELECT deal_ymd, amount, monthly_rent, area, deal_date FROM deals "
+                    f"WHERE building_type=? AND log_type=? AND lawd_cd=? AND deal_ymd IN ({', '.join('?' * len(found))}) "
+                    f"AND dong=? AND jibun=?",
+                    key + tuple(found) + (dong, jibun)).fetchall()
+                for deal_ymd, *record in rows:
+                    found[deal_ymd].append(tuple(record))
+        with self._lock:
+            self._stats['hits'] += len(found)
+            self._stats['stale'] += stale
+            self._stats['misses'] += len(months) - len(found) - stale
+        return found
+
+    def get(self, building_type, log_type, lawd_cd, deal_ymd, dong, jibun):
+        """
+        저장된 달이면 그 동/지번의 거래 [(금액, 월세, 전용면적, 계약일)] 를 반환합니다.
+        저장하지 않았거나 다시 조회할 때가 된 달이면 None.
+        """
+        return self.get_many(building_type, log_type, lawd_cd, [deal_ymd], dong, jibun).get(deal_ymd)
+
+    def put(self, building_type, log_type, lawd_cd, deal_ymd, rows):
+        """한 달치 거래 [(동, 지번, 금액, 월세, 전용면적, 계약일)] 로 그 달의 기존 내용을 교체합니다."""
+        self.put_many(building_type, log_type, lawd_cd, {deal_ymd: rows})
+
+    def put_many(self, building_type, log_type, lawd_cd, month_rows):
+        """{YYYYMM: 거래 행 목록} 의 달들을 한 트랜잭션으로 교체합니다."""
+        if not month_rows:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            for deal_ymd, rows in month_rows.items():
+                key = (building_type, log_type, lawd_cd, deal_ymd)
+                conn.execute(
+                    "DELETE FROM deals WHERE building_type=? AND log_type=? AND lawd_cd=? AND deal_ymd=?", key)
+                conn.executemany("INSERT INTO deals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [key + tuple(row) for row in rows])
+                conn.execute("INSERT OR REPLACE INTO months VALUES (?, ?, ?, ?, ?, ?)", key + (now, len(rows)))
+        with self._lock:
+            self._stats['stores'] += len(month_rows)
+
+    def log_query(self, building_type, log_type, lawd_cd):
+        """시세 추정 요청 하나를 기록합니다. (메모리에 모았다가 한 번에 씀)"""
+        with self._lock:
+            self._pending_queries.append((building_type, log_type, lawd_cd, time.time()))
+            due = (len(self._pending_queries) >= self.query_flush_size
+                   or time.monotonic() - self._flushed_at >= self.query_flush_seconds)
+        if due:
+            self.flush_queries()
+
+    def flush_queries(self):
+        """모아 둔 조회 기록을 씁니다."""
+        with self._lock:
+            pending, self._pending_queries = self._pending_queries, []
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany("INSERT INTO queries VALUES (?, ?, ?, ?)", pending)
+        except sqlite3.Error as e:
+            print(f"⚠️ 조회 기록 저장 실패 ({len(pending)}건): {e}")
+
+    def top_queried(self, limit=20, days=30):
+        """최근 days 일 동안 가장 많이 조회된 [(건물 유형, 거래 유형, LAWD_CD, 조회 수)]"""
+        self.flush_queries()
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT building_type, log_type, lawd_cd, COUNT(*) AS hits FROM queries WHERE queried_at >= ? "
+                "GROUP BY building_type, log_type, lawd_cd ORDER BY hits DESC, lawd_cd LIMIT ?",
+                (time.time() - days * 86400, limit)).fetchall()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from estimator import median_price
+from estimator.median_price import fetch_months, get_api_url
+
+def month_range(start, end):
+    """YYYYMM start 부터 end 까지(양 끝 포함)의 달 목록 (오래된 순)"""
+    year, month = int(start[:4]), int(start[4:])
+    months = []
+    while f"{year}{month:02d}" <= end:
+        months.append(f"{year}{month:02d}")
+        year, month = (year, month + 1) if month < 12 else (year + 1, 1)
+    return months
+
+def ingest_district(lawd_cd, building_types, log_type, months, client=None, store=None, chunk_months=None, force=False):
+    """
+    한 구(LAWD_CD)의 여러 달 거래 전체를 받아 로컬 저장소에 넣습니다.
+    - 저장소에 이미 있고 다시 받을 필요가 없는 달은 건너뛰므로, 중간에 멈춰도 다시 실행하면 이어서 받습니다. (force 면 모두 다시)
+    - 같은 API 를 쓰는 건물 유형(다세대/연립)은 한 번만 받아 유형마다 저장합니다.
+    - chunk_months(기본: 클라이언트 동시 호출 수) 개월씩 동시에 받아 묶음마다 저장하므로, 중단해도 잃는 것은 마지막 묶음뿐입니다.
+    - 모든 페이지가 정상 응답(resultCode 000)인 달만 저장합니다. 오류 응답(호출 한도 초과 등)인 달은 실패로 세고
+      저장하지 않으므로 다시 실행하면 그 달부터 받습니다. 한 묶음이 모두 실패하면(한도 소진 등) 그 API 의 남은 달은
+      호출하지 않고 실패로 셉니다.
+    {'fetched', 'skipped', 'failed', 'rows'} 집계를 반환합니다.
+    """
+    store = store or median_price.deal_store
+    client = client or median_price.rtms_client
+    chunk_months = chunk_months or client.max_workers
+    if store is None:
+        raise RuntimeError("RTMS 로컬 저장소가 꺼져 있습니다. (RTMS_STORE_ENABLED=true 로 실행하세요)")
+
+    by_url = defaultdict(list)
+    for building_type in building_types:
+        by_url[get_api_url(building_type, log_type)].append(building_type)
+
+    summary = {'fetched': 0, 'skipped': 0, 'failed': 0, 'rows': 0}
+    for same_api in by_url.values():
+        if force:
+            todo = list(months)
+        else:
+            fresh = set.intersection(*(store.fresh_months(building_type, log_type, lawd_cd, months) for building_type in same_api))
+            todo = [yyyymm for yyyymm in months if yyyymm not in fresh]
+        summary['skipped'] += len(months) - len(todo)
+
+        for i in range(0, len(todo), chunk_months):
+            fetched = fetch_months(lawd_cd, same_api[0], todo[i:i + chunk_months], log_type, client=client)
+            if not any(complete for _, complete in fetched.values()):
+                summary['failed'] += len(todo) - i
+                print(f"🚨 {lawd_cd} {'/'.join(same_api)} {log_type}: {todo[i]} 부터 모두 실패해 남은 달은 받지 않습니다.")
+                break
+            complete_rows = {}
+            for yyyymm, (deals, complete) in fetched.items():
+                if not complete:
+                    summary['failed'] += 1
+                    continue
+                complete_rows[yyyymm] = deals.rows()
+                summary['fetched'] += 1
+                summary['rows'] += len(complete_rows[yyyymm])
+            for building_type in same_api:
+                store.put_many(building_type, log_type, lawd_cd, complete_rows)
+    return summary
@@ -1,14 +1,33 @@
 import requests
 import pandas as pd
-from xml.etree import ElementTree as ET
-from datetime import datetime, timedelta
+from datetime import datetime
 import re
 import os
 from dotenv import load_dotenv
+from estimator.deal_store import DealStore
+from estimator.rtms_client import RTMSClient
+from estimator.rtms_parser import DealColumns, parse_page
+from estimator.region_codes import lookup_lawd_cd
 
 # 환경변수 로드
 load_dotenv()
 
+# RTMS 실거래 응답 로컬 저장소 (지난 달은 다시 조회하지 않음, 이번 달/전달은 RTMS_STORE_TTL 초마다 다시 조회)
+RTMS_STORE_ENABLED = os.getenv('RTMS_STORE_ENABLED', 'true').lower() == 'true'
+RTMS_STORE_PATH = os.getenv('RTMS_STORE_PATH', 'rtms_store/deals.sqlite3')
+RTMS_STORE_TTL = int(os.getenv('RTMS_STORE_TTL', 6 * 3600))
+deal_store = DealStore(RTMS_STORE_PATH, RTMS_STORE_TTL) if RTMS_STORE_ENABLED else None
+
+# RTMS API 동시 호출 수와 호출 속도 제한(초당 요청 수, 순간 최대 요청 수) — data.go.kr 트래픽 한도에 맞춰 조정
+RTMS_MAX_CONCURRENCY = int(os.getenv('RTMS_MAX_CONCURRENCY', 8))
+RTMS_RATE_PER_SEC = float(os.getenv('RTMS_RATE_PER_SEC', 10))
+RTMS_RATE_BURST = int(os.getenv('RTMS_RATE_BURST', 10))
+# 시세 추정 시 처음 한 번에 받는 달 수와 넓혀 갈 때의 최대 달 수
+# (처음엔 RTMS_FIRST_PREFETCH_MONTHS 개월만 동시에 조회하고, 거래가 모자랄 때마다 두 배씩 RTMS_PREFETCH_MONTHS 까지 넓힘)
+RTMS_FIRST_PREFETCH_MONTHS = int(os.getenv('RTMS_FIRST_PREFETCH_MONTHS', 3))
+RTMS_PREFETCH_MONTHS = int(os.getenv('RTMS_PREFETCH_MONTHS', 12))
+rtms_client = RTMSClient(RTMS_MAX_CONCURRENCY, RTMS_RATE_PER_SEC, RTMS_RATE_BURST)
+
 # 주소 파싱
 def parse_address(address):
     address = re.sub(r'\(.*?\)', '', address)
@@ -37,8 +56,17 @@ def parse_address(address):
 
     return region_name, dong, jibun
 
-# 법정동 코드 조회
-def get_region_prefix(region_name):
+# 코드 표의 코드로 거래가 하나도 없어 API 로 다시 찾은 코드 (지역 이름 → 코드, 프로세스가 도는 동안 표보다 우선)
+_api_region_codes = {}
+
+# 법정동 코드 조회 (로컬 코드 표 → 없으면 StanReginCd API, use_table=False 면 API 만)
+def get_region_prefix(region_name, use_table=True):
+    if region_name in _api_region_codes:
+        return _api_region_codes[region_name]
+    code = lookup_lawd_cd(region_name) if use_table else None
+    if code:
+        return code
+
     url = "http://apis.data.go.kr/1741000/StanReginCd/getStanReginCdList"
     params = {
         'ServiceKey': os.getenv('SERVICEKEY'),
@@ -60,121 +88,162 @@ def get_region_prefix(region_name):
     print("❌ 법정동 코드 조회 실패")
     return None
 
+# 국토교통부 RTMS API 주소 (로컬 테스트 시 scripts/rtms_stub_server.py 주소로 바꿔 사용)
+RTMS_BASE_URL = os.getenv('RTMS_BASE_URL', 'http://apis.data.go.kr/1613000').rstrip('/')
+
+# 건물 유형별 (매매, 전월세) API 이름
+API_TYPES = {
+    "아파트": ("AptTrade", "AptRent"),
+    "다세대": ("RHTrade", "RHRent"),
+    "연립": ("RHTrade", "RHRent"),
+    "오피스텔": ("OffiTrade", "OffiRent")
+}
+
 # 건물 유형별 api url
 def get_api_url(building_type, log_type):
-    mapping = {
-        "아파트": ("AptTrade", "AptRent"),
-        "다세대": ("RHTrade", "RHRent"),
-        "연립": ("RHTrade", "RHRent"),
-        "오피스텔": ("OffiTrade", "OffiRent")
-    }
-    
-    api_types = mapping.get(building_type)
+    api_types = API_TYPES.get(building_type)
     trade_type, rent_type = api_types
     if log_type == "trade":
-        return f"http://apis.data.go.kr/1613000/RTMSDataSvc{trade_type}/getRTMSDataSvc{trade_type}"
+        return f"{RTMS_BASE_URL}/RTMSDataSvc{trade_type}/getRTMSDataSvc{trade_type}"
     elif log_type == "rent":
-        return f"http://apis.data.go.kr/1613000/RTMSDataSvc{rent_type}/getRTMSDataSvc{rent_type}"
+        return f"{RTMS_BASE_URL}/RTMSDataSvc{rent_type}/getRTMSDataSvc{rent_type}"
     return None, None
 
 
-# ✅ 실거래가 API 호출
-def get_deals(lawd_cd, target_dong, target_jibun, building_type, yyyymm, log_type):
+# ✅ 실거래가 API 호출: 한 구(LAWD_CD)의 여러 달 거래 (동시 호출)
+def fetch_months(lawd_cd, building_type, months, log_type, dong=None, jibun=None, client=None):
+    """
+    {YYYYMM: (DealColumns, 완료 여부)} — API 오류로 멈춘 달은 완료 여부가 False
+    dong/jibun 을 주면 그 필지의 거래만 파싱하고, 없으면 구 전체 거래를 돌려줍니다. (저장소용)
+    client 를 주면 기본 rtms_client 대신 사용합니다. (일괄 수집처럼 동시 호출 수/속도를 따로 정할 때)
+    """
     url = get_api_url(building_type, log_type)
+    fetched = (client or rtms_client).fetch_months(url, lawd_cd, months, lambda content: parse_page(content, log_type, dong, jibun))
+    return {yyyymm: (DealColumns.concat(pages), complete) for yyyymm, (pages, complete) in fetched.items()}
 
-    all_data = []
-    page = 1
-
-    while True:
-        params = {
-            "serviceKey": os.getenv('SERVICEKEY'),
-            "LAWD_CD": lawd_cd,
-            "DEAL_YMD": yyyymm,
-            "numOfRows": "1000",
-            "pageNo": str(page)
-        }
-
-        try:
-            response = requests.get(url, params=params)
-            root = ET.fromstring(response.content)
-
-            items = list(root.iter("item"))
-            if not items:
-                break  # 더 이상 데이터 없음
-
-            for item in items:
-                dong = item.findtext("umdNm", "").strip()
-                api_jibun = item.findtext("jibun", "").strip()
-
-                if dong != target_dong or api_jibun != target_jibun:
-                    continue
-
-                year = item.findtext("dealYear")
-                month = item.findtext("dealMonth")
-                day = item.findtext("dealDay")
-                date = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-
-                area_raw = item.findtext("excluUseAr")
-                area = float(area_raw)
-
-                if log_type == "trade":
-                    deal_amount_raw = item.findtext("dealAmount")
-                    deal_amount = int(deal_amount_raw.replace(",", "")) * 10000
-                    
-                    all_data.append({
-                        "거래금액": deal_amount,
-                        "전용면적": area,
-                        "계약일": date
-                        })
-                
-                elif log_type == "rent":
-                    deposit_raw = item.findtext("deposit", "").replace(",", "").strip()
-                    deposit = int(deposit_raw) * 10000
-
-                    monthly_rent_raw = item.findtext("monthlyRent", "").replace(",", "").strip()
-                    monthly_rent = int(monthly_rent_raw) * 10000 if monthly_rent_raw else 0
-
-                    if deposit > 0 and monthly_rent == 0:
-                        all_data.append({
-                            "보증금": deposit,
-                            "전용면적": area,
-                            "계약일": date
-                        })
-
-            page += 1
-
-        except Exception as e:
-            print(f"❌ API 오류 (page {page}): {e}")
-            break
-
-    return pd.DataFrame(all_data)
+def _deals_frame(deals, log_type):
+    """한 필지 거래 열 배열을 시세 계산용 DataFrame 으로 만듭니다."""
+    if log_type == "trade":
+        return pd.DataFrame({"거래금액": deals.amount, "전용면적": deals.area, "계약일": deals.deal_date})
+
+    # 전세(월세 없는 보증금 거래)만 사용
+    deals = deals.select((deals.amount > 0) & (deals.monthly_rent == 0))
+    return pd.DataFrame({"보증금": deals.amount, "전용면적": deals.area, "계약일": deals.deal_date})
+
+# ✅ 실거래가 조회 (로컬 저장소 → API)
+def get_deals_many(lawd_cd, target_dong, target_jibun, building_type, months, log_type):
+    """
+    여러 달의 대상 필지 거래를 months 순서대로 DataFrame 목록으로 반환합니다.
+    저장소에 없는 달만 모아 한꺼번에 동시 조회하고, 모든 페이지를 받은 달은 저장소에 넣습니다.
+    저장소를 쓰지 않으면 다른 필지의 거래는 파싱 단계에서 바로 버립니다.
+    """
+    found = {}
+    if deal_store:
+        stored = deal_store.get_many(building_type, log_type, lawd_cd, months, target_dong, target_jibun)
+        for yyyymm, records in stored.items():
+            found[yyyymm] = DealColumns.from_records(records, target_dong, target_jibun)
+
+    missing = [yyyymm for yyyymm in months if yyyymm not in found]
+    if missing:
+        lot = (None, None) if deal_store else (target_dong, target_jibun)
+        complete_rows = {}
+        for yyyymm, (deals, complete) in fetch_months(lawd_cd, building_type, missing, log_type, *lot).items():
+            if deal_store and complete:
+                complete_rows[yyyymm] = deals.rows()
+            found[yyyymm] = deals.matching(target_dong, target_jibun)
+        if complete_rows:
+            deal_store.put_many(building_type, log_type, lawd_cd, complete_rows)
+
+    return [_deals_frame(found[yyyymm], log_type) for yyyymm in months]
+
+def get_deals(lawd_cd, target_dong, target_jibun, building_type, yyyymm, log_type):
+    return get_deals_many(lawd_cd, target_dong, target_jibun, building_type, [yyyymm], log_type)[0]
+
+# 최근 달부터 한 달씩 넓혀 가며 조회하는 최대 기간(개월)과 시세 추정에 필요한 최소 거래 건수
+MAX_LOOKBACK_MONTHS = 60
+MIN_DEALS = 5
+
+# 거래 유형별 금액 열
+PRICE_COLUMN = {"trade": "거래금액", "rent": "보증금"}
+
+def prefetch_chunks(months, first=None, largest=None):
+    """
+    months 를 앞에서부터 first, 2*first, 4*first ... (최대 largest) 개월씩 나눕니다.
+    최근 몇 달로 거래가 충분한 요청이 필요 없는 과거 달까지 API 를 호출하지 않도록 처음 묶음을 작게 잡습니다.
+    """
+    size = max(1, first or RTMS_FIRST_PREFETCH_MONTHS)
+    largest = max(size, largest or RTMS_PREFETCH_MONTHS)
+    start = 0
+    while start < len(months):
+        yield months[start:start + size]
+        start += size
+        size = min(size * 2, largest)
+
+def recent_months(count, today=None):
+    """이번 달부터 과거로 count 개월의 YYYYMM 을 최근 순서로 반환합니다. (달력 기준, 중복/누락 없음)"""
+    today = today or datetime.today()
+    year, month = today.year, today.month
+    months = []
+    for _ in range(count):
+        months.append(f"{year}{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months
+
+class DealWindow:
+    """
+    조회 기간을 한 달씩 넓히며 모은 거래를 열(column) 단위로 쌓는 버퍼
+    같은 거래(모든 열이 같은 행)는 한 번만 담아 매달 DataFrame 을 합치고 중복을 지우는 일을 없앱니다.
+    """
+
+    def __init__(self, log_type):
+        self.columns = {PRICE_COLUMN[log_type]: [], "전용면적": [], "계약일": []}
+        self.months = 0
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def extend(self, deals_df):
+        """get_deals 결과(한 달치)를 버퍼에 더합니다."""
+        self.months += 1
+        if deals_df.empty:
+            return
+        names = list(self.columns)
+        for row in deals_df[names].itertuples(index=False, name=None):
+            if row in self._seen:
+                continue
+            self._seen.add(row)
+            for name, value in zip(names, row):
+                self.columns[name].append(value)
+
+    def to_frame(self):
+        df = pd.DataFrame(self.columns)
+        df["계약일"] = pd.to_datetime(df["계약일"])
+        return df
 
 # ✅ 통합 시세 추정 함수
 def estimate_price(lawd_cd, target_dong, target_jibun, target_area, building_type, log_type):
-    all_df = pd.DataFrame()
-    today = datetime.today()
-
-    for year_offset in range(1, 6):
-        month_list = [
-            (today - timedelta(days=30 * i)).strftime("%Y%m")
-            for i in range(year_offset * 12)
-        ]
-        
-        # 해당 연도의 12개월 데이터 요청
-        for yyyymm in month_list:
-            new_df = get_deals(lawd_cd, target_dong, target_jibun, building_type, yyyymm, log_type)
-            
-            if not new_df.empty:
-                all_df = pd.concat([all_df, new_df], ignore_index=True).drop_duplicates()
-
-        if len(all_df) >= 5:
-            all_df["계약일"] = pd.to_datetime(all_df["계약일"])
-
-            if (log_type == "trade"):
-                all_df["㎡당가격"] = all_df["거래금액"] / all_df["전용면적"]
-            elif(log_type == "rent"):
-                all_df["㎡당가격"] = all_df["보증금"] / all_df["전용면적"]
-
+    """
+    이번 달부터 한 달씩 조회 기간을 넓히며 거래를 모으다가 MIN_DEALS 건이 되면 ㎡당 가격 중앙값을 반환합니다.
+    달마다 한 번만 조회하며(최대 MAX_LOOKBACK_MONTHS 개월), API 는 처음 RTMS_FIRST_PREFETCH_MONTHS 개월을 동시에 호출하고
+    거래가 모자라면 묶음을 두 배씩(최대 RTMS_PREFETCH_MONTHS 개월) 넓혀 갑니다.
+    """
+    window = DealWindow(log_type)
+    price_column = PRICE_COLUMN[log_type]
+    if deal_store:
+        deal_store.log_query(building_type, log_type, lawd_cd)
+    months = recent_months(MAX_LOOKBACK_MONTHS)
+    # 묶음 단위로 동시에 받아 두고, 거래 건수는 최근 달부터 한 달씩 더하며 확인합니다.
+    chunks = prefetch_chunks(months)
+    monthly_deals = (deals for chunk in chunks
+                     for deals in get_deals_many(lawd_cd, target_dong, target_jibun, building_type, chunk, log_type))
+
+    for deals_df in monthly_deals:
+        window.extend(deals_df)
+
+        if len(window) >= MIN_DEALS:
+            all_df = window.to_frame()
+            all_df["㎡당가격"] = all_df[price_column] / all_df["전용면적"]
 
             filtered_df = all_df[
                 (all_df["전용면적"] >= target_area - 3) & 
@@ -185,20 +254,14 @@ def estimate_price(lawd_cd, target_dong, target_jibun, target_area, building_typ
 
             median_price = round(target_df["㎡당가격"].median())
 
-            msg = f"{year_offset+1}년 기준 ({'유사 평형' if len(filtered_df) >= 3 else '전체'})"
-
-            return all_df, median_price, f"{year_offset+1}년 기준 ({msg})"
+            return all_df, median_price, f"최근 {window.months}개월 기준 ({'유사 평형' if len(filtered_df) >= 3 else '전체'})"
 
     # 5년치 누적에도 5건 미만
-    if not all_df.empty:
-        all_df["계약일"] = pd.to_datetime(all_df["계약일"])
+    if len(window):
+        all_df = window.to_frame()
         latest = all_df.sort_values("계약일", ascending=False).iloc[0]
+        unit_price = round(latest[price_column] / latest["전용면적"])
 
-        if (log_type == "trade"):
-            unit_price = round(latest["거래금액"] / latest["전용면적"])
-        elif(log_type == "rent"):
-            unit_price = round(latest["보증금"] / latest["전용면적"])
-        
         print("⚠️ 거래 건수 부족 — 최근 거래 1건 기준으로 반환합니다.")
         return all_df, unit_price, f"최근 거래 1건 ({latest['계약일'].date()})"
 
@@ -232,16 +295,34 @@ def detect_outlier_transactions(all_df, median_price, target_area, area_toleranc
 
     return outliers, info
 
+def estimate_region_price(region, dong, jibun, exclusive_area, building_type, log_type):
+    """
+    지역 이름으로 코드를 찾아 estimate_price 를 실행합니다.
+    코드 표의 코드로 거래가 하나도 없으면(폐지·분구된 구 등 표가 낡은 경우) API 로 코드를 다시 찾아,
+    다른 코드가 나오면 그 코드로 한 번 더 추정하고 이후 같은 지역은 그 코드를 씁니다.
+    """
+    from_table = region not in _api_region_codes
+    lawd_cd = get_region_prefix(region)
+    result = estimate_price(lawd_cd, dong, jibun, exclusive_area, building_type, log_type)
+    if result[0] is not None or not from_table or lawd_cd is None:
+        return result
+
+    api_code = get_region_prefix(region, use_table=False)
+    if api_code is None or api_code == lawd_cd:
+        return result
+    print(f"⚠️ 코드 표의 {region} 코드({lawd_cd})로 거래가 없어 API 코드({api_code})로 다시 조회합니다. "
+          f"(scripts/refresh_region_codes.py 로 표를 갱신하세요)")
+    _api_region_codes[region] = api_code
+    return estimate_price(api_code, dong, jibun, exclusive_area, building_type, log_type)
+
 # 실행 부분
 def estimate_median_trade(address, building_type, exclusive_area):
     region, dong, jibun = parse_address(address)
-    lawd_cd = get_region_prefix(region)
-    all_df, median, info = estimate_price(lawd_cd, dong, jibun, exclusive_area, building_type, "trade")
+    all_df, median, info = estimate_region_price(region, dong, jibun, exclusive_area, building_type, "trade")
     return all_df, median, info
 
 def estimate_median_rent(address, building_type, exclusive_area):
     region, dong, jibun = parse_address(address)
-    lawd_cd = get_region_prefix(region)
-    all_df, median, info1 = estimate_price(lawd_cd, dong, jibun, exclusive_area, building_type, "rent")
+    all_df, median, info1 = estimate_region_price(region, dong, jibun, exclusive_area, building_type, "rent")
     outliers, info2 = detect_outlier_transactions(all_df, median, exclusive_area, area_tolerance=3, threshold_ratio=0.3)
     return all_df, median, info1, outliers, info2
\ No newline at end of file
@@ -0,0 +1,149 @@
+import csv
+import os
+import re
+import threading
+
+import requests
+
+# 시/도 + 시/군/구 이름 → 5자리 법정동 코드(LAWD_CD) 표 (scripts/refresh_region_codes.py 로 갱신)
+REGION_CODE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'lawd_codes.csv')
+STAN_REGIN_URL = "http://apis.data.go.kr/1741000/StanReginCd/getStanReginCdList"
+
+# 주소에 흔히 쓰는 시/도 줄임말과 옛 이름 → 법정동 표의 정식 이름
+SIDO_ALIASES = {
+    "서울": "서울특별시", "서울시": "서울특별시",
+    "부산": "부산광역시", "부산시": "부산광역시",
+    "대구": "대구광역시", "대구시": "대구광역시",
+    "인천": "인천광역시", "인천시": "인천광역시",
+    "광주": "광주광역시", "광주시": "광주광역시",
+    "대전": "대전광역시", "대전시": "대전광역시",
+    "울산": "울산광역시", "울산시": "울산광역시",
+    "세종": "세종특별자치시", "세종시": "세종특별자치시",
+    "경기": "경기도",
+    "강원": "강원특별자치도", "강원도": "강원특별자치도",
+    "충북": "충청북도", "충남": "충청남도",
+    "전북": "전북특별자치도", "전라북도": "전북특별자치도",
+    "전남": "전라남도", "경북": "경상북도", "경남": "경상남도",
+    "제주": "제주특별자치도", "제주도": "제주특별자치도",
+}
+
+def normalize_region_name(region_name):
+    """공백을 하나로 줄이고 첫 토큰의 시/도 줄임말을 정식 이름으로 바꿉니다."""
+    tokens = region_name.split()
+    if tokens and tokens[0] in SIDO_ALIASES:
+        tokens[0] = SIDO_ALIASES[tokens[0]]
+    return " ".join(tokens)
+
+class RegionCodeIndex:
+    """
+    법정동 코드 표의 메모리 색인
+    - names : 정식 이름("서울특별시 종로구", "경기도 수원시 장안구") → 코드 (해시 조회)
+    - suffix: 시/도를 뺀 이름("종로구", "수원시 장안구") → 코드 목록 (시/도 없이 쓴 주소용, 하나일 때만 사용)
+    """
+
+    def __init__(self, rows=()):
+        self.names = {}
+        self.suffix = {}
+        for code, name in rows:
+            self.names[name] = code
+            tokens = name.split()
+            for start in range(1, len(tokens)):
+                self.suffix.setdefault(" ".join(tokens[start:]), set()).add(code)
+
+    @classmethod
+    def load(cls, path=REGION_CODE_PATH):
+        if not os.path.exists(path):
+            print(f"⚠️ 법정동 코드 표가 없습니다: {path} (scripts/refresh_region_codes.py 로 만드세요)")
+            return cls()
+        with open(path, encoding='utf-8', newline='') as f:
+            return cls((row['lawd_cd'], row['name']) for row in csv.DictReader(f))
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, region_name):
+        """5자리 LAWD_CD 를 반환합니다. 표에 없거나 시/도 없이 쓴 이름이 여러 곳에 해당하면 None."""
+        name = normalize_region_name(region_name)
+        code = self.names.get(name)
+        if code is None:
+            candidates = self.suffix.get(name, ())
+            if len(candidates) == 1:
+                code = next(iter(candidates))
+        return code
+
+_index = None
+_index_lock = threading.Lock()
+
+def region_index():
+    """처음 쓸 때 표를 한 번만 읽어 색인을 만듭니다."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = RegionCodeIndex.load()
+    return _index
+
+def lookup_lawd_cd(region_name):
+    return region_index().lookup(region_name)
+
+def _is_sigungu(code):
+    """10자리 법정동 코드 중 시/군/구 단위(읍면동·리 부분이 0)이면서 시/도 자체가 아닌 코드"""
+    return len(code) == 10 and code[5:] == "00000" and code[2:5] != "000"
+
+def rows_from_code_file(path):
+    """
+    행정표준코드관리시스템의 '법정동코드 전체자료' 텍스트 파일(탭 구분, 법정동코드/법정동명/폐지여부)에서
+    현존하는 시/군/구 행 [(5자리 코드, 이름)] 을 읽습니다. (UTF-8 또는 CP949)
+    """
+    for encoding in ('utf-8-sig', 'cp949'):
+        try:
+            with open(path, encoding=encoding) as f:
+                lines = f.read().splitlines()
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError(f"법정동 코드 파일 인코딩을 알 수 없습니다: {path}")
+
+    rows = []
+    for line in lines:
+        fields = re.split(r'\t|,', line.strip())
+        if len(fields) < 3 or not fields[0].isdigit() or fields[2].strip() != "존재":
+            continue
+        if _is_sigungu(fields[0]):
+            rows.append((fields[0][:5], " ".join(fields[1].split())))
+    return rows
+
+def rows_from_api(service_key=None, num_rows=1000):
+    """행정안전부 법정동코드(StanReginCd) API 의 현존 코드 전체를 페이지별로 받아 시/군/구 행만 모읍니다."""
+    rows = []
+    page = 1
+    while True:
+        params = {
+            'ServiceKey': service_key or os.getenv('SERVICEKEY'),
+            'type': 'json',
+            'pageNo': str(page),
+            'numOfRows': str(num_rows),
+            'flag': 'Y',
+        }
+        response = requests.get(STAN_REGIN_URL, params=params, timeout=30)
+        response.raise_for_status()
+        entries = [entry for item in response.json().get('StanReginCd', []) for entry in item.get('row', [])]
+        if not entries:
+            return rows
+        rows += [(entry['region_cd'][:5], " ".join(entry['locatadd_nm'].split()))
+                 for entry in entries if _is_sigungu(entry.get('region_cd', ''))]
+        page += 1
+
+def write_code_table(rows, path=REGION_CODE_PATH):
+    """[(코드, 이름)] 을 이름 중복 없이 코드 순서로 정렬해 CSV 로 씁니다. (임시 파일에 쓴 뒤 교체)"""
+    unique = sorted({name: code for code, name in rows}.items(), key=lambda item: (item[1], item[0]))
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['lawd_cd', 'name'])
+        for name, code in unique:
+            writer.writerow([code, name])
+    os.replace(tmp_path, path)
+    return len(unique)
@@ -0,0 +1,136 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+class TokenBucket:
+    """
+    초당 rate 개씩 토큰이 차고 최대 burst 개까지 쌓이는 속도 제한기
+    acquire() 는 토큰이 생길 때까지 기다리므로 여러 스레드가 함께 써도 전체 호출 속도가 rate 를 넘지 않습니다.
+    """
+
+    def __init__(self, rate, burst=None):
+        if not rate or rate <= 0:
+            raise ValueError(f"호출 속도(초당 요청 수)는 0보다 커야 합니다: {rate}")
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RTMSClient:
+    """
+    국토교통부 RTMS API 를 여러 달/페이지 동시에 호출하는 클라이언트
+    스레드 풀(max_workers)로 동시 호출 수를, TokenBucket 으로 data.go.kr 호출 속도를 제한합니다.
+    달마다 1페이지를 먼저 받아 totalCount 로 나머지 페이지 수를 알아낸 뒤 나머지 페이지를 한꺼번에 요청하며,
+    결과는 완료 순서와 관계없이 요청한 달/페이지 순서로 합칩니다.
+    """
+
+    def __init__(self, max_workers=8, rate=10, burst=None, num_rows=1000, timeout=30):
+        self.max_workers = max_workers
+        self.num_rows = num_rows
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rtms')
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'errors': 0}
+
+    def fetch_page(self, url, lawd_cd, yyyymm, page, parse):
+        """
+        한 페이지를 받아 풀 스레드에서 바로 parse(응답 바이트) 한 결과를 반환합니다. (네트워크/HTTP/파싱 오류는 예외로 전달)
+        parse 는 (페이지 결과, item 수, totalCount 또는 None) 을 반환하고, 오류 응답이면 예외를 내야 합니다.
+        그래야 그 달이 완료되지 않은 것으로 남아 저장소에 빈 달로 저장되지 않습니다.
+        """
+        self.bucket.acquire()
+        params = {
+            "serviceKey": os.getenv('SERVICEKEY'),
+            "LAWD_CD": lawd_cd,
+            "DEAL_YMD": yyyymm,
+            "numOfRows": str(self.num_rows),
+            "pageNo": str(page)
+        }
+        with self._lock:
+            self._stats['requests'] += 1
+        try:
+            response = requests.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return parse(response.content)
+        except Exception:
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+
+    def fetch_months(self, url, lawd_cd, months, parse):
+        """
+        여러 달의 모든 페이지를 받아 {YYYYMM: ([페이지 결과], 완료 여부)} 를 반환합니다. (페이지 결과는 페이지 순서)
+        오류가 난 달은 받은 페이지까지만 담고 완료 여부가 False 입니다.
+        totalCount 가 없는 응답이면 예전처럼 빈 페이지가 나올 때까지 한 페이지씩 받습니다.
+        """
+        first_futures = [(yyyymm, self._executor.submit(self.fetch_page, url, lawd_cd, yyyymm, 1, parse)) for yyyymm in months]
+        results = {}
+        rest = []
+        for yyyymm, future in first_futures:
+            try:
+                result, item_count, total = future.result()
+            except Exception as e:
+                print(f"❌ API 오류 ({yyyymm} page 1): {e}")
+                results[yyyymm] = ([], False)
+                continue
+            results[yyyymm] = ([result], True)
+            if not item_count:
+                continue  # 더 이상 데이터 없음
+            if total is None:
+                results[yyyymm] = self._fetch_sequential(url, lawd_cd, yyyymm, [result], parse)
+                continue
+            # 나머지 페이지는 호출한 스레드에서 바로 제출합니다. (풀 작업 안에서 다시 풀을 기다리면 교착될 수 있음)
+            for page in range(2, math.ceil(total / self.num_rows) + 1):
+                rest.append((yyyymm, page, self._executor.submit(self.fetch_page, url, lawd_cd, yyyymm, page, parse)))
+
+        for yyyymm, page, future in rest:
+            pages, complete = results[yyyymm]
+            if not complete:
+                continue
+            try:
+                pages.append(future.result()[0])
+            except Exception as e:
+                print(f"❌ API 오류 ({yyyymm} page {page}): {e}")
+                complete = False
+            results[yyyymm] = (pages, complete)
+        return results
+
+    def _fetch_sequential(self, url, lawd_cd, yyyymm, pages, parse):
+        """totalCount 를 모를 때 2페이지부터 빈 페이지가 나올 때까지 차례로 받습니다."""
+        page = 2
+        while True:
+            try:
+                result, item_count, _ = self.fetch_page(url, lawd_cd, yyyymm, page, parse)
+            except Exception as e:
+                print(f"❌ API 오류 ({yyyymm} page {page}): {e}")
+                return pages, False
+            if not item_count:
+                return pages, True
+            pages.append(result)
+            page += 1
+
+    def shutdown(self):
+        """아직 시작하지 않은 요청은 취소하고 스레드 풀을 닫습니다. (일괄 수집 중단 시)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
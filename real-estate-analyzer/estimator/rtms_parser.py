@@ -0,0 +1,117 @@
+import io
+import re
+from xml.etree import ElementTree as ET
+
+import numpy as np
+
+# 거래 유형별로 item 에서 읽는 금액 태그
+AMOUNT_TAG = {"trade": "dealAmount", "rent": "deposit"}
+# 정상 응답의 resultCode (예전 API 는 '00')
+OK_RESULT_CODES = ('000', '00')
+
+class DealColumns:
+    """
+    RTMS 거래를 열 배열로 담는 묶음
+    동/지번(object), 금액/월세(int64, 원), 전용면적(float64, ㎡), 계약일(datetime64[D])
+    """
+
+    def __init__(self, dong=(), jibun=(), amount=(), monthly_rent=(), area=(), deal_date=()):
+        self.dong = np.asarray(dong, dtype=object)
+        self.jibun = np.asarray(jibun, dtype=object)
+        self.amount = np.asarray(amount, dtype=np.int64)
+        self.monthly_rent = np.asarray(monthly_rent, dtype=np.int64)
+        self.area = np.asarray(area, dtype=np.float64)
+        self.deal_date = np.asarray(deal_date, dtype='datetime64[D]')
+
+    def __len__(self):
+        return len(self.amount)
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(*(np.concatenate([getattr(part, name) for part in parts]) for name in
+                     ('dong', 'jibun', 'amount', 'monthly_rent', 'area', 'deal_date')))
+
+    @classmethod
+    def from_records(cls, records, dong, jibun):
+        """저장소의 [(금액, 월세, 전용면적, 계약일)] 을 한 필지(dong, jibun)의 열 배열로 바꿉니다."""
+        amount, monthly_rent, area, deal_date = zip(*records) if records else ((), (), (), ())
+        return cls([dong] * len(amount), [jibun] * len(amount), amount, monthly_rent, area, deal_date)
+
+    def select(self, mask):
+        return DealColumns(self.dong[mask], self.jibun[mask], self.amount[mask], self.monthly_rent[mask],
+                           self.area[mask], self.deal_date[mask])
+
+    def matching(self, dong, jibun):
+        """한 필지의 거래만 남깁니다."""
+        return self.select((self.dong == dong) & (self.jibun == jibun))
+
+    def rows(self):
+        """저장소에 넣을 [(동, 지번, 금액, 월세, 전용면적, 'YYYY-MM-DD')] 행 목록"""
+        return list(zip(self.dong.tolist(), self.jibun.tolist(), self.amount.tolist(), self.monthly_rent.tolist(),
+                        self.area.tolist(), self.deal_date.astype(str).tolist()))
+
+def _to_int(text):
+    return int(text.replace(",", "").strip()) if text and text.strip() else 0
+
+def _error_message(content):
+    """오류 응답에서 resultMsg / returnAuthMsg / returnReasonCode 를 찾아 한 줄로 만듭니다."""
+    found = re.findall(rb'<(resultMsg|returnAuthMsg|returnReasonCode|errMsg)>([^<]*)<', content[:4096])
+    return ", ".join(text.decode('utf-8', 'replace') for _, text in found) or content[:200].decode('utf-8', 'replace')
+
+def parse_page(content, log_type, dong=None, jibun=None):
+    """
+    RTMS 응답 한 페이지(XML 바이트)를 iterparse 로 훑으며 거래를 열 배열로 모읍니다.
+    트리 전체를 만들지 않고 <item> 하나를 읽을 때마다 지우며, 항목마다 필요한 태그만 findtext 로 읽습니다.
+    dong/jibun 을 주면 동/지번 태그만 먼저 읽어 다른 필지의 항목은 나머지 태그를 읽기 전에 버립니다.
+    형식이 잘못된 항목은 건너뜁니다.
+    (DealColumns, 페이지의 item 수, totalCount 또는 None) 을 반환합니다.
+    resultCode 가 정상(000)이 아니거나 없는 응답(호출 한도 초과, 인증 오류 등의 오류 XML)은 ValueError 로 알립니다.
+    거래 0건으로 읽어 저장소에 빈 달로 남지 않도록 하기 위함입니다.
+    """
+    amount_tag = AMOUNT_TAG[log_type]
+    columns = ([], [], [], [], [], [])
+    item_count = 0
+    total_count = None
+    result_code = None
+    for _, elem in ET.iterparse(io.BytesIO(content), events=('end',)):
+        tag = elem.tag
+        if tag == 'resultCode':
+            result_code = (elem.text or "").strip()
+            if result_code not in OK_RESULT_CODES:
+                break
+            continue
+        if tag == 'totalCount':
+            total_count = int(elem.text) if elem.text and elem.text.strip().isdigit() else None
+            continue
+        if tag != 'item':
+            continue
+        item_count += 1
+        # 동/지번만 먼저 읽어 다른 필지면 나머지 태그는 읽지 않고 버립니다.
+        item_dong = (elem.findtext("umdNm") or "").strip()
+        item_jibun = (elem.findtext("jibun") or "").strip()
+        if (dong is not None and item_dong != dong) or (jibun is not None and item_jibun != jibun):
+            elem.clear()
+            continue
+        try:
+            amount_text = elem.findtext(amount_tag)
+            if not amount_text:
+                continue
+            amount = _to_int(amount_text) * 10000
+            monthly_rent = _to_int(elem.findtext("monthlyRent")) * 10000 if log_type == "rent" else 0
+            area = float(elem.findtext("excluUseAr"))
+            deal_date = np.datetime64(f"{elem.findtext('dealYear')}-{elem.findtext('dealMonth').zfill(2)}-"
+                                      f"{elem.findtext('dealDay').zfill(2)}", 'D')
+        except (AttributeError, TypeError, ValueError):
+            continue
+        finally:
+            elem.clear()
+        for column, value in zip(columns, (item_dong, item_jibun, amount, monthly_rent, area, deal_date)):
+            column.append(value)
+    if result_code not in OK_RESULT_CODES:
+        raise ValueError(f"RTMS 오류 응답 (resultCode={result_code}): {_error_message(content)}")
+    return DealColumns(*columns), item_count, total_count
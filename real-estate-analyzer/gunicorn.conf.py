@@ -0,0 +1,54 @@
+"""
+gunicorn 설정 (Dockerfile 의 CMD 에서 사용)
+
+preload 모드(GUNICORN_PRELOAD=true, 기본)에서는 마스터 프로세스가 app(config.py)을 한 번만 import 해
+EasyOCR 검출/인식 모델을 불러온 뒤 워커를 fork 합니다. 워커를 늘려도 모델 메모리가 워커 수만큼 늘지 않습니다.
+- 불러온 모델 가중치는 공유 메모리로 옮기고(share_reader_memory),
+  import 중에는 GC 를 멈췄다가 fork 직전 gc.freeze() 로 기존 객체를 GC 대상에서 빼서
+  워커에서 GC 가 객체 헤더를 건드려 메모리 페이지가 복사되는 일을 줄입니다.
+- 워커마다 torch / OpenCV 스레드 수를 (CPU 코어 수 / 워커 수) 로 나눠 설정합니다.
+마스터에서는 모델 추론이나 Firestore/Gemini 요청을 하지 않습니다. (fork 전에 만든 스레드 풀/gRPC 채널은 워커에서 쓸 수 없음)
+/ocr/jobs 작업 상태와 결과는 OCR_JOB_STATE_DIR(기본 ocr_cache/jobs)의 파일로 워커끼리 공유하므로 어느 워커로 조회해도 됩니다.
+(OCR_JOB_STATE_DIR 를 비우고 워커를 여럿 띄우면 /ocr/jobs 는 503 으로 거절됩니다.)
+
+실행 (real-estate-analyzer 폴더에서)
+    gunicorn -c gunicorn.conf.py app:app
+    WEB_CONCURRENCY=3 OCR_WORKER_TORCH_THREADS=2 gunicorn -c gunicorn.conf.py app:app
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = 0
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# 워커당 torch / OpenCV 스레드 수 (비우면 CPU 코어를 워커 수로 나눈 값)
+worker_torch_threads = int(os.getenv('OCR_WORKER_TORCH_THREADS', 0)) or max(1, (os.cpu_count() or 1) // workers)
+worker_cv2_threads = int(os.getenv('OCR_WORKER_CV2_THREADS', 0)) or worker_torch_threads
+
+if preload_app:
+    # 모델을 불러오는 동안 GC 를 멈춰 두고 fork 직전에 고정합니다. (워커에서 다시 켭니다)
+    gc.disable()
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import config
+    from utils.ocr_models import share_reader_memory
+    if config.reader is not None:
+        shared = share_reader_memory(config.reader)
+        server.log.info(f"✅ 모델 가중치 {shared / 1024 / 1024:.1f}MB 를 공유 메모리로 옮겼습니다. (워커 {workers}개)")
+    gc.collect()
+    gc.freeze()
+
+def post_fork(server, worker):
+    gc.enable()
+    from utils.ocr_models import set_worker_threads
+    reader = None
+    if preload_app:
+        import config
+        reader = config.reader
+    set_worker_threads(worker_torch_threads, worker_cv2_threads, reader)
+    server.log.info(f"워커 {worker.pid}: torch 스레드 {worker_torch_threads}, OpenCV 스레드 {worker_cv2_threads}")
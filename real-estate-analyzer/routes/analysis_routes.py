@@ -1,20 +1,34 @@
 import os
 import re
+import queue
 from datetime import datetime
 from flask import Blueprint, request, jsonify, render_template # type: ignore
 from werkzeug.utils import secure_filename # type: ignore
 from bs4 import BeautifulSoup # type: ignore
 from firebase_admin import auth, firestore # type: ignore
-from pdf2image import convert_from_path # type: ignore
 
 # 설정 및 유틸리티 함수 임포트
-from config import app, reader, model, db, confm_key
-from utils.image_processor import enhance_image_for_ocr
+from config import app, reader, model, db, confm_key, ocr_cache, form_templates, recognition_broker
+from config import (OCR_EXECUTION_MODE, OCR_MAX_WORKERS, OCR_IN_MEMORY, OCR_STREAMING, OCR_STREAM_QUEUE_SIZE,
+                    OCR_TEXT_LAYER, OCR_PREPROCESS_PROFILE, OCR_RENDER_MODE, OCR_RENDER_TEXT_PT, OCR_RENDER_TEXT_PX,
+                    OCR_RENDER_THREADS, OCR_CASCADE, OCR_CASCADE_MIN_CONFIDENCE, OCR_CASCADE_PAGE_RATIO,
+                    OCR_SEGMENTATION, OCR_RECOG_BATCH_SIZE, OCR_JOB_WORKERS, OCR_JOB_QUEUE_SIZE, OCR_JOB_RESULT_TTL,
+                    OCR_JOB_STATE_DIR)
+from utils.ocr_pipeline import ocr_documents
+from utils.job_queue import JobQueue
 from utils.text_parser import parse_summary_from_text
 from rule.rules import check_owner_match, check_mortgage_risk, check_deposit_over_market, check_mortgage_vs_deposit, compare_address
 from estimator.median_price import estimate_median_trade
 
 analysis_bp = Blueprint('analysis', __name__)
+# 비동기 OCR 작업 큐 (POST /ocr/jobs 로 등록, GET /ocr/jobs/<id> 로 상태 조회)
+# 상태는 OCR_JOB_STATE_DIR 에 함께 써서 다른 gunicorn 워커로 조회해도 찾을 수 있게 합니다.
+ocr_jobs = JobQueue(worker_count=OCR_JOB_WORKERS, max_queue=OCR_JOB_QUEUE_SIZE, result_ttl=OCR_JOB_RESULT_TTL, name='ocr',
+                    state_dir=OCR_JOB_STATE_DIR or None)
+# 상태 디렉터리 없이 워커가 여럿이면 조회가 다른 워커로 가 404 가 나므로 /ocr/jobs 를 받지 않습니다.
+ocr_jobs_enabled = bool(OCR_JOB_STATE_DIR) or int(os.getenv('WEB_CONCURRENCY', 1)) <= 1
+if not ocr_jobs_enabled:
+    print("⚠️ OCR_JOB_STATE_DIR 없이 gunicorn 워커가 여럿이라 /ocr/jobs 를 끕니다. (/ocr 는 그대로 사용 가능)")
 # poppler_path = 'C:/ocr-safesign/real-estate-analyzer/poppler/Library/bin'
 poppler_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'poppler', 'Library', 'bin'))
 
@@ -22,38 +36,8 @@ poppler_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'po
 def index():
     return render_template('index.html')
 
-def save_pdf_as_images(pdf_path, save_dir, prefix, poppler_path):
-    images = convert_from_path(pdf_path, poppler_path=poppler_path)
-    image_paths = []
-    for i, image in enumerate(images):
-        img_path = os.path.join(save_dir, f"{prefix}_page_{i+1}.png")
-        image.save(img_path, 'PNG')
-        image_paths.append(img_path)
-    return image_paths
-
-def ocr_images(image_paths, enhance_prefix):
-    all_text = []
-    enhanced_paths = []
-    for idx, img_path in enumerate(image_paths):
-        # 확장자 강제 부여
-        enhance_name = f"{enhance_prefix}_page_{idx+1}.png"
-        enhanced_path, _ = enhance_image_for_ocr(img_path, enhance_name)
-        if not enhanced_path:
-            continue
-        enhanced_paths.append(enhanced_path)
-        results = reader.readtext(enhanced_path)
-        page_text = "\n".join([res[1] for res in results])
-        all_text.append(page_text)
-    return "\n".join(all_text), enhanced_paths
-
-@analysis_bp.route('/ocr', methods=['POST'])
-def ocr_process():
-    if 'registerFile' not in request.files or 'contractFile' not in request.files:
-        return jsonify({'error': '두 개의 파일(등기부등본, 계약서)이 모두 필요합니다.'}), 400
-
-    register_file = request.files['registerFile']
-    contract_file = request.files['contractFile']
-    
+def prepare_ocr_documents(register_file, contract_file):
+    """업로드된 두 파일을 OCR 입력 문서 목록으로 준비합니다. (디스크 모드에서는 uploads 폴더에 저장)"""
     # 파일 임시 저장
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
@@ -61,40 +45,62 @@ def ocr_process():
     contract_filename = f"{timestamp}_contract_{secure_filename(contract_file.filename)}"
     register_path = os.path.join(app.config['UPLOAD_FOLDER'], register_filename)
     contract_path = os.path.join(app.config['UPLOAD_FOLDER'], contract_filename)
-    register_file.save(register_path)
-    contract_file.save(contract_path)
-
-    reg_text = None
-    con_text = None
-    reg_enhanced_paths = []
-    con_enhanced_paths = []
-    reg_image_paths = [register_path]
-    con_image_paths = [contract_path]
-
-    if register_file.filename.lower().endswith('.pdf'):
-        reg_image_paths = save_pdf_as_images(register_path, app.config['UPLOAD_FOLDER'], "register", poppler_path)
-        reg_text, reg_enhanced_paths = ocr_images(reg_image_paths, f"enhanced_{register_filename}")
-    else:
-        enhanced_reg_path, _ = enhance_image_for_ocr(register_path, f"enhanced_{register_filename}")
-        reg_enhanced_paths = [enhanced_reg_path] if enhanced_reg_path else []
-        reg_results = reader.readtext(enhanced_reg_path)
-        reg_text = "\n".join([res[1] for res in reg_results])
-
-    if contract_file.filename.lower().endswith('.pdf'):
-        con_image_paths = save_pdf_as_images(contract_path, app.config['UPLOAD_FOLDER'], "contract", poppler_path)
-        con_text, con_enhanced_paths = ocr_images(con_image_paths, f"enhanced_{contract_filename}")
-    else:
-        enhanced_con_path, _ = enhance_image_for_ocr(contract_path, f"enhanced_{contract_filename}")
-        con_enhanced_paths = [enhanced_con_path] if enhanced_con_path else []
-        con_results = reader.readtext(enhanced_con_path)
-        con_text = "\n".join([res[1] for res in con_results])
 
+    render = {'mode': OCR_RENDER_MODE, 'text_pt': OCR_RENDER_TEXT_PT, 'text_px': OCR_RENDER_TEXT_PX,
+              'threads': OCR_RENDER_THREADS}
+    cascade = {'min_confidence': OCR_CASCADE_MIN_CONFIDENCE, 'page_ratio': OCR_CASCADE_PAGE_RATIO} if OCR_CASCADE else None
+    documents = [
+        {'name': 'register', 'path': register_path, 'filename': register_filename,
+         'is_pdf': register_file.filename.lower().endswith('.pdf'), 'text_layer': OCR_TEXT_LAYER,
+         'preprocess_profile': OCR_PREPROCESS_PROFILE, 'render': render, 'cascade': cascade,
+         'segmentation': OCR_SEGMENTATION},
+        {'name': 'contract', 'path': contract_path, 'filename': contract_filename,
+         'is_pdf': contract_file.filename.lower().endswith('.pdf'), 'text_layer': OCR_TEXT_LAYER,
+         'preprocess_profile': OCR_PREPROCESS_PROFILE, 'render': render, 'cascade': cascade,
+         'segmentation': OCR_SEGMENTATION, 'templates': form_templates},
+    ]
+    if OCR_IN_MEMORY:
+        # 메모리 모드: 업로드 바이트를 그대로 넘겨 디스크 입출력 없이 처리합니다.
+        documents[0]['data'] = register_file.read()
+        documents[1]['data'] = contract_file.read()
+    else:
+        register_file.save(register_path)
+        contract_file.save(contract_path)
+    return documents
+
+def run_ocr_analysis(documents, progress=None):
+    """
+    문서 OCR 과 Gemini 요약을 수행해 summary_text / clauses_text 를 담은 딕셔너리를 반환합니다.
+    /ocr 와 /ocr/jobs 가 함께 사용하며, 처리 후 업로드 원본과 중간 이미지 파일은 항상 삭제합니다.
+    progress(percent, message) 가 주어지면 단계별 진행 상황을 알립니다.
+    """
+    def report(percent, message):
+        if progress:
+            progress(percent, message)
+
+    cleanup_paths = [doc['path'] for doc in documents]
     try:
+        report(10, '문서 인식 중')
+        ocr_results = ocr_documents(reader, documents, app.config['UPLOAD_FOLDER'], poppler_path,
+                                    execution_mode=OCR_EXECUTION_MODE, max_workers=OCR_MAX_WORKERS,
+                                    streaming=OCR_STREAMING, queue_size=OCR_STREAM_QUEUE_SIZE, cache=ocr_cache,
+                                    batch_size=OCR_RECOG_BATCH_SIZE, broker=recognition_broker)
+        for result in ocr_results.values():
+            cleanup_paths += result['image_paths'] + result['enhanced_paths']
+
+        reg_text = ocr_results['register']['text']
+        con_text = ocr_results['contract']['text']
+        ocr_timings = {name: result['timings'] for name, result in ocr_results.items()}
+        ocr_page_stats = {name: result['page_stats'] for name, result in ocr_results.items()}
+        print(f"⏱️ 문서별 OCR 소요 시간({OCR_EXECUTION_MODE}): {ocr_timings}")
+
         # PDF/이미지 분기에서 이미 reg_text, con_text가 준비됨
         if not reg_text or not con_text:
             raise Exception("OCR 텍스트 추출 실패")
         # 이하 기존 Gemini 프롬프트 및 분석 로직...
-        if not model: return jsonify({'error': 'Gemini API가 초기화되지 않았습니다.'}), 500
+        if not model:
+            raise Exception("Gemini API가 초기화되지 않았습니다.")
+        report(60, '텍스트 정리 중')
 
         # 프롬프트
         prompt = f"""
@@ -168,31 +174,74 @@ def ocr_process():
             summary_part = full_corrected_text.strip()
             clauses_part = "특약사항 없음"
 
-        # 분리된 텍스트를 각각 JSON으로 반환
-        return jsonify({
+        report(100, '완료')
+        return {
             'summary_text': summary_part,
-            'clauses_text': clauses_part
-        })
+            'clauses_text': clauses_part,
+            'ocr_timings': ocr_timings,
+            'ocr_page_stats': ocr_page_stats,
+            'ocr_cache': ocr_cache.stats() if ocr_cache else None,
+            'ocr_broker': recognition_broker.stats() if recognition_broker else None
+        }
+
+    finally:
+        # 업로드 원본과 변환/전처리된 이미지들 삭제
+        for p in cleanup_paths:
+            if os.path.exists(p): os.remove(p)
+
+@analysis_bp.route('/ocr', methods=['POST'])
+def ocr_process():
+    if 'registerFile' not in request.files or 'contractFile' not in request.files:
+        return jsonify({'error': '두 개의 파일(등기부등본, 계약서)이 모두 필요합니다.'}), 400
+    if not model: return jsonify({'error': 'Gemini API가 초기화되지 않았습니다.'}), 500
+
+    documents = prepare_ocr_documents(request.files['registerFile'], request.files['contractFile'])
+    try:
+        # 분리된 텍스트를 각각 JSON으로 반환
+        return jsonify(run_ocr_analysis(documents))
 
     except Exception as e:
         print(f"OCR 처리 중 심각한 오류 발생: {e}")
         return jsonify({'error': f'서버 내부 오류 발생: {e}'}), 500
-    
-    finally:
-        # 변환된 이미지들 삭제
-        for p in reg_image_paths:
-            if os.path.exists(p): os.remove(p)
-        for p in con_image_paths:
-            if os.path.exists(p): os.remove(p)
-        for p in reg_enhanced_paths:
-            if os.path.exists(p): os.remove(p)
-        for p in con_enhanced_paths:
-            if os.path.exists(p): os.remove(p)
-        # 원본 PDF 파일도 삭제
-        if os.path.exists(register_path):
-            os.remove(register_path)
-        if os.path.exists(contract_path):
-            os.remove(contract_path)
+
+@analysis_bp.route('/ocr/jobs', methods=['POST'])
+def create_ocr_job():
+    """/ocr 와 같은 처리를 백그라운드 워커에 맡기고 작업 id 를 바로 반환합니다."""
+    if not ocr_jobs_enabled:
+        return jsonify({'error': '비동기 OCR 작업이 꺼져 있습니다. /ocr 를 사용해주세요.'}), 503
+    if 'registerFile' not in request.files or 'contractFile' not in request.files:
+        return jsonify({'error': '두 개의 파일(등기부등본, 계약서)이 모두 필요합니다.'}), 400
+    if not model: return jsonify({'error': 'Gemini API가 초기화되지 않았습니다.'}), 500
+
+    documents = prepare_ocr_documents(request.files['registerFile'], request.files['contractFile'])
+    try:
+        job_id = ocr_jobs.submit(run_ocr_analysis, documents)
+    except queue.Full:
+        for doc in documents:
+            if os.path.exists(doc['path']): os.remove(doc['path'])
+        return jsonify({'error': '현재 처리 대기 중인 문서가 많습니다. 잠시 후 다시 시도해주세요.'}), 503
+
+    print(f"📥 OCR 작업 등록: {job_id} ({ocr_jobs.stats()})")
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+@analysis_bp.route('/ocr/jobs/<job_id>', methods=['GET'])
+def get_ocr_job(job_id):
+    job = ocr_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+
+    response = {
+        'job_id': job_id,
+        'status': job['status'],
+        'progress': job['progress'],
+        'message': job['message'],
+        'queue_position': job['queue_position'],
+    }
+    if job['status'] == 'done':
+        response.update(job['result'])
+    elif job['status'] == 'failed':
+        response['error'] = f"서버 내부 오류 발생: {job['error']}"
+    return jsonify(response)
 
 @analysis_bp.route('/process-analysis', methods=['POST'])
 def process_analysis():
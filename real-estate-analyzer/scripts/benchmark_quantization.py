@@ -0,0 +1,115 @@
+"""
+인식 모델 양자화 방식별 정확도/속도 비교 스크립트
+
+라벨이 달린 줄 이미지 폴더에서 양자화 방식(none/dynamic/static)마다
+줄당 평균 인식 시간과 문자 정확도(1 - CER)를 측정해 표로 출력합니다.
+static 은 평가 이미지와 겹치지 않는 별도 보정 폴더(--calibration)가 있어야 합니다.
+(평가할 이미지로 보정하면 정확도가 실제보다 좋게 나옵니다)
+
+폴더 구성 (EasyOCR 학습 데이터 형식과 동일)
+    crops/
+      labels.csv      # filename,words
+      0001.png
+      0002.png
+      ...
+
+실행 (real-estate-analyzer 폴더에서)
+    python scripts/benchmark_quantization.py --crops crops/ --modes none,dynamic
+    python scripts/benchmark_quantization.py --crops crops/ --modes dynamic,static --calibration calib/
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.ocr_models import create_reader, QUANTIZATION_MODES  # noqa: E402
+
+def load_labels(crops_dir, labels_path=None):
+    labels_path = labels_path or os.path.join(crops_dir, 'labels.csv')
+    with open(labels_path, encoding='utf-8') as f:
+        return [(row['filename'], row['words']) for row in csv.DictReader(f)]
+
+def character_error_rate(prediction, label):
+    """편집 거리 기반 문자 오류율 (CER)"""
+    if not label:
+        return 0.0 if not prediction else 1.0
+    prev = list(range(len(prediction) + 1))
+    for i, lc in enumerate(label, 1):
+        cur = [i] + [0] * len(prediction)
+        for j, pc in enumerate(prediction, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (lc != pc))
+        prev = cur
+    return prev[-1] / len(label)
+
+def evaluate(reader, samples, warmup=3):
+    """줄 이미지마다 검출 없이 인식만 수행해 평균 시간(ms)과 평균 CER 을 구합니다."""
+    for _, gray, _ in samples[:warmup]:
+        reader.recognize(gray)
+
+    elapsed = 0.0
+    total_cer = 0.0
+    exact = 0
+    for _, gray, label in samples:
+        started = time.perf_counter()
+        results = reader.recognize(gray, detail=1)
+        elapsed += time.perf_counter() - started
+        prediction = results[0][1] if results else ''
+        total_cer += character_error_rate(prediction, label)
+        exact += prediction == label
+    count = len(samples)
+    return {
+        'ms_per_line': elapsed / count * 1000,
+        'char_accuracy': 1 - total_cer / count,
+        'exact_match': exact / count,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='인식 모델 양자화 방식별 정확도/속도 비교')
+    parser.add_argument('--crops', required=True, help='라벨이 달린 줄 이미지 폴더')
+    parser.add_argument('--labels', help='라벨 파일 경로 (기본: <crops>/labels.csv)')
+    parser.add_argument('--modes', default=','.join(QUANTIZATION_MODES), help='비교할 양자화 방식 (쉼표 구분)')
+    parser.add_argument('--calibration', help='정적 양자화 보정용 줄 이미지 폴더 (static 필수, --crops 와 다른 폴더)')
+    parser.add_argument('--limit', type=int, default=None, help='평가할 최대 이미지 수')
+    parser.add_argument('--threads', type=int, default=None, help='torch 스레드 수')
+    args = parser.parse_args()
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    if 'static' in modes:
+        if not args.calibration:
+            parser.error("static 은 평가 이미지와 다른 보정 폴더가 필요합니다. (--calibration)")
+        if os.path.realpath(args.calibration) == os.path.realpath(args.crops):
+            parser.error("--calibration 은 --crops 와 다른 폴더여야 합니다. (평가 이미지로 보정하면 결과가 좋게 치우칩니다)")
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    samples = []
+    for filename, label in load_labels(args.crops, args.labels):
+        gray = cv2.imread(os.path.join(args.crops, filename), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            print(f"⚠️ 이미지를 읽을 수 없습니다: {filename}")
+            continue
+        samples.append((filename, gray, label))
+        if args.limit and len(samples) >= args.limit:
+            break
+    if not samples:
+        print("❌ 평가할 이미지가 없습니다.")
+        return
+    print(f"평가 이미지 {len(samples)}장")
+
+    rows = []
+    for mode in modes:
+        reader = create_reader(quantization=mode, calibration_dir=args.calibration, detector=False)
+        rows.append((mode, evaluate(reader, samples)))
+
+    baseline = rows[0][1]['ms_per_line']
+    print(f"\n{'mode':<10}{'ms/line':>10}{'speedup':>10}{'char acc':>11}{'exact':>9}")
+    for mode, result in rows:
+        print(f"{mode:<10}{result['ms_per_line']:>10.2f}{baseline / result['ms_per_line']:>9.2f}x"
+              f"{result['char_accuracy'] * 100:>10.2f}%{result['exact_match'] * 100:>8.1f}%")
+
+if __name__ == '__main__':
+    main()
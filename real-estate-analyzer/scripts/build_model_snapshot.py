@@ -0,0 +1,43 @@
+"""
+검출(CRAFT)/인식(finetuned) 모델 가중치를 메모리 매핑용 스냅샷으로 미리 만들어 두는 스크립트 (Docker 빌드 단계에서 실행)
+
+<model_dir>/snapshot/ 아래에
+- detector.pt, recognizer.pt : fp32 state_dict (torch zip 형식, torch.load(mmap=True) 로 복사 없이 매핑)
+- manifest.json              : 원본 가중치 파일의 크기/수정 시각과 torch 버전
+를 만듭니다. 서버는 OCR_MODEL_SNAPSHOT=true(기본)일 때 이 스냅샷을 쓰고, 원본이 바뀌었으면 기존 방식으로 불러옵니다.
+
+실행 (real-estate-analyzer 폴더에서)
+    python scripts/build_model_snapshot.py
+    python scripts/build_model_snapshot.py --model-dir .EasyOCR/model --output .EasyOCR/model/snapshot
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.ocr_models import MODEL_STORAGE_DIR, SNAPSHOT_DIRNAME, build_model_snapshot, reader_from_snapshot  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description='OCR 모델 가중치 mmap 스냅샷 만들기')
+    parser.add_argument('--model-dir', default=MODEL_STORAGE_DIR, help='원본 가중치 폴더 (craft_mlt_25k.pth, finetuned.pth)')
+    parser.add_argument('--output', help='스냅샷 폴더 (기본: <model-dir>/snapshot)')
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(args.model_dir, SNAPSHOT_DIRNAME)
+    manifest = build_model_snapshot(args.model_dir, output)
+    if not manifest['models']:
+        print("🚨 스냅샷으로 만들 가중치가 없습니다.")
+        sys.exit(1)
+    for name, entry in manifest['models'].items():
+        size = os.path.getsize(os.path.join(output, entry['file']))
+        print(f"✅ {name}: {entry['source']} → {entry['file']} ({size / 1024 / 1024:.1f}MB)")
+
+    # 만든 스냅샷을 서버와 같은 방식으로 매핑해 봅니다.
+    started = time.perf_counter()
+    reader_from_snapshot(output, manifest, 'detector' in manifest['models'], 'recognizer' in manifest['models'],
+                         quantize=False, model_storage_directory=args.model_dir)
+    print(f"⏱️ 스냅샷 매핑 확인: {time.perf_counter() - started:.2f}초 (경로: {output})")
+
+if __name__ == '__main__':
+    main()
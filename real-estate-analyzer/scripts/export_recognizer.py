@@ -0,0 +1,91 @@
+"""
+finetuned 인식 모델을 TorchScript / ONNX 그래프로 내보내는 스크립트
+
+finetuned.pth 를 fp32 로 불러와 VGG 합성곱 스택의 Conv+BatchNorm 을 하나의 Conv 로 합친 뒤
+- <model_dir>/finetuned.torchscript.pt : trace 후 freeze 한 TorchScript 그래프
+- <model_dir>/finetuned.onnx           : 배치/너비가 가변인 ONNX 그래프
+를 만들고, 원래 모델과 출력이 같은지 확인합니다.
+만든 파일은 OCR_RECOG_BACKEND=torchscript / onnx 로 사용합니다.
+
+실행 (real-estate-analyzer 폴더에서, ONNX 내보내기에는 pip install -r requirements-export.txt 필요)
+    python scripts/export_recognizer.py
+    python scripts/export_recognizer.py --formats onnx --model-dir .EasyOCR/model
+"""
+import argparse
+import os
+import sys
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.ocr_models import (  # noqa: E402
+    MODEL_STORAGE_DIR, RECOG_IMG_H, TORCHSCRIPT_FILENAME, ONNX_FILENAME,
+    RecognizerGraph, load_finetuned_model, fold_conv_bn, load_recognizer_backend,
+)
+
+def sample_inputs(widths=(128, 256, 512), batch=2):
+    """서로 다른 너비의 줄 이미지 입력 (EasyOCR 과 같은 [-1, 1] 범위)"""
+    generator = torch.Generator().manual_seed(0)
+    return [torch.rand(batch, 1, RECOG_IMG_H, width, generator=generator) * 2 - 1 for width in widths]
+
+def export_torchscript(graph, path):
+    example = sample_inputs()[0]
+    with torch.no_grad():
+        traced = torch.jit.trace(graph, example, check_trace=False)
+    frozen = torch.jit.freeze(traced)
+    frozen.save(path)
+
+def export_onnx(graph, path, opset=17):
+    example = sample_inputs()[0]
+    with torch.no_grad():
+        torch.onnx.export(
+            graph, (example,), path,
+            input_names=['image'], output_names=['logits'],
+            dynamic_axes={'image': {0: 'batch', 3: 'width'}, 'logits': {0: 'batch', 1: 'steps'}},
+            opset_version=opset,
+            dynamo=False,
+        )
+
+def check_parity(reference, backend, model_dir, tolerance=1e-3):
+    """내보낸 그래프와 원래 모델의 출력 차이와 argmax(디코딩 결과) 일치 여부를 확인합니다."""
+    exported = load_recognizer_backend(backend, model_dir)
+    ok = True
+    with torch.no_grad():
+        for inputs in sample_inputs():
+            expected = reference(inputs, None)
+            actual = exported(inputs)
+            max_diff = (expected - actual).abs().max().item()
+            same_argmax = torch.equal(expected.argmax(2), actual.argmax(2))
+            ok = ok and max_diff <= tolerance and same_argmax
+            print(f"  {backend:<12} width={inputs.shape[3]:<5} max|diff|={max_diff:.2e} argmax 일치={same_argmax}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='finetuned 인식 모델을 TorchScript / ONNX 로 내보내기')
+    parser.add_argument('--model-dir', default=MODEL_STORAGE_DIR, help='finetuned.pth 가 있는 폴더 (결과도 여기에 저장)')
+    parser.add_argument('--formats', default='torchscript,onnx', help='내보낼 형식 (쉼표 구분)')
+    parser.add_argument('--opset', type=int, default=17, help='ONNX opset 버전')
+    args = parser.parse_args()
+
+    reference = load_finetuned_model(args.model_dir)
+    graph = RecognizerGraph(fold_conv_bn(load_finetuned_model(args.model_dir))).eval()
+
+    ok = True
+    for backend in [f.strip() for f in args.formats.split(',') if f.strip()]:
+        if backend == 'torchscript':
+            path = os.path.join(args.model_dir, TORCHSCRIPT_FILENAME)
+            export_torchscript(graph, path)
+        elif backend == 'onnx':
+            path = os.path.join(args.model_dir, ONNX_FILENAME)
+            export_onnx(graph, path, args.opset)
+        else:
+            print(f"⚠️ 지원하지 않는 형식입니다: {backend}")
+            continue
+        print(f"✅ {backend} 저장: {path}")
+        ok = check_parity(reference, backend, args.model_dir) and ok
+
+    if not ok:
+        print("❌ 원래 모델과 출력이 다릅니다. 내보낸 파일을 사용하지 마세요.")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
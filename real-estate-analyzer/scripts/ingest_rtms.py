@@ -0,0 +1,114 @@
+"""
+국토교통부 RTMS 실거래(매매/전월세) 이력을 미리 받아 로컬 저장소(rtms_store)에 넣는 일괄 수집 스크립트
+
+저장해 둔 구(LAWD_CD)는 시세 추정(estimate_price)이 API 대신 로컬 저장소에서 바로 읽습니다.
+- 이미 받은 달은 건너뛰므로 중간에 멈춰도 같은 명령으로 이어서 받고, 기간 끝을 이번 달로 두면 새 달만 더 받습니다.
+- 이번 달/전달은 RTMS_STORE_TTL 이 지나면 다시 받습니다. (--force 면 기간 전체를 다시 받음)
+- --schedule: 최근 많이 조회된 구/건물 유형을 주기적으로 갱신합니다. (--once 면 한 번만, cron 용)
+- 로컬 테스트: scripts/rtms_stub_server.py 를 띄우고 RTMS_BASE_URL 을 그 주소로 지정합니다.
+
+실행 (real-estate-analyzer 폴더에서)
+    python scripts/ingest_rtms.py --lawd-cd 11110 11680 --start 202001
+    python scripts/ingest_rtms.py --region "서울특별시 강남구" --building-types 아파트 --log-types trade --concurrency 16 --rate 20
+    python scripts/ingest_rtms.py --schedule --top 20 --interval-hours 6
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from estimator import median_price  # noqa: E402
+from estimator.ingest import ingest_district, month_range  # noqa: E402
+from estimator.rtms_client import RTMSClient  # noqa: E402
+
+def ingest(targets, months, client, force=False):
+    """[(LAWD_CD, [건물 유형], 거래 유형)] 을 차례로 수집하고 전체 집계를 출력합니다."""
+    total = {'fetched': 0, 'skipped': 0, 'failed': 0, 'rows': 0}
+    started = time.perf_counter()
+    for lawd_cd, building_types, log_type in targets:
+        t = time.perf_counter()
+        summary = ingest_district(lawd_cd, building_types, log_type, months, client=client, force=force)
+        for key in total:
+            total[key] += summary[key]
+        print(f"📄 {lawd_cd} {'/'.join(building_types)} {log_type}: 받은 달 {summary['fetched']}, 건너뜀 {summary['skipped']}, "
+              f"실패 {summary['failed']}, 거래 {summary['rows']}건 ({time.perf_counter() - t:.1f}초)")
+    stats = client.stats()
+    print(f"✅ 수집 완료: 받은 달 {total['fetched']}, 건너뜀 {total['skipped']}, 실패 {total['failed']}, 거래 {total['rows']}건, "
+          f"API 호출 {stats['requests']}회 (오류 {stats['errors']}), {time.perf_counter() - started:.1f}초")
+    if total['failed']:
+        print("⚠️ 실패한 달은 같은 명령을 다시 실행하면 이어서 받습니다.")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description='RTMS 실거래 이력 일괄 수집')
+    parser.add_argument('--lawd-cd', nargs='*', default=[], help='5자리 법정동 코드(LAWD_CD) 목록')
+    parser.add_argument('--region', nargs='*', default=[], help='시/도 + 시/군/구 이름 목록 (예: "서울특별시 종로구")')
+    parser.add_argument('--building-types', nargs='+', default=list(median_price.API_TYPES), choices=list(median_price.API_TYPES))
+    parser.add_argument('--log-types', nargs='+', default=['trade', 'rent'], choices=['trade', 'rent'])
+    parser.add_argument('--start', help='시작 달 YYYYMM (기본: 끝 달부터 MAX_LOOKBACK_MONTHS 개월 전)')
+    parser.add_argument('--end', help='끝 달 YYYYMM (기본: 이번 달)')
+    parser.add_argument('--force', action='store_true', help='저장된 달도 다시 받기')
+    parser.add_argument('--concurrency', type=int, default=median_price.RTMS_MAX_CONCURRENCY, help='동시 호출 수')
+    parser.add_argument('--rate', type=float, default=median_price.RTMS_RATE_PER_SEC, help='초당 최대 호출 수')
+    parser.add_argument('--burst', type=int, default=median_price.RTMS_RATE_BURST, help='순간 최대 호출 수')
+    parser.add_argument('--schedule', action='store_true', help='많이 조회된 구를 주기적으로 갱신')
+    parser.add_argument('--top', type=int, default=20, help='--schedule 에서 갱신할 (구, 건물 유형, 거래 유형) 수')
+    parser.add_argument('--days', type=int, default=30, help='--schedule 에서 조회 수를 셀 최근 일수')
+    parser.add_argument('--interval-hours', type=float, default=6, help='--schedule 갱신 주기')
+    parser.add_argument('--once', action='store_true', help='--schedule 을 한 번만 실행 (cron 용)')
+    args = parser.parse_args()
+    if args.rate <= 0:
+        parser.error("--rate 는 0보다 커야 합니다.")
+
+    store = median_price.deal_store
+    if store is None:
+        print("🚨 RTMS 로컬 저장소가 꺼져 있습니다. (RTMS_STORE_ENABLED=true 로 실행하세요)")
+        sys.exit(1)
+    client = RTMSClient(args.concurrency, args.rate, args.burst)
+    print(f"RTMS 수집: 동시 {args.concurrency}, 초당 {args.rate:g}회 (API: {median_price.RTMS_BASE_URL}, 저장소: {median_price.RTMS_STORE_PATH})")
+
+    lawd_cds = list(args.lawd_cd)
+    for region in args.region:
+        code = median_price.get_region_prefix(region)
+        if code is None:
+            print(f"🚨 법정동 코드를 찾을 수 없습니다: {region}")
+            sys.exit(1)
+        lawd_cds.append(code)
+    if not lawd_cds and not args.schedule:
+        parser.error('--lawd-cd, --region, --schedule 중 하나가 필요합니다.')
+
+    try:
+        if not args.schedule:
+            ingest([(lawd_cd, args.building_types, log_type) for lawd_cd in lawd_cds for log_type in args.log_types],
+                   target_months(args), client, args.force)
+            return
+        while True:
+            top = store.top_queried(args.top, args.days)
+            if top:
+                print(f"⏱️ 최근 {args.days}일 조회 상위 {len(top)}개 갱신")
+                ingest([(lawd_cd, [building_type], log_type) for building_type, log_type, lawd_cd, _ in top],
+                       target_months(args), client, args.force)
+            else:
+                print("📋 조회 기록이 없어 갱신할 구가 없습니다.")
+            if args.once:
+                return
+            time.sleep(args.interval_hours * 3600)
+    except KeyboardInterrupt:
+        client.shutdown()
+        print("⚠️ 중단했습니다. 같은 명령을 다시 실행하면 받은 달은 건너뛰고 이어서 받습니다.")
+        sys.exit(130)
+
+def target_months(args):
+    """수집할 달 목록 (오래된 순). 끝 달을 정하지 않으면 실행할 때마다 이번 달까지로 다시 계산합니다."""
+    end = args.end or median_price.recent_months(1)[0]
+    if args.start:
+        months = month_range(args.start, end)
+    else:
+        months = sorted(median_price.recent_months(median_price.MAX_LOOKBACK_MONTHS, datetime.strptime(end, '%Y%m')))
+    print(f"📋 수집 기간: {months[0]} ~ {months[-1]} ({len(months)}개월)")
+    return months
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+시세 추정에 쓰는 법정동 코드 표(estimator/data/lawd_codes.csv)를 갱신하는 스크립트
+
+시/도 + 시/군/구 이름과 5자리 LAWD_CD 만 남긴 작은 CSV 를 만듭니다. (표에 있는 지역은 API 호출 없이 조회)
+- --from-file: 행정표준코드관리시스템(code.go.kr)에서 받은 '법정동코드 전체자료' 텍스트 파일
+- --from-api : 행정안전부 법정동코드(StanReginCd) API (.env 의 SERVICEKEY 사용, 약 50회 호출)
+
+실행 (real-estate-analyzer 폴더에서)
+    python scripts/refresh_region_codes.py --from-file "법정동코드 전체자료.txt"
+    python scripts/refresh_region_codes.py --from-api
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from estimator.region_codes import (  # noqa: E402
+    REGION_CODE_PATH, RegionCodeIndex, rows_from_api, rows_from_code_file, write_code_table,
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='법정동 코드 표 갱신')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--from-file', help="'법정동코드 전체자료' 텍스트 파일 경로")
+    source.add_argument('--from-api', action='store_true', help='StanReginCd API 에서 받기')
+    parser.add_argument('--output', default=REGION_CODE_PATH, help='출력 CSV 경로')
+    args = parser.parse_args()
+
+    load_dotenv()
+    rows = rows_from_code_file(args.from_file) if args.from_file else rows_from_api()
+    if not rows:
+        print("🚨 시/군/구 코드를 하나도 찾지 못했습니다. 표를 바꾸지 않습니다.")
+        sys.exit(1)
+
+    before = len(RegionCodeIndex.load(args.output)) if os.path.exists(args.output) else 0
+    count = write_code_table(rows, args.output)
+    print(f"✅ 법정동 코드 표 갱신: {before}개 → {count}개 (경로: {args.output})")
+
+if __name__ == '__main__':
+    main()
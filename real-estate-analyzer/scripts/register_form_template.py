@@ -0,0 +1,148 @@
+"""
+양식 템플릿 등록(보정) 스크립트
+
+빈 양식 또는 작성된 계약서의 기준 스캔 한 장으로 템플릿의 선 서명(signature)과
+필드 박스를 계산해 템플릿 JSON 에 기록합니다. 서명이 없는 템플릿은 매칭에 쓰이지 않습니다.
+템플릿 JSON 이 아직 없으면 주택임대차표준계약서 필드 목록(STANDARD_LEASE_FIELDS)으로 새로 만들고,
+form_templates/ 폴더가 없으면 함께 만듭니다. 저장소에는 보정된 템플릿이 들어 있지 않으므로
+이 스크립트로 기준 스캔을 한 번 등록하기 전에는 OCR_FORM_TEMPLATES=true 여도 양식 인식은 동작하지 않습니다.
+특약사항(multiline) 필드는 적중한 페이지에서 그 영역만 줄 검출 후 인식하는 자유 기재 영역입니다.
+
+필드 박스는 두 가지 방법으로 정할 수 있습니다.
+- 자동: 기준 스캔을 OCR 해 각 필드의 라벨(예: '보증금')을 찾고, 라벨 오른쪽에서
+  다음 세로선까지를 값 영역으로 잡습니다. multiline 필드는 라벨 아래에서 다음 가로선까지입니다.
+- 수동: --boxes 로 {"필드 name": [x0, y0, x1, y1]} (기울기 보정된 기준 스캔의 픽셀 좌표) 를 넘깁니다.
+  자동으로 찾은 박스보다 우선합니다.
+
+실행 (real-estate-analyzer 폴더에서)
+    python scripts/register_form_template.py --template form_templates/housing_lease_standard.json --reference lease_p1.png
+    python scripts/register_form_template.py --template form_templates/housing_lease_standard.json --reference lease_p1.png --boxes boxes.json
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.form_templates import line_masks, line_signature, SIGNATURE_WIDTH  # noqa: E402
+from utils.image_processor import enhance_image_for_ocr  # noqa: E402
+
+# 주택임대차표준계약서 필드 목록 (search: 라벨과 다르게 쓰인 양식 문구)
+STANDARD_LEASE_FIELDS = [
+    {"name": "address", "label": "소재지"},
+    {"name": "deposit", "label": "보증금"},
+    {"name": "down_payment", "label": "계약금"},
+    {"name": "middle_payment", "label": "중도금"},
+    {"name": "balance", "label": "잔금"},
+    {"name": "monthly_rent", "label": "차임(월세)", "search": "차임"},
+    {"name": "management_fee", "label": "관리비"},
+    {"name": "lease_period", "label": "임대차기간"},
+    {"name": "lessor", "label": "임대인"},
+    {"name": "lessee", "label": "임차인"},
+    {"name": "special_terms", "label": "특약사항", "multiline": True},
+]
+
+def load_template(path):
+    """템플릿 JSON 을 읽습니다. 없으면 파일 이름을 템플릿 이름으로 하는 주택임대차표준계약서 템플릿을 만듭니다."""
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    print(f"📄 {path} 가 없어 주택임대차표준계약서 필드로 새 템플릿을 만듭니다.")
+    return {
+        'name': os.path.splitext(os.path.basename(path))[0],
+        'title': '주택임대차표준계약서',
+        'min_score': 0.7,
+        'fields': [dict(field, box=None) for field in STANDARD_LEASE_FIELDS],
+        'signature': None,
+    }
+
+def _compact(text):
+    return ''.join(text.split())
+
+def find_label(results, label):
+    """OCR 결과에서 라벨을 포함하는 가장 짧은 박스를 찾습니다. ([x0, y0, x1, y1] 또는 None)"""
+    target = _compact(label)
+    candidates = [(len(_compact(text)), box) for box, text, _ in results if target in _compact(text)]
+    if not candidates:
+        return None
+    _, box = min(candidates, key=lambda item: item[0])
+    xs = [int(x) for x, _ in box]
+    ys = [int(y) for _, y in box]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+def value_box(label_box, gray, multiline=False, gap=6):
+    """라벨 위치와 표 선을 기준으로 값 영역을 추정합니다."""
+    horizontal, vertical = line_masks(gray)
+    h, w = gray.shape[:2]
+    factor = w / float(SIGNATURE_WIDTH)
+    x0, y0, x1, y1 = label_box
+
+    if multiline:
+        # 라벨 아래부터 다음 가로선까지 (표 안쪽 전체 폭)
+        rows = np.flatnonzero(horizontal.sum(axis=1) > 0.3 * 255 * horizontal.shape[1]) * factor
+        below = [y for y in rows if y > y1 + gap + 0.1 * h]
+        cols = np.flatnonzero(vertical.sum(axis=0) > 0) * factor
+        left = cols.min() if cols.size else 0
+        right = cols.max() if cols.size else w
+        return [int(left + gap), int(y1 + gap), int(right - gap), int(below[0] - gap) if below else h]
+
+    # 라벨이 있는 행 범위에서 라벨 오른쪽의 첫 세로선까지
+    band = vertical[int(y0 / factor):max(int(y1 / factor), int(y0 / factor) + 1)]
+    cols = np.flatnonzero(band.sum(axis=0) > 0) * factor
+    right = [x for x in cols if x > x1 + gap * 4]
+    return [int(x1 + gap), int(y0 - gap), int(right[0] - gap) if right else w, int(y1 + gap)]
+
+def main():
+    parser = argparse.ArgumentParser(description='기준 스캔으로 양식 템플릿의 선 서명과 필드 박스 등록')
+    parser.add_argument('--template', required=True, help='수정할 템플릿 JSON 경로 (없으면 새로 만듦)')
+    parser.add_argument('--reference', required=True, help='기준 스캔 이미지')
+    parser.add_argument('--boxes', help='필드별 박스 JSON (기울기 보정된 기준 스캔 픽셀 좌표)')
+    parser.add_argument('--output', help='결과 저장 경로 (기본: --template 덮어쓰기)')
+    args = parser.parse_args()
+
+    template = load_template(args.template)
+    _, deskewed = enhance_image_for_ocr(args.reference, None, profile='fast')
+    if deskewed is None:
+        sys.exit(1)
+    gray = deskewed if deskewed.ndim == 2 else cv2.cvtColor(deskewed, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape[:2]
+
+    manual = {}
+    if args.boxes:
+        with open(args.boxes, encoding='utf-8') as f:
+            manual = json.load(f)
+
+    results = []
+    if any(field['name'] not in manual for field in template['fields']):
+        from utils.ocr_models import create_reader
+        results = create_reader().readtext(gray)
+
+    for field in template['fields']:
+        box = manual.get(field['name'])
+        if box is None:
+            label_box = find_label(results, field.get('search', field['label']))
+            if label_box is None:
+                print(f"⚠️ '{field['label']}' 라벨을 찾지 못했습니다. (--boxes 로 직접 지정하세요)")
+                field['box'] = None
+                continue
+            box = value_box(label_box, gray, field.get('multiline', False))
+        field['box'] = [round(box[0] / w, 4), round(box[1] / h, 4), round(box[2] / w, 4), round(box[3] / h, 4)]
+        print(f"✅ {field['label']}: {box}")
+
+    signature = line_signature(gray)
+    template['signature'] = {key: [round(float(v), 4) for v in values] for key, values in signature.items()}
+    template['calibrated_from'] = os.path.basename(args.reference)
+    template['calibrated_at'] = date.today().isoformat()
+
+    output = args.output or args.template
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(template, f, ensure_ascii=False, indent=2)
+    found = sum(1 for field in template['fields'] if field.get('box'))
+    print(f"✅ 템플릿 저장: {output} (필드 {found}/{len(template['fields'])}개)")
+
+if __name__ == '__main__':
+    main()
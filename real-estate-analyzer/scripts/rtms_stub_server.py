@@ -0,0 +1,103 @@
+"""
+국토교통부 RTMS API 를 흉내 내는 로컬 스텁 서버 (기록해 둔 XML 응답을 그대로 돌려줌)
+
+<data-dir>/<서비스 이름>/<LAWD_CD>_<DEAL_YMD>_<pageNo>.xml 파일이 있으면 그 내용을, 없으면 404 를 돌려줍니다.
+(404 는 클라이언트에서 오류로 처리되어 저장소에 빈 달로 남지 않습니다. 거래 0건 응답이 필요하면 --empty-missing)
+--record 를 주면 없는 응답은 실제 API(.env 의 SERVICEKEY)에서 받아 같은 경로에 저장한 뒤 돌려줍니다.
+서버 쪽 코드는 RTMS_BASE_URL 을 이 서버 주소로 지정하면 실제 API 대신 이 서버를 호출합니다.
+
+실행 (real-estate-analyzer 폴더에서)
+    python scripts/rtms_stub_server.py --data-dir rtms_stub --port 8089
+    python scripts/rtms_stub_server.py --data-dir rtms_stub --record
+    RTMS_BASE_URL=http://127.0.0.1:8089 python scripts/ingest_rtms.py --lawd-cd 11110 --start 202401
+"""
+import argparse
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from dotenv import load_dotenv
+
+UPSTREAM_URL = 'http://apis.data.go.kr/1613000'
+EMPTY_RESPONSE = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?><response><header><resultCode>000</resultCode>'
+    '<resultMsg>OK</resultMsg></header><body><items></items><numOfRows>{rows}</numOfRows><pageNo>{page}</pageNo>'
+    '<totalCount>0</totalCount></body></response>'
+)
+
+def recording_path(data_dir, path, params):
+    """요청 경로(/RTMSDataSvcAptTrade/getRTMSDataSvcAptTrade)와 LAWD_CD/DEAL_YMD/pageNo 로 기록 파일 경로를 만듭니다."""
+    service = path.strip('/').split('/')[0]
+    name = f"{params.get('LAWD_CD', '')}_{params.get('DEAL_YMD', '')}_{params.get('pageNo', '1')}.xml"
+    return os.path.join(data_dir, service, name)
+
+def make_handler(data_dir, record=False, latency=0.0, empty_missing=False):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            file_path = recording_path(data_dir, url.path, params)
+            if latency:
+                time.sleep(latency)
+
+            status, content_type = 200, 'application/xml; charset=utf-8'
+            if os.path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    body = f.read()
+            elif record:
+                body = self._record(url.path, params, file_path)
+            elif empty_missing:
+                body = EMPTY_RESPONSE.format(rows=params.get('numOfRows', '1000'), page=params.get('pageNo', '1')).encode('utf-8')
+            else:
+                status, content_type = 404, 'text/plain; charset=utf-8'
+                body = f"기록된 응답이 없습니다: {file_path}".encode('utf-8')
+
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _record(self, path, params, file_path):
+            """실제 API 에서 받아 정상 응답(resultCode 000)이면 저장합니다."""
+            params = dict(params, serviceKey=params.get('serviceKey') or os.getenv('SERVICEKEY'))
+            body = requests.get(f"{UPSTREAM_URL}{path}", params=params, timeout=30).content
+            if b'<resultCode>000</resultCode>' in body:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, 'wb') as f:
+                    f.write(body)
+                print(f"📄 기록: {file_path}")
+            else:
+                print(f"⚠️ 정상 응답이 아니어서 기록하지 않습니다: {path} {params.get('LAWD_CD')} {params.get('DEAL_YMD')}")
+            return body
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+def main():
+    parser = argparse.ArgumentParser(description='RTMS API 로컬 스텁 서버')
+    parser.add_argument('--data-dir', default='rtms_stub', help='기록된 XML 응답 폴더')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--record', action='store_true', help='없는 응답은 실제 API 에서 받아 기록')
+    parser.add_argument('--empty-missing', action='store_true',
+                        help='기록이 없는 요청에 404 대신 거래 0건 정상 응답 (그 달이 빈 달로 저장되므로 테스트용 저장소에서만)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='응답마다 넣을 지연 (네트워크 흉내)')
+    args = parser.parse_args()
+
+    load_dotenv()
+    handler = make_handler(args.data_dir, args.record, args.latency_ms / 1000.0, args.empty_missing)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"✅ RTMS 스텁 서버 실행: http://{args.host}:{args.port} (기록 폴더: {args.data_dir}, 기록 모드: {args.record})")
+    print(f"   RTMS_BASE_URL=http://{args.host}:{args.port} 로 지정해 사용하세요.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
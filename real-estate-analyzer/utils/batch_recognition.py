@@ -0,0 +1,61 @@
+import time
+from collections import defaultdict
+from easyocr.recognition import get_text # type: ignore
+from easyocr.utils import get_image_list, reformat_input # type: ignore
+
+from utils.ocr_models import RECOG_IMG_H
+from utils.line_segmentation import segment_text_lines
+
+# 인식 모델 한 번 호출에 넣을 최대 줄 이미지 수
+RECOG_BATCH_SIZE = 16
+
+def line_crops(img_cv_grey, horizontal_list, free_list):
+    """
+    검출 박스마다 인식기 입력 높이로 맞춘 줄 이미지를 [(박스, 줄 이미지, 패딩 폭)] 으로 반환합니다.
+    EasyOCR 이 CPU 에서 박스를 하나씩 인식할 때처럼 get_image_list 를 박스 하나씩 호출하므로
+    패딩 폭(인식기 높이의 배수)과 박스 순서가 reader.recognize 와 같습니다.
+    """
+    crops = []
+    for h_list, f_list in [([box], []) for box in horizontal_list] + [([], [box]) for box in free_list]:
+        image_list, max_width = get_image_list(h_list, f_list, img_cv_grey, model_height=RECOG_IMG_H)
+        crops += [(box, crop, int(max_width)) for box, crop in image_list]
+    return crops
+
+def page_line_crops(reader, image, segmentation=None, timings=None):
+    """
+    전처리된 페이지(배열 또는 저장 경로)에서 줄 박스를 검출해 줄 이미지 목록을 만듭니다. (인식은 하지 않음)
+    segmentation 이 'projection' 이고 투영 분할 품질이 괜찮으면 CRAFT 검출을 건너뜁니다.
+    (줄 이미지 목록, 투영 분할 사용 여부) 를 반환하며 timings 에 segment / detect 시간을 채웁니다.
+    """
+    timings = timings if timings is not None else {}
+    img, img_cv_grey = reformat_input(image)
+    if segmentation == 'projection':
+        started = time.perf_counter()
+        boxes, _ = segment_text_lines(img_cv_grey)
+        timings['segment'] = round(time.perf_counter() - started, 4)
+        if boxes:
+            return line_crops(img_cv_grey, boxes, []), True
+    started = time.perf_counter()
+    horizontal_list, free_list = reader.detect(img, reformat=False)
+    timings['detect'] = round(time.perf_counter() - started, 4)
+    return line_crops(img_cv_grey, horizontal_list[0], free_list[0]), False
+
+def recognize_crops(reader, crops, batch_size=RECOG_BATCH_SIZE):
+    """
+    여러 페이지에서 모은 줄 이미지를 패딩 폭이 같은 것끼리 묶어 큰 배치로 인식합니다.
+    같은 묶음 안에서는 패딩이 늘지 않으므로 한 줄씩 인식할 때와 입력이 같고, 모델 호출 횟수만 줄어듭니다.
+    결과는 crops 와 같은 순서의 (박스, 텍스트, 신뢰도) 목록이며, 묶음 수도 함께 반환합니다.
+    """
+    ignore_char = ''.join(set(reader.character) - set(reader.lang_char))
+    buckets = defaultdict(list)
+    for idx, (_, _, width) in enumerate(crops):
+        buckets[width].append(idx)
+
+    results = [None] * len(crops)
+    for width, indices in sorted(buckets.items()):
+        recognized = get_text(reader.character, RECOG_IMG_H, width, reader.recognizer, reader.converter,
+                              [(crops[idx][0], crops[idx][1]) for idx in indices], ignore_char,
+                              batch_size=batch_size, workers=0, device=reader.device)
+        for idx, result in zip(indices, recognized):
+            results[idx] = result
+    return results, len(buckets)
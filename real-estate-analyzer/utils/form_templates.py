@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import cv2
+import numpy as np
+
+FORM_TEMPLATE_DIR = 'form_templates'
+# 선 서명(signature)을 계산할 때 페이지를 맞추는 기준 폭(px)
+SIGNATURE_WIDTH = 1000
+# 페이지 여백/스캔 배율 차이를 흡수하기 위해 시도하는 배율과 허용하는 최대 이동량(길이 대비 비율)
+MATCH_SCALES = np.linspace(0.92, 1.08, 17)
+MATCH_MAX_SHIFT = 0.1
+# 고정 박스 인식 결과의 평균 신뢰도가 이 값보다 낮으면 템플릿 결과를 쓰지 않고 페이지 전체를 인식합니다.
+MIN_FIELD_CONFIDENCE = 0.3
+
+def _to_gray(image):
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def line_masks(gray):
+    """페이지를 SIGNATURE_WIDTH 폭으로 줄인 뒤 가로선/세로선(표 테두리) 마스크를 구합니다."""
+    h, w = gray.shape[:2]
+    height = max(1, int(round(h * SIGNATURE_WIDTH / float(w))))
+    small = cv2.resize(gray, (SIGNATURE_WIDTH, height), interpolation=cv2.INTER_AREA)
+    binary = cv2.adaptiveThreshold(small, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (SIGNATURE_WIDTH // 20, 1)))
+    vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, height // 30)))
+    return horizontal, vertical
+
+def line_signature(gray):
+    """
+    양식의 선 배치를 요약한 서명: 가로선의 행별 투영(rows)과 세로선의 열별 투영(cols)
+    표 양식은 글자 내용과 무관하게 선 위치가 고정되어 있어 이 두 프로필만으로 정렬할 수 있습니다.
+    """
+    horizontal, vertical = line_masks(_to_gray(gray))
+    rows = horizontal.sum(axis=1).astype(np.float32) / (255.0 * horizontal.shape[1])
+    cols = vertical.sum(axis=0).astype(np.float32) / (255.0 * vertical.shape[0])
+    return {'rows': rows, 'cols': cols}
+
+def _normalize(profile):
+    """선 위치가 조금 어긋나도 겹치도록 흐린 뒤 평균 0, 길이 1로 정규화합니다."""
+    blurred = cv2.GaussianBlur(profile.reshape(1, -1), (0, 0), 3).ravel()
+    blurred = blurred - blurred.mean()
+    norm = np.linalg.norm(blurred)
+    return blurred / norm if norm > 0 else blurred
+
+def align_profile(reference, current):
+    """
+    current ≈ reference(배율 s, 이동 d) 인 (점수, s, d) 를 찾습니다.
+    reference 의 좌표 u 는 current 좌표 v = s * u + d 에 대응합니다. 점수는 정규화 상관계수입니다.
+    """
+    current_n = _normalize(np.asarray(current, dtype=np.float32))
+    max_shift = int(len(current) * MATCH_MAX_SHIFT)
+    best = (-1.0, 1.0, 0)
+    for scale in MATCH_SCALES:
+        length = int(len(reference) * scale)
+        if length < 2:
+            continue
+        scaled = np.interp(np.arange(length) / scale, np.arange(len(reference)), reference).astype(np.float32)
+        corr = np.correlate(current_n, _normalize(scaled), 'full')
+        lags = np.arange(len(corr)) - (length - 1)
+        allowed = np.abs(lags) <= max_shift
+        idx = int(np.argmax(np.where(allowed, corr, -np.inf)))
+        if corr[idx] > best[0]:
+            best = (float(corr[idx]), float(scale), int(lags[idx]))
+    return best
+
+class FormTemplate:
+    """
+    알려진 양식 한 페이지의 레이아웃
+    - fields: [{'name', 'label', 'box': [x0, y0, x1, y1] (기준 페이지 대비 0~1 비율), 'multiline'}]
+      multiline 필드는 특약사항/계약내용처럼 자유롭게 적는 영역으로, 그 영역에서만 줄 검출 후 인식합니다.
+    - signature: 기준 스캔에서 계산한 선 서명 (scripts/register_form_template.py 로 생성)
+    서명이나 필드 박스가 없는(보정되지 않은) 템플릿은 매칭에 쓰지 않습니다.
+    """
+
+    def __init__(self, data, path=None):
+        self.path = path
+        self.name = data['name']
+        self.title = data.get('title', self.name)
+        self.min_score = data.get('min_score')
+        self.fields = [field for field in data.get('fields', []) if field.get('box')]
+        signature = data.get('signature')
+        self.signature = {
+            'rows': np.asarray(signature['rows'], dtype=np.float32),
+            'cols': np.asarray(signature['cols'], dtype=np.float32),
+        } if signature else None
+
+    @property
+    def calibrated(self):
+        return self.signature is not None and bool(self.fields)
+
+    def match(self, signature):
+        """페이지 서명과 정렬해 (점수, 변환) 을 반환합니다. 변환은 서명 좌표계의 (sx, dx, sy, dy)."""
+        row_score, sy, dy = align_profile(self.signature['rows'], signature['rows'])
+        col_score, sx, dx = align_profile(self.signature['cols'], signature['cols'])
+        return min(row_score, col_score), (sx, dx, sy, dy)
+
+    def field_boxes(self, transform, page_shape, padding=4):
+        """정렬 결과로 필드 박스를 현재 페이지 픽셀 좌표 [x_min, x_max, y_min, y_max] 로 옮깁니다."""
+        sx, dx, sy, dy = transform
+        ref_w, ref_h = len(self.signature['cols']), len(self.signature['rows'])
+        page_h, page_w = page_shape[:2]
+        factor = page_w / float(SIGNATURE_WIDTH)
+        boxes = []
+        for field in self.fields:
+            x0, y0, x1, y1 = field['box']
+            box = [(sx * x0 * ref_w + dx) * factor - padding, (sx * x1 * ref_w + dx) * factor + padding,
+                   (sy * y0 * ref_h + dy) * factor - padding, (sy * y1 * ref_h + dy) * factor + padding]
+            x_min, x_max = max(0, int(box[0])), min(page_w, int(box[1]))
+            y_min, y_max = max(0, int(box[2])), min(page_h, int(box[3]))
+            boxes.append([x_min, x_max, y_min, y_max])
+        return boxes
+
+class TemplateRegistry:
+    """form_templates 폴더의 JSON 템플릿 목록과 페이지 매처"""
+
+    def __init__(self, template_dir=FORM_TEMPLATE_DIR, min_score=0.7):
+        self.template_dir = template_dir
+        self.min_score = min_score
+        self.templates = []
+        digest = hashlib.sha256()
+        if not os.path.isdir(template_dir):
+            print(f"⚠️ 양식 템플릿 폴더가 없습니다: {template_dir} (scripts/register_form_template.py 로 기준 스캔을 등록하세요)")
+        else:
+            for filename in sorted(os.listdir(template_dir)):
+                if not filename.endswith('.json'):
+                    continue
+                path = os.path.join(template_dir, filename)
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                digest.update(filename.encode('utf-8') + b'\0' + raw)
+                template = FormTemplate(json.loads(raw.decode('utf-8')), path)
+                if not template.calibrated:
+                    print(f"⚠️ 양식 템플릿 '{template.name}' 은 보정되지 않아 건너뜁니다. "
+                          f"(scripts/register_form_template.py 로 기준 스캔을 등록하세요)")
+                    continue
+                self.templates.append(template)
+        # 템플릿 파일이 바뀌면 OCR 캐시 키도 바뀌도록 내용 해시를 버전으로 씁니다.
+        self.version = digest.hexdigest()[:12]
+
+    def __bool__(self):
+        return bool(self.templates)
+
+    def match(self, page):
+        """
+        페이지(BGR 또는 흑백 배열)에 가장 잘 맞는 템플릿을 찾습니다.
+        최소 점수를 넘는 템플릿이 있으면 (템플릿, 변환, 점수), 없으면 None.
+        """
+        if not self.templates:
+            return None
+        signature = line_signature(page)
+        best = None
+        for template in self.templates:
+            score, transform = template.match(signature)
+            if score >= (template.min_score or self.min_score) and (best is None or score > best[2]):
+                best = (template, transform, score)
+        return best
+
+def _assign_to_boxes(boxes, recognized):
+    """
+    reader.recognize 결과를 입력 박스 순번 {순번: (글자, 신뢰도)} 에 맞춥니다.
+    recognize 는 결과를 세로 위치로 다시 정렬하고 너무 작은 박스는 빼므로, 순서나 좌표 키 대신
+    좌표가 가장 가까운 (아직 배정되지 않은) 입력 박스에 배정합니다. 같은 박스가 둘이어도 덮어쓰지 않습니다.
+    """
+    assigned = {}
+    for box, text, confidence in recognized:
+        xs = [x for x, _ in box]
+        ys = [y for _, y in box]
+        found = (min(xs), max(xs), min(ys), max(ys))
+        remaining = [idx for idx in range(len(boxes)) if idx not in assigned]
+        if not remaining:
+            break
+        idx = min(remaining, key=lambda i: sum(abs(a - b) for a, b in zip(boxes[i], found)))
+        assigned[idx] = (text, float(confidence))
+    return assigned
+
+def _readtext_region(reader, crop):
+    return [{'box': [[int(x), int(y)] for x, y in box], 'text': text, 'confidence': float(confidence)}
+            for box, text, confidence in reader.readtext(crop)]
+
+def recognize_template_fields(reader, page, template, transform, read_region=None):
+    """
+    정렬된 템플릿의 필드 영역만 인식해 페이지 결과를 만듭니다. (페이지 전체 검출은 하지 않음)
+    - 한 줄 필드: reader.recognize 에 고정 박스(horizontal_list)로 넘겨 '라벨: 값' 한 줄
+    - 여러 줄 필드(특약사항 등 자유 기재 영역): '라벨:' 줄 뒤에 그 영역만 read_region(잘라낸 이미지) 으로
+      줄 검출·인식한 결과를 페이지 좌표로 옮겨 붙입니다. (기본은 reader.readtext)
+    필드 순서대로 결과 목록([{'box', 'text', 'confidence'}])을 반환하며,
+    인식한 값들의 평균 신뢰도가 MIN_FIELD_CONFIDENCE 미만이면 None 을 반환합니다.
+    """
+    read_region = read_region or (lambda crop: _readtext_region(reader, crop))
+    gray = _to_gray(page)
+    boxes = template.field_boxes(transform, gray.shape)
+    valid = [idx for idx, (x_min, x_max, y_min, y_max) in enumerate(boxes) if x_max > x_min and y_max > y_min]
+    single = [idx for idx in valid if not template.fields[idx].get('multiline')]
+    recognized = {}
+    if single:
+        found = reader.recognize(gray, horizontal_list=[boxes[idx] for idx in single], free_list=[])
+        recognized = {single[pos]: value for pos, value in _assign_to_boxes([boxes[idx] for idx in single], found).items()}
+
+    results = []
+    confidences = []
+    for idx in valid:
+        field = template.fields[idx]
+        x_min, x_max, y_min, y_max = boxes[idx]
+        field_box = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+        if field.get('multiline'):
+            lines = [item for item in read_region(gray[y_min:y_max, x_min:x_max]) if item['text']]
+            results.append({'box': field_box, 'text': f"{field['label']}:", 'confidence': 1.0})
+            for item in lines:
+                item['box'] = [[x + x_min, y + y_min] for x, y in item['box']]
+                results.append(item)
+            confidences += [item['confidence'] for item in lines]
+        else:
+            text, confidence = recognized.get(idx, ('', 0.0))
+            results.append({'box': field_box, 'text': f"{field['label']}: {text}", 'confidence': confidence})
+            confidences.append(confidence)
+
+    if not confidences or np.mean(confidences) < MIN_FIELD_CONFIDENCE:
+        return None
+    return results
@@ -1,41 +1,120 @@
 import cv2
 import numpy as np
 import os
+import time
 
-def enhance_image_for_ocr(image_path, output_path="enhanced_image.png"):
-    """이미지 비율을 먼저 확인하여 90도 회전 여부를 결정하는 최종 로직"""
-    print(f"--- '{os.path.basename(image_path)}' 이미지 전처리 시작 ---")
-    img = cv2.imread(image_path)
-    
-    if img is None: 
-        print(f"⚠️ 파일을 읽을 수 없습니다: {image_path}")
-        return None, None
+# 노이즈 제거 프로필
+# fast: 3x3 중앙값 필터 / balanced: 노이즈가 큰 타일에만 NLM / quality: 페이지 전체 NLM (기존 동작)
+PREPROCESS_PROFILES = ('fast', 'balanced', 'quality')
+DENOISE_TILE_SIZE = 256
+# NLM 탐색 창(21)과 템플릿 창(7)의 반경만큼 타일 주변을 함께 잘라 경계에서도 결과가 같게 합니다.
+DENOISE_TILE_MARGIN = 13
+# 타일 노이즈 추정값(표준편차)이 이 값을 넘으면 balanced 프로필에서 NLM 을 적용합니다.
+DENOISE_NOISE_SIGMA = 3.0
 
-    # === 1단계: 이미지 비율로 큰 방향 잡기 ===
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+def estimate_noise_sigma(gray):
+    """
+    Immerkær 라플라시안 필터 응답으로 가우시안 노이즈 표준편차를 추정합니다.
+    글자 경계의 큰 응답에 끌려가지 않도록 평균 대신 중앙값(MAD)을 사용합니다.
+    """
+    h, w = gray.shape[:2]
+    if h < 3 or w < 3:
+        return 0.0
+    response = cv2.filter2D(gray.astype(np.float32), -1, _NOISE_KERNEL)[1:-1, 1:-1]
+    # 노이즈만 있을 때 응답의 표준편차는 6σ, 중앙값 절대편차는 0.6745 × 표준편차입니다.
+    return float(np.median(np.abs(response)) / (0.6745 * 6))
+
+def denoise_tiles(gray, sigma_threshold=DENOISE_NOISE_SIGMA, tile=DENOISE_TILE_SIZE, margin=DENOISE_TILE_MARGIN):
+    """
+    페이지를 타일로 나눠 노이즈가 큰 타일에만 NLM 을 적용하고 나머지는 중앙값 필터로 처리합니다.
+    디지털 원본을 렌더링한 깨끗한 페이지는 대부분의 타일이 NLM 을 건너뜁니다.
+    """
+    h, w = gray.shape[:2]
+    denoised = cv2.medianBlur(gray, 3)
+    nlm_tiles = 0
+    for y in range(0, h, tile):
+        for x in range(0, w, tile):
+            if estimate_noise_sigma(gray[y:y + tile, x:x + tile]) <= sigma_threshold:
+                continue
+            y0, x0 = max(0, y - margin), max(0, x - margin)
+            y1, x1 = min(h, y + tile + margin), min(w, x + tile + margin)
+            patch = cv2.fastNlMeansDenoising(gray[y0:y1, x0:x1], None, 10, 7, 21)
+            denoised[y:y + tile, x:x + tile] = patch[y - y0:y - y0 + min(tile, h - y), x - x0:x - x0 + min(tile, w - x)]
+            nlm_tiles += 1
+    total_tiles = ((h + tile - 1) // tile) * ((w + tile - 1) // tile)
+    print(f"✅ 타일 노이즈 제거: NLM {nlm_tiles}/{total_tiles}개 타일")
+    return denoised
+
+def denoise_page(gray, profile='quality'):
+    """프로필에 따라 흑백 페이지의 노이즈를 제거합니다."""
+    if profile == 'fast':
+        return cv2.medianBlur(gray, 3)
+    if profile == 'balanced':
+        return denoise_tiles(gray)
+    return cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+
+def binarize_for_ocr(gray, profile='quality'):
+    """흑백 이미지에 노이즈 제거와 적응형 이진화를 적용합니다. (enhance_image_for_ocr 의 마지막 단계)"""
+    denoised = denoise_page(gray, profile)
+    return cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+
+def quick_enhance_for_ocr(image):
+    """
+    캐스케이드 1차 인식용 가벼운 전처리: 90도 방향 보정 + 흑백 변환 + 적응형 이진화만 수행합니다.
+    기울기 보정과 노이즈 제거를 생략하며, (이진화 이미지, 흑백 이미지)를 반환합니다. 읽기 실패 시 None.
+    """
+    img = image if isinstance(image, np.ndarray) else cv2.imread(image, cv2.IMREAD_ANYCOLOR)
+    if img is None:
+        print(f"⚠️ 파일을 읽을 수 없습니다: {image}")
+        return None
     (h, w) = img.shape[:2]
-    
-    # 가로(w)가 세로(h)보다 길면, 90도 회전이 필요한 문서로 간주합니다.
     if w > h:
-        print(f"✅ 가로로 긴 이미지(w:{w}, h:{h}) 감지. 90도 회전 실행.")
-        # 원본 이미지를 시계 방향으로 90도 회전시켜 세웁니다.
         img = cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
-    else:
-        print(f"✅ 세로로 긴 이미지(w:{w}, h:{h}) 감지. 90도 회전 안함.")
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    return binary, gray
 
-    # 이제 img 변수에는 무조건 세로 방향으로 정렬된 이미지가 들어있습니다.
-    # === 2단계: 세로로 정렬된 이미지에서 미세 기울기 보정 ===
-    
-    # 2단계의 나머지 로직은 이전과 거의 동일합니다.
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def orient_and_deskew(image):
+    """
+    양식 템플릿 매칭용 가벼운 전처리: 90도 방향 보정 + 미세 기울기 보정만 수행합니다. (노이즈 제거/이진화 생략)
+    enhance_image_for_ocr 가 반환하는 기울기 보정 이미지와 같은 좌표계의 배열을 반환합니다. 읽기 실패 시 None.
+    """
+    img = image if isinstance(image, np.ndarray) else cv2.imread(image, cv2.IMREAD_ANYCOLOR)
+    if img is None:
+        print(f"⚠️ 파일을 읽을 수 없습니다: {image}")
+        return None
+    (h, w) = img.shape[:2]
+    if w > h:
+        img = cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    return deskew_image(img)
+
+def skew_hull_points(thresh):
+    """
+    이진 이미지에서 행마다 가장 왼쪽/오른쪽 전경 픽셀만 (행, 열) 좌표로 반환합니다.
+    minAreaRect 의 결과는 점들의 볼록 껍질(convex hull)로만 정해지고, 껍질의 꼭짓점은 항상
+    행별 양 끝 픽셀 중에 있으므로 모든 전경 픽셀 좌표를 넘길 때와 같은 사각형이 나옵니다.
+    좌표 배열 크기는 전경 픽셀 수(페이지당 수백만) 대신 최대 2 × 행 수로 줄어듭니다.
+    """
+    mask = thresh > 0
+    rows = np.flatnonzero(mask.any(axis=1))
+    left = mask.argmax(axis=1)[rows]
+    right = mask.shape[1] - 1 - mask[:, ::-1].argmax(axis=1)[rows]
+    return np.column_stack((np.concatenate((rows, rows)), np.concatenate((left, right)))).astype(np.int32)
+
+def deskew_image(img):
+    """세로로 세운 페이지의 미세 기울기를 보정한 이미지를 반환합니다. (실패하거나 각도가 너무 크면 원본 복사본)"""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     rotated = img.copy() # 최종 결과물을 담을 변수 초기화
 
     try:
         gray_inv = cv2.bitwise_not(gray)
         _, thresh = cv2.threshold(gray_inv, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        coords = np.column_stack(np.where(thresh > 0))
+        coords = skew_hull_points(thresh)
         rect = cv2.minAreaRect(coords)
         angle = rect[-1]
-        
+
         if angle < -45:
             angle = -(90 + angle)
         else:
@@ -47,35 +126,95 @@ def enhance_image_for_ocr(image_path, output_path="enhanced_image.png"):
             rotated = img.copy()
         else:
             print(f"✅ 미세 기울기 보정 시작 (감지된 각도: {angle:.2f}°)")
-            
+
             (h, w) = img.shape[:2]
             center = (w // 2, h // 2)
             M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            
+
             cos = np.abs(M[0, 0])
             sin = np.abs(M[0, 1])
             new_w = int((h * sin) + (w * cos))
             new_h = int((h * cos) + (w * sin))
-            
+
             M[0, 2] += (new_w / 2) - center[0]
             M[1, 2] += (new_h / 2) - center[1]
-            
+
             rotated = cv2.warpAffine(img, M, (new_w, new_h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
             print(f"✅ 미세 기울기 보정 완료.")
-            
+
     except Exception as e:
         print(f"⚠️ 미세 기울기 보정 중 오류 발생 (90도 회전 원본만 사용): {e}")
-        rotated = img.copy() 
+        rotated = img.copy()
+    return rotated
+
+def enhance_image_for_ocr(image_path, output_path="enhanced_image.png", profile='quality', timings=None):
+    """
+    이미지 비율을 먼저 확인하여 90도 회전 여부를 결정하는 최종 로직
+    image_path 에는 파일 경로 대신 BGR 또는 흑백(2차원) numpy 배열을 넘길 수도 있습니다.
+    output_path 가 None 이면 파일로 저장하지 않고 전처리된 배열을 경로 대신 반환합니다.
+    profile 로 노이즈 제거 방식(fast/balanced/quality)을 고르며,
+    timings 딕셔너리를 넘기면 단계별 소요 시간(초)을 채워 줍니다.
+    """
+    if profile not in PREPROCESS_PROFILES:
+        raise ValueError(f"지원하지 않는 전처리 프로필입니다: {profile} (가능: {', '.join(PREPROCESS_PROFILES)})")
+    stage_timings = timings if timings is not None else {}
+    stage_start = time.perf_counter()
+
+    def mark(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        stage_timings[stage] = round(now - stage_start, 4)
+        stage_start = now
+
+    if isinstance(image_path, np.ndarray):
+        print("--- 메모리 이미지 전처리 시작 ---")
+        img = image_path
+    else:
+        print(f"--- '{os.path.basename(image_path)}' 이미지 전처리 시작 ---")
+        # 흑백 이미지는 3채널로 늘리지 않고 그대로 읽습니다.
+        img = cv2.imread(image_path, cv2.IMREAD_ANYCOLOR)
+    
+    if img is None: 
+        print(f"⚠️ 파일을 읽을 수 없습니다: {image_path}")
+        return None, None
+    mark('load')
+
+    # === 1단계: 이미지 비율로 큰 방향 잡기 ===
+    (h, w) = img.shape[:2]
+    
+    # 가로(w)가 세로(h)보다 길면, 90도 회전이 필요한 문서로 간주합니다.
+    if w > h:
+        print(f"✅ 가로로 긴 이미지(w:{w}, h:{h}) 감지. 90도 회전 실행.")
+        # 원본 이미지를 시계 방향으로 90도 회전시켜 세웁니다.
+        img = cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    else:
+        print(f"✅ 세로로 긴 이미지(w:{w}, h:{h}) 감지. 90도 회전 안함.")
+
+    # 이제 img 변수에는 무조건 세로 방향으로 정렬된 이미지가 들어있습니다.
+    # === 2단계: 세로로 정렬된 이미지에서 미세 기울기 보정 ===
+    
+    mark('orient')
+
+    # 2단계의 나머지 로직은 이전과 거의 동일합니다.
+    rotated = deskew_image(img)
+    mark('deskew')
 
     # 최종적으로 노이즈 제거 및 이진화 처리
-    final_gray = cv2.cvtColor(rotated, cv2.COLOR_BGR2GRAY)
-    denoised = cv2.fastNlMeansDenoising(final_gray, None, 10, 7, 21)
+    final_gray = rotated if rotated.ndim == 2 else cv2.cvtColor(rotated, cv2.COLOR_BGR2GRAY)
+    denoised = denoise_page(final_gray, profile)
+    mark('denoise')
     final_img = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    mark('binarize')
+
+    if output_path is None:
+        print(f"✅ 전처리 완료 (메모리 결과 반환, {profile}): {stage_timings}")
+        return final_img, rotated
     
     filename, ext = os.path.splitext(output_path)
     if not ext:
         output_path = filename + '.png'
 
     cv2.imwrite(output_path, final_img)
-    print(f"✅ 전처리 완료, 결과 저장: '{output_path}'")
+    mark('save')
+    print(f"✅ 전처리 완료, 결과 저장: '{output_path}' ({profile}): {stage_timings}")
     return output_path, rotated
\ No newline at end of file
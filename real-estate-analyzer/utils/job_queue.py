@@ -0,0 +1,173 @@
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+
+class JobQueue:
+    """
+    백그라운드 작업 큐
+    submit() 은 작업 id 를 바로 반환하고, 고정된 수의 워커 스레드가 큐에서 작업을 꺼내 실행합니다.
+    작업 함수는 마지막 인자로 progress(percent, message) 콜백을 받습니다.
+    끝난 작업은 result_ttl 초 동안 조회할 수 있고 이후 정리됩니다.
+    state_dir 를 주면 작업 상태와 결과를 <state_dir>/<작업 id>.json 에도 써 두어,
+    같은 디렉터리를 쓰는 다른 프로세스(gunicorn 워커)에서도 get() 으로 조회할 수 있습니다.
+    """
+
+    def __init__(self, worker_count=1, max_queue=8, result_ttl=3600, name='job', state_dir=None):
+        self.worker_count = worker_count
+        self.result_ttl = result_ttl
+        self.name = name
+        self.state_dir = state_dir
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def _ensure_workers(self):
+        """첫 작업이 들어올 때 워커 스레드를 시작합니다. (lock 보유 상태에서 호출)"""
+        if self._workers:
+            return
+        for idx in range(self.worker_count):
+            worker = threading.Thread(target=self._run, name=f"{self.name}-worker-{idx+1}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _prune(self):
+        """보관 기간이 지난 완료 작업을 정리합니다. (lock 보유 상태에서 호출)"""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] and now - job['finished_at'] > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.state_dir:
+            self._prune_files(now)
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _prune_files(self, now):
+        """보관 기간이 지난 완료 작업 파일을 지웁니다. (다른 프로세스가 만든 파일 포함)"""
+        with os.scandir(self.state_dir) as entries:
+            old = [entry.path for entry in entries
+                   if entry.name.endswith('.json') and now - entry.stat().st_mtime > self.result_ttl]
+        for path in old:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    finished_at = json.load(f).get('finished_at')
+                if finished_at and now - finished_at > self.result_ttl:
+                    os.remove(path)
+            except (OSError, ValueError):
+                continue
+
+    def _save(self, job):
+        """작업 상태를 파일로 씁니다. (같은 디렉터리의 임시 파일에 쓴 뒤 교체해 읽는 쪽이 반쯤 쓴 파일을 보지 않도록 함)"""
+        tmp = None
+        try:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.state_dir, prefix=f"{job['id']}.",
+                                             suffix='.tmp', delete=False) as f:
+                tmp = f.name
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(tmp, self._state_path(job['id']))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ 작업 상태 저장 실패 ({job['id']}): {e}")
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _load(self, job_id):
+        """다른 프로세스가 파일로 남긴 작업 상태를 읽습니다. 없으면 None."""
+        if not self.state_dir or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._state_path(job_id), encoding='utf-8') as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job.get('finished_at') and time.time() - job['finished_at'] > self.result_ttl:
+            return None
+        return job
+
+    def submit(self, func, *args):
+        """작업을 등록하고 작업 id 를 반환합니다. 큐가 가득 차면 queue.Full 예외가 발생합니다."""
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'progress': 0,
+            'message': '대기 중',
+            'result': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+        }
+        with self._lock:
+            self._prune()
+            self._ensure_workers()
+            self._jobs[job_id] = job
+            try:
+                self._queue.put_nowait((job_id, func, args))
+            except queue.Full:
+                del self._jobs[job_id]
+                raise
+            if self.state_dir:
+                self._save(dict(job, queue_position=self._queue.qsize()))
+        return job_id
+
+    def get(self, job_id):
+        """작업 상태의 복사본을 반환합니다. 이 프로세스에 없으면 state_dir 의 파일에서 읽고, 거기도 없으면 None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            job = dict(job) if job is not None else None
+        if job is None:
+            job = self._load(job_id)
+            if job is None:
+                return None
+            # 다른 프로세스의 대기열 순서는 알 수 없으므로 등록 시점 값을 그대로 씁니다.
+            job.setdefault('queue_position', 0)
+            return job
+        job['queue_position'] = self._position(job_id) if job['status'] == 'queued' else 0
+        return job
+
+    def _position(self, job_id):
+        with self._queue.mutex:
+            pending = [item[0] for item in self._queue.queue]
+        return pending.index(job_id) + 1 if job_id in pending else 0
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id not in self._jobs:
+                return
+            self._jobs[job_id].update(fields)
+            job = dict(self._jobs[job_id])
+        if self.state_dir:
+            self._save(job)
+
+    def stats(self):
+        """큐 길이와 상태별 작업 수"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {'queue_depth': self._queue.qsize(), 'workers': self.worker_count, 'jobs': counts}
+
+    def _run(self):
+        while True:
+            job_id, func, args = self._queue.get()
+            self._update(job_id, status='running', started_at=time.time(), message='처리 중')
+
+            def progress(percent, message):
+                self._update(job_id, progress=percent, message=message)
+
+            try:
+                result = func(*args, progress)
+                self._update(job_id, status='done', progress=100, message='완료', result=result, finished_at=time.time())
+            except Exception as e:
+                print(f"🚨 백그라운드 작업 실패 ({job_id}): {e}")
+                self._update(job_id, status='failed', message='실패', error=str(e), finished_at=time.time())
+            finally:
+                self._queue.task_done()
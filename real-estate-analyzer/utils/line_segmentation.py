@@ -0,0 +1,102 @@
+import cv2
+import numpy as np
+
+# craft: EasyOCR readtext 기본(CRAFT 검출) / projection: 투영 프로필로 줄·단어 박스를 찾아 reader.recognize 로 바로 인식
+SEGMENTATION_MODES = ('craft', 'projection')
+# 이 면적(px) 이하의 연결 요소는 이진화 잡음으로 보고 지웁니다.
+SEGMENT_SPECK_AREA = 3
+# 한 줄 안에서 글자 높이의 몇 배 이상 비어 있으면 다른 박스로 나눌지 (표 칸, 단 구분)
+SEGMENT_WORD_GAP = 1.0
+# 같은 줄로 볼 세로 방향 빈 줄 허용 폭 (글자 높이 대비, 'ㅡ' 처럼 떨어진 획을 한 줄로 묶기 위함)
+SEGMENT_LINE_GAP = 0.2
+# 박스 위아래/좌우 여백 (EasyOCR readtext 의 add_margin 과 같은 값)
+SEGMENT_MARGIN = 0.1
+# 글자 높이의 몇 배보다 높은 박스는 여러 줄이 겹친 것으로 보고 품질 판단에 씁니다.
+SEGMENT_MAX_LINE_RATIO = 1.8
+# 나누지 못한 박스에 들어간 잉크 비율, 글자 한 개보다 좁은 조각 박스 비율이 이보다 크면 CRAFT 로 돌아갑니다.
+SEGMENT_MAX_TALL_INK = 0.15
+SEGMENT_MAX_FRAGMENTS = 0.3
+# 투영 분할로 인식한 결과의 평균 신뢰도가 이보다 낮아도 CRAFT 로 다시 인식합니다.
+SEGMENT_MIN_CONFIDENCE = 0.3
+
+def text_mask(binary):
+    """
+    이진화 페이지(흰 바탕, 검은 글자)에서 글자 잉크 마스크를 만듭니다.
+    표 테두리처럼 긴 가로선/세로선과 잡음 점, 도장·그림처럼 글자보다 훨씬 큰 연결 요소는 지우고
+    (마스크, 글자 높이 추정값) 을 반환합니다. 글자가 없으면 글자 높이는 0 입니다.
+    """
+    ink = (binary < 128).astype(np.uint8)
+    h, w = ink.shape[:2]
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(15, w // 20), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(15, h // 30))))
+    ink[(horizontal | vertical) > 0] = 0
+
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    glyphs = areas > SEGMENT_SPECK_AREA
+    if not glyphs.any():
+        return np.zeros_like(ink), 0
+    # 획이 여러 조각인 한글도 조각 높이의 상위 분포는 글자 높이에 가깝습니다.
+    char_h = float(np.percentile(heights[glyphs], 75))
+    keep = glyphs & (heights <= max(char_h * 4, 8))
+    lookup = np.concatenate(([0], keep.astype(np.uint8)))
+    return lookup[labels], char_h
+
+def _runs(profile, max_gap):
+    """0 이 아닌 구간을 [(시작, 끝)] 으로 찾되, max_gap 이하의 빈 구간은 이어 붙입니다."""
+    filled = np.flatnonzero(profile)
+    if filled.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(filled) > max_gap + 1)
+    starts = np.concatenate(([filled[0]], filled[breaks + 1]))
+    ends = np.concatenate((filled[breaks], [filled[-1]]))
+    return list(zip(starts.tolist(), (ends + 1).tolist()))
+
+def _cut(mask, x0, x1, y0, y1, char_h, segments, depth=0):
+    """
+    XY-cut: 가로 투영으로 줄을 나누고, 줄마다 세로 투영으로 단어 묶음을 나눕니다.
+    나눈 묶음이 여전히 여러 줄 높이면(다단 편집처럼 단마다 줄 위치가 다른 경우) 그 영역만 다시 나눕니다.
+    """
+    for top, bottom in _runs(mask[y0:y1, x0:x1].sum(axis=1), char_h * SEGMENT_LINE_GAP):
+        band = mask[y0 + top:y0 + bottom, x0:x1]
+        # 제목처럼 큰 글자 줄은 띄어쓰기도 넓으므로 줄 높이를 기준으로 나눕니다.
+        line_h = min(max(char_h, bottom - top), char_h * SEGMENT_MAX_LINE_RATIO)
+        for left, right in _runs(band.sum(axis=0), line_h * SEGMENT_WORD_GAP):
+            rows = np.flatnonzero(band[:, left:right].sum(axis=1))
+            seg = (x0 + left, x0 + right, y0 + top + int(rows[0]), y0 + top + int(rows[-1]) + 1)
+            if seg[3] - seg[2] > char_h * SEGMENT_MAX_LINE_RATIO and depth < 3 and seg != (x0, x1, y0, y1):
+                _cut(mask, *seg, char_h, segments, depth + 1)
+            else:
+                segments.append(seg)
+
+def segment_text_lines(binary):
+    """
+    CRAFT 검출 없이 투영 프로필과 연결 요소로 줄/단어 묶음 박스를 찾습니다.
+    깨끗하게 기울기 보정·이진화된 페이지(enhance_image_for_ocr 결과)를 가정하며,
+    (reader.recognize 의 horizontal_list 형식 [x_min, x_max, y_min, y_max] 박스 목록, None) 을 읽는 순서대로 반환합니다.
+    분할 품질이 나빠 보이면(글자 없음, 나누지 못한 여러 줄 덩어리, 조각 박스 과다) (None, 사유) 를 반환합니다.
+    """
+    mask, char_h = text_mask(binary)
+    if char_h <= 0:
+        return None, 'no_text'
+    h, w = mask.shape[:2]
+    segments = []
+    _cut(mask, 0, w, 0, h, char_h, segments)
+    if not segments:
+        return None, 'no_text'
+
+    total_ink = float(mask.sum())
+    tall_ink = sum(float(mask[y_min:y_max, x_min:x_max].sum()) for x_min, x_max, y_min, y_max in segments
+                   if y_max - y_min > char_h * SEGMENT_MAX_LINE_RATIO)
+    if tall_ink > SEGMENT_MAX_TALL_INK * total_ink:
+        return None, 'merged_lines'
+    fragments = sum(1 for x_min, x_max, _, _ in segments if x_max - x_min < char_h * 0.5)
+    if fragments > SEGMENT_MAX_FRAGMENTS * len(segments):
+        return None, 'fragments'
+
+    boxes = []
+    for x_min, x_max, y_min, y_max in segments:
+        margin = int(SEGMENT_MARGIN * (y_max - y_min))
+        boxes.append([max(0, x_min - margin), min(w, x_max + margin), max(0, y_min - margin), min(h, y_max + margin)])
+    return boxes, None
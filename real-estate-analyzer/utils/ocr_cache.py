@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+class OCRCache:
+    """
+    업로드 파일 내용 기반(content-addressed) OCR 결과 캐시
+    - 키: 업로드 바이트 + 전처리/모델 버전 문자열의 SHA-256
+    - 값: 페이지별 OCR 결과 목록 ([{'box', 'text', 'confidence'}, ...])
+    - 메모리 LRU(max_entries 개) 뒤에 디스크 저장소(cache_dir/<키>.json)를 둡니다.
+    - 디스크 저장소는 disk_max_bytes 를 넘으면 저장할 때 수정 시각이 오래된 파일부터 지웁니다. (디스크 적중 시 시각 갱신)
+      여러 gunicorn 워커가 같은 폴더를 쓰므로 임시 파일 이름은 tempfile 로 프로세스끼리 겹치지 않게 만듭니다.
+    """
+
+    def __init__(self, cache_dir, max_entries=64, version='', disk_max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.version = version
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'disk_evictions': 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, data, *options):
+        """업로드 바이트와 버전, 추가 옵션(전처리 모드 등)으로 캐시 키를 만듭니다."""
+        digest = hashlib.sha256()
+        digest.update(self.version.encode('utf-8'))
+        for option in options:
+            digest.update(b'\0' + str(option).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, pages):
+        """메모리 LRU 에 넣고, 용량을 넘으면 가장 오래 쓰이지 않은 항목을 내보냅니다. (lock 보유 상태에서 호출)"""
+        self._entries[key] = pages
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get(self, key):
+        """캐시된 페이지 결과 목록을 반환합니다. 없으면 None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return self._entries[key]
+
+        pages = None
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), encoding='utf-8') as f:
+                    pages = json.load(f)['pages']
+                os.utime(self._disk_path(key))  # 오래된 파일부터 지울 때 최근에 쓴 파일은 남도록
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ OCR 캐시 파일을 읽을 수 없습니다({key}): {e}")
+
+        with self._lock:
+            if pages is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._remember(key, pages)
+        return pages
+
+    def put(self, key, pages):
+        """페이지 결과 목록을 메모리와 디스크에 저장합니다."""
+        with self._lock:
+            self._remember(key, pages)
+            self._stats['stores'] += 1
+
+        if self.cache_dir:
+            # 쓰는 도중 읽히지 않도록 임시 파일에 쓴 뒤 교체합니다.
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.cache_dir, prefix=f"{key}.",
+                                                 suffix='.tmp', delete=False) as f:
+                    tmp_path = f.name
+                    json.dump({'version': self.version, 'pages': pages}, f, ensure_ascii=False)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError as e:
+                print(f"⚠️ OCR 캐시 파일 저장 실패({key}): {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            if self.disk_max_bytes:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        """디스크 캐시 파일 합계가 disk_max_bytes 를 넘으면 수정 시각이 오래된 파일부터 지웁니다."""
+        files = []
+        total = 0
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # 다른 워커가 방금 지운 파일
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.disk_max_bytes:
+            return
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            total -= size
+        with self._lock:
+            self._stats['disk_evictions'] += removed
+
+    def stats(self):
+        """적중/실패 통계와 현재 메모리 항목 수를 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._entries)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,404 @@
+import os
+import sys
+import json
+import hashlib
+import importlib
+import itertools
+import yaml
+import cv2
+import torch
+import torch.nn as nn
+import easyocr
+from easyocr.config import BASE_PATH, detection_models # type: ignore
+
+MODEL_STORAGE_DIR = '.EasyOCR/model'
+USER_NETWORK_DIR = '.EasyOCR/user_network'
+RECOG_NETWORK = 'finetuned'
+RECOG_IMG_H = 64  # finetuned.yaml 의 imgH
+
+# none: fp32 그대로 / dynamic: LSTM·Linear 동적 int8 (EasyOCR 기본 동작) / static: dynamic + 합성곱 스택 정적 int8
+QUANTIZATION_MODES = ('none', 'dynamic', 'static')
+# torch: EasyOCR 기본(eager) / torchscript: 고정(frozen) TorchScript 그래프 / onnx: ONNX Runtime
+RECOG_BACKENDS = ('torch', 'torchscript', 'onnx')
+TORCHSCRIPT_FILENAME = f'{RECOG_NETWORK}.torchscript.pt'
+ONNX_FILENAME = f'{RECOG_NETWORK}.onnx'
+# scripts/build_model_snapshot.py 가 만드는 mmap 용 가중치 스냅샷 폴더 (모델 폴더 아래)
+SNAPSHOT_DIRNAME = 'snapshot'
+SNAPSHOT_MANIFEST = 'manifest.json'
+DETECTOR_FILENAME = detection_models['craft']['filename']
+
+def create_reader(quantization='dynamic', calibration_dir=None, detector=True, model_storage_directory=MODEL_STORAGE_DIR,
+                  backend='torch', threads=None, snapshot_dir=None):
+    """
+    finetuned 인식 모델을 사용하는 EasyOCR Reader 를 만듭니다.
+    quantization 으로 인식 모델의 양자화 방식을 고릅니다.
+    EasyOCR 은 CPU 에서 quantize=True 일 때 인식 모델의 LSTM/Linear 에 동적 int8 양자화를 적용하므로
+    'dynamic' 이 기존 동작과 같고, 'static' 은 여기에 calibration_dir 의 줄 이미지로 보정한
+    VGG 합성곱 스택의 정적 int8 양자화를 더합니다.
+    backend 가 'torchscript' 나 'onnx' 이면 scripts/export_recognizer.py 로 미리 내보낸 그래프로
+    인식 모델을 교체하며, 이때 양자화 설정은 쓰이지 않습니다.
+    threads 는 onnx 백엔드의 세션 스레드 수입니다. (torch.set_num_threads 는 CRAFT 검출까지 함께 묶는 프로세스 전역 설정이라 쓰지 않음)
+    snapshot_dir 에 원본 가중치와 일치하는 스냅샷(scripts/build_model_snapshot.py)이 있으면
+    pickle 역직렬화와 CRAFT MD5 확인 없이 가중치 파일을 메모리 매핑해 모델을 만들고, 없거나 오래됐으면 기존 방식으로 불러옵니다.
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"지원하지 않는 양자화 방식입니다: {quantization} (가능: {', '.join(QUANTIZATION_MODES)})")
+    if backend not in RECOG_BACKENDS:
+        raise ValueError(f"지원하지 않는 인식 백엔드입니다: {backend} (가능: {', '.join(RECOG_BACKENDS)})")
+
+    quantize = quantization != 'none' and backend == 'torch'
+    manifest = None
+    if snapshot_dir:
+        needed = (['detector'] if detector else []) + (['recognizer'] if backend == 'torch' else [])
+        manifest = load_snapshot_manifest(snapshot_dir, model_storage_directory, needed)
+    if manifest is not None:
+        reader = reader_from_snapshot(snapshot_dir, manifest, detector, backend == 'torch', quantize, model_storage_directory)
+        print(f"✅ 모델 스냅샷을 메모리 매핑으로 불러왔습니다. (경로: {snapshot_dir})")
+    else:
+        reader = easyocr.Reader(
+            ['ko'],
+            model_storage_directory=model_storage_directory,
+            user_network_directory=USER_NETWORK_DIR,
+            recog_network=RECOG_NETWORK,
+            download_enabled=False,
+            gpu=False,
+            detector=detector,
+            quantize=quantize
+        )
+
+    if backend != 'torch':
+        reader.recognizer = load_recognizer_backend(backend, model_storage_directory, threads)
+        print(f"✅ 인식 모델 백엔드 교체: {backend}")
+    elif quantization == 'static':
+        calibration = load_line_crops(calibration_dir) if calibration_dir else []
+        if calibration:
+            quantize_conv_stack(reader.recognizer, [tensor for _, tensor in calibration])
+            print(f"✅ 합성곱 스택 정적 int8 양자화 완료 (보정 이미지 {len(calibration)}장)")
+        else:
+            print("⚠️ 정적 양자화 보정 이미지가 없어 동적 양자화만 적용합니다.")
+    return reader
+
+def line_crop_to_tensor(gray, img_h=RECOG_IMG_H):
+    """흑백 줄 이미지를 EasyOCR 인식기 입력과 같은 방식(높이 고정, [-1, 1] 정규화)의 텐서로 바꿉니다."""
+    h, w = gray.shape[:2]
+    new_w = max(1, int(round(w * img_h / float(h))))
+    resized = cv2.resize(gray, (new_w, img_h), interpolation=cv2.INTER_CUBIC)
+    tensor = torch.from_numpy(resized).float().div_(255).sub_(0.5).div_(0.5)
+    return tensor.unsqueeze(0).unsqueeze(0)
+
+def load_line_crops(folder, limit=None):
+    """폴더의 줄 이미지들을 (파일명, 입력 텐서) 목록으로 읽어옵니다."""
+    crops = []
+    for filename in sorted(os.listdir(folder)):
+        if not filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+            continue
+        gray = cv2.imread(os.path.join(folder, filename), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            continue
+        crops.append((filename, line_crop_to_tensor(gray)))
+        if limit and len(crops) >= limit:
+            break
+    return crops
+
+class QuantizedFeatureExtractor(nn.Module):
+    """VGG_FeatureExtractor 의 ConvNet 을 정적 양자화하기 위해 Quant/DeQuant 스텁으로 감싼 모듈"""
+
+    def __init__(self, feature_extractor):
+        super(QuantizedFeatureExtractor, self).__init__()
+        self.quant = torch.ao.quantization.QuantStub()
+        self.ConvNet = feature_extractor.ConvNet
+        self.dequant = torch.ao.quantization.DeQuantStub()
+
+    def forward(self, input):
+        return self.dequant(self.ConvNet(self.quant(input)))
+
+def _fusable_groups(sequential):
+    """Conv(+BatchNorm)(+ReLU) 로 이어지는 층 이름 묶음을 찾습니다."""
+    layers = list(sequential.named_children())
+    groups = []
+    for idx, (name, layer) in enumerate(layers):
+        if not isinstance(layer, nn.Conv2d):
+            continue
+        group = [name]
+        nxt = idx + 1
+        if nxt < len(layers) and isinstance(layers[nxt][1], nn.BatchNorm2d):
+            group.append(layers[nxt][0])
+            nxt += 1
+        if nxt < len(layers) and isinstance(layers[nxt][1], nn.ReLU):
+            group.append(layers[nxt][0])
+        if len(group) > 1:
+            groups.append(group)
+    return groups
+
+def quantize_conv_stack(model, calibration_inputs, backend='fbgemm'):
+    """
+    인식 모델의 FeatureExtraction(ConvNet)만 정적 int8 로 양자화합니다.
+    Conv+BN+ReLU 를 먼저 합친 뒤 calibration_inputs 로 활성값 범위를 관측하고 변환합니다.
+    """
+    model.eval()
+    wrapped = QuantizedFeatureExtractor(model.FeatureExtraction)
+    wrapped.eval()
+    torch.ao.quantization.fuse_modules(wrapped.ConvNet, _fusable_groups(wrapped.ConvNet), inplace=True)
+    torch.backends.quantized.engine = backend
+    wrapped.qconfig = torch.ao.quantization.get_default_qconfig(backend)
+    torch.ao.quantization.prepare(wrapped, inplace=True)
+    with torch.no_grad():
+        for tensor in calibration_inputs:
+            wrapped(tensor)
+    torch.ao.quantization.convert(wrapped, inplace=True)
+    model.FeatureExtraction = wrapped
+    return model
+
+def finetuned_network():
+    """가중치 없이 finetuned.yaml 설정으로 fp32 인식 모델(Model) 뼈대를 만듭니다."""
+    with open(os.path.join(USER_NETWORK_DIR, f'{RECOG_NETWORK}.yaml'), encoding='utf8') as f:
+        recog_config = yaml.safe_load(f)
+    if USER_NETWORK_DIR not in sys.path:
+        sys.path.append(USER_NETWORK_DIR)
+    network = importlib.import_module(RECOG_NETWORK)
+
+    # CTC blank 토큰이 앞에 하나 더 붙습니다. (EasyOCR CTCLabelConverter 와 동일)
+    num_class = len(recog_config['character_list']) + 1
+    return network.Model(num_class=num_class, **recog_config['network_params'])
+
+def load_finetuned_model(model_storage_directory=MODEL_STORAGE_DIR):
+    """finetuned.yaml 설정과 finetuned.pth 가중치로 fp32 인식 모델(Model)을 만듭니다."""
+    model = finetuned_network()
+    state_dict = torch.load(os.path.join(model_storage_directory, f'{RECOG_NETWORK}.pth'), map_location='cpu')
+    model.load_state_dict({(key[7:] if key.startswith('module.') else key): value for key, value in state_dict.items()})
+    return model.eval()
+
+def fold_conv_bn(model):
+    """FeatureExtraction 의 Conv2d → BatchNorm2d 쌍을 하나의 Conv2d 로 합칩니다. (추론 전용)"""
+    conv_net = model.FeatureExtraction.ConvNet
+    layers = list(conv_net.children())
+    for idx in range(len(layers) - 1):
+        if isinstance(layers[idx], nn.Conv2d) and isinstance(layers[idx + 1], nn.BatchNorm2d):
+            conv_net[idx] = torch.nn.utils.fusion.fuse_conv_bn_eval(layers[idx], layers[idx + 1])
+            conv_net[idx + 1] = nn.Identity()
+    return model
+
+class RecognizerGraph(nn.Module):
+    """
+    내보내기용 래퍼: EasyOCR 이 넘기는 text 인자 없이 이미지 텐서만 받습니다.
+    AdaptiveAvgPool2d((None, 1)) 은 높이 축 평균과 같으므로 mean 으로 풀어 써서
+    너비가 가변인 ONNX 그래프로도 내보낼 수 있게 합니다.
+    """
+
+    def __init__(self, model):
+        super(RecognizerGraph, self).__init__()
+        self.model = model
+
+    def forward(self, input):
+        visual_feature = self.model.FeatureExtraction(input)
+        visual_feature = visual_feature.permute(0, 3, 1, 2).mean(3)
+        contextual_feature = self.model.SequenceModeling(visual_feature)
+        return self.model.Prediction(contextual_feature.contiguous())
+
+class TorchScriptRecognizer(nn.Module):
+    """고정(frozen)된 TorchScript 그래프를 EasyOCR 인식 모델 자리에 끼우는 어댑터"""
+
+    def __init__(self, path):
+        super(TorchScriptRecognizer, self).__init__()
+        self.graph = torch.jit.load(path, map_location='cpu')
+
+    def forward(self, input, text=None):
+        return self.graph(input)
+
+class OnnxRecognizer(nn.Module):
+    """
+    ONNX Runtime 세션을 EasyOCR 인식 모델 자리에 끼우는 어댑터
+    세션의 스레드 풀은 fork 후 자식 프로세스에서 쓸 수 없으므로 세션은 프로세스마다 처음 쓸 때 새로 만듭니다.
+    """
+
+    def __init__(self, path, threads=None):
+        super(OnnxRecognizer, self).__init__()
+        self.path = path
+        self.threads = threads
+        self._session = None
+        self._pid = None
+        self.input_name = self.session.get_inputs()[0].name
+
+    @property
+    def session(self):
+        if self._pid != os.getpid():
+            import onnxruntime as ort # type: ignore
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+                options.inter_op_num_threads = 1
+            self._session = ort.InferenceSession(self.path, sess_options=options, providers=['CPUExecutionProvider'])
+            self._pid = os.getpid()
+        return self._session
+
+    def forward(self, input, text=None):
+        output = self.session.run(None, {self.input_name: input.detach().cpu().numpy()})[0]
+        return torch.from_numpy(output)
+
+def load_recognizer_backend(backend, model_storage_directory=MODEL_STORAGE_DIR, threads=None):
+    """
+    내보낸 TorchScript/ONNX 그래프를 불러와 EasyOCR 인식 모델로 쓸 수 있는 모듈을 반환합니다.
+    threads 는 ONNX Runtime 세션 옵션에만 적용됩니다. (TorchScript 는 프로세스 전체 torch 스레드 풀을 씀)
+    """
+    if backend == 'torchscript':
+        if threads:
+            print("⚠️ torchscript 백엔드에는 인식 스레드 수(threads)를 따로 적용하지 않습니다. (torch 전역 스레드 수 사용)")
+        return TorchScriptRecognizer(os.path.join(model_storage_directory, TORCHSCRIPT_FILENAME)).eval()
+    if backend == 'onnx':
+        return OnnxRecognizer(os.path.join(model_storage_directory, ONNX_FILENAME), threads).eval()
+    raise ValueError(f"지원하지 않는 인식 백엔드입니다: {backend}")
+
+def share_reader_memory(reader):
+    """
+    gunicorn preload 모드에서 워커를 fork 하기 전에 호출합니다.
+    검출/인식 모델의 가중치와 버퍼를 추론 전용(requires_grad=False)으로 고정하고 공유 메모리로 옮겨,
+    fork 된 워커들이 같은 가중치 페이지를 복사 없이 함께 읽도록 합니다.
+    양자화(packed) 가중치와 TorchScript/ONNX 그래프는 옮길 수 없어 copy-on-write 공유에 맡깁니다.
+    스냅샷에서 메모리 매핑으로 불러온 가중치는 이미 페이지 캐시로 공유되므로 옮기지 않습니다.
+    공유 메모리로 옮긴 바이트 수를 반환합니다.
+    """
+    shared = 0
+    mapped = getattr(reader, 'model_snapshot', None) is not None
+    for module in (getattr(reader, 'detector', None), getattr(reader, 'recognizer', None)):
+        if not isinstance(module, nn.Module):
+            continue
+        module.eval()
+        for tensor in itertools.chain(module.parameters(), module.buffers()):
+            tensor.requires_grad_(False)
+            if mapped:
+                continue
+            tensor.share_memory_()
+            shared += tensor.numel() * tensor.element_size()
+    return shared
+
+def set_worker_threads(torch_threads=None, cv2_threads=None, reader=None):
+    """
+    fork 된 워커 프로세스의 torch / OpenCV 스레드 수를 정합니다. (워커끼리 코어를 나눠 쓰도록)
+    torch.set_num_threads 는 프로세스 전역 설정이라 CRAFT 검출과 torch/torchscript 인식 모델에 함께 적용됩니다.
+    reader 의 인식 모델이 스레드 수가 정해지지 않은 ONNX 백엔드이면 워커에서 만들 세션에도 같은 값을 씁니다.
+    """
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+        recognizer = getattr(reader, 'recognizer', None)
+        if isinstance(recognizer, OnnxRecognizer) and not recognizer.threads:
+            recognizer.threads = torch_threads
+    if cv2_threads is not None:
+        cv2.setNumThreads(cv2_threads)
+
+def snapshot_sources(model_storage_directory=MODEL_STORAGE_DIR):
+    """스냅샷으로 만드는 원본 가중치 파일 {모델 이름: 경로}"""
+    return {
+        'detector': os.path.join(model_storage_directory, DETECTOR_FILENAME),
+        'recognizer': os.path.join(model_storage_directory, f'{RECOG_NETWORK}.pth'),
+    }
+
+def _file_stamp(path):
+    """원본 파일이 바뀌었는지 확인하기 위한 (크기, 수정 시각)"""
+    return {'size': os.path.getsize(path), 'mtime': int(os.path.getmtime(path))}
+
+def _load_craft(path):
+    """EasyOCR 과 같은 방식으로 CRAFT 검출 모델 fp32 가중치를 불러옵니다. (배포 파일 MD5 확인 포함)"""
+    from easyocr.craft import CRAFT # type: ignore
+    from easyocr.detection import copyStateDict # type: ignore
+    with open(path, 'rb') as f:
+        md5 = hashlib.md5(f.read()).hexdigest()
+    if md5 != detection_models['craft']['md5sum']:
+        raise ValueError(f"검출 모델 MD5 가 맞지 않습니다: {path}")
+    model = CRAFT()
+    model.load_state_dict(copyStateDict(torch.load(path, map_location='cpu', weights_only=False)))
+    return model.eval()
+
+def build_model_snapshot(model_storage_directory=MODEL_STORAGE_DIR, snapshot_dir=None):
+    """
+    검출(CRAFT)/인식(finetuned) 모델의 fp32 가중치를 mmap 으로 바로 매핑할 수 있는 스냅샷으로 저장합니다. (빌드 시 1회)
+    state_dict 만 torch 의 zip 형식으로 저장하므로 불러올 때 torch.load(mmap=True, weights_only=True) 로
+    텐서를 복사하지 않고 파일 페이지를 그대로 씁니다. 원본 파일의 크기/수정 시각을 manifest.json 에 기록하며,
+    원본이 없는 모델은 건너뜁니다. 기록한 manifest 를 반환합니다.
+    """
+    snapshot_dir = snapshot_dir or os.path.join(model_storage_directory, SNAPSHOT_DIRNAME)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    loaders = {'detector': _load_craft, 'recognizer': lambda path: load_finetuned_model(model_storage_directory)}
+    manifest = {'torch': torch.__version__, 'easyocr': easyocr.__version__, 'models': {}}
+    for name, source in snapshot_sources(model_storage_directory).items():
+        if not os.path.exists(source):
+            print(f"⚠️ 원본 가중치가 없어 {name} 스냅샷을 건너뜁니다: {source}")
+            continue
+        filename = f'{name}.pt'
+        torch.save(loaders[name](source).state_dict(), os.path.join(snapshot_dir, filename))
+        manifest['models'][name] = {'file': filename, 'source': os.path.basename(source), **_file_stamp(source)}
+    with open(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def load_snapshot_manifest(snapshot_dir, model_storage_directory=MODEL_STORAGE_DIR, needed=('detector', 'recognizer')):
+    """
+    needed 모델의 스냅샷이 모두 있고 원본 가중치와 일치하면 manifest 를, 아니면 None 을 반환합니다.
+    원본 가중치가 아예 없으면(스냅샷만 배포한 경우) 스냅샷을 그대로 씁니다.
+    """
+    path = os.path.join(snapshot_dir, SNAPSHOT_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('torch') != torch.__version__:
+        print(f"⚠️ 모델 스냅샷의 torch 버전({manifest.get('torch')})이 달라 사용하지 않습니다.")
+        return None
+    sources = snapshot_sources(model_storage_directory)
+    for name in needed:
+        entry = manifest['models'].get(name)
+        if entry is None or not os.path.exists(os.path.join(snapshot_dir, entry['file'])):
+            print(f"⚠️ {name} 모델 스냅샷이 없어 원본 가중치를 불러옵니다. (scripts/build_model_snapshot.py)")
+            return None
+        if os.path.exists(sources[name]) and _file_stamp(sources[name]) != {'size': entry['size'], 'mtime': entry['mtime']}:
+            print(f"⚠️ {entry['source']} 가 스냅샷 이후 바뀌어 원본 가중치를 불러옵니다. (scripts/build_model_snapshot.py 로 다시 만드세요)")
+            return None
+    return manifest
+
+def _mapped_module(build, path, quantize):
+    """
+    스냅샷 파일을 메모리 매핑해 모듈 가중치로 그대로 씁니다.
+    모듈은 meta 장치에서 만들어 곧 버릴 가중치의 무작위 초기화(CRAFT 는 약 2초)를 건너뛰고,
+    assign=True 로 매핑된 텐서를 복사 없이 끼웁니다.
+    """
+    with torch.device('meta'):
+        module = build()
+    module.load_state_dict(torch.load(path, map_location='cpu', mmap=True, weights_only=True), assign=True)
+    module.eval()
+    if quantize:
+        # EasyOCR 의 quantize=True 와 같은 동적 int8 양자화 (LSTM/Linear 만 새 가중치로 바뀌고 나머지는 매핑 유지)
+        torch.quantization.quantize_dynamic(module, dtype=torch.qint8, inplace=True)
+    return module
+
+def reader_from_snapshot(snapshot_dir, manifest, detector=True, recognizer=True, quantize=True,
+                         model_storage_directory=MODEL_STORAGE_DIR):
+    """
+    가중치 없이 만든 EasyOCR Reader 에 스냅샷에서 매핑한 검출/인식 모델을 채웁니다.
+    Reader 가 하는 일(언어/문자 목록 설정, 변환기 생성, 동적 양자화)은 같고 가중치 파일 읽기만 다릅니다.
+    recognizer 가 False 이면 변환기만 만들어 두며, 인식 모델은 호출한 쪽에서 끼웁니다.
+    """
+    from easyocr.craft import CRAFT # type: ignore
+    from easyocr.detection import get_textbox # type: ignore
+    from easyocr.utils import CTCLabelConverter # type: ignore
+    reader = easyocr.Reader(
+        ['ko'],
+        model_storage_directory=model_storage_directory,
+        user_network_directory=USER_NETWORK_DIR,
+        recog_network=RECOG_NETWORK,
+        download_enabled=False,
+        gpu=False,
+        detector=False,
+        recognizer=False,
+        verbose=False,
+        quantize=quantize
+    )
+    models = manifest['models']
+    if detector:
+        reader.detect_network = 'craft'
+        reader.get_textbox = get_textbox
+        reader.detector = _mapped_module(CRAFT, os.path.join(snapshot_dir, models['detector']['file']), quantize)
+    reader.converter = CTCLabelConverter(reader.character, {}, {'ko': os.path.join(BASE_PATH, 'dict', 'ko.txt')})
+    if recognizer:
+        reader.recognizer = _mapped_module(finetuned_network, os.path.join(snapshot_dir, models['recognizer']['file']), quantize)
+    reader.model_snapshot = snapshot_dir
+    return reader
@@ -0,0 +1,774 @@
+import os
+import queue
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import cv2
+import numpy as np
+from pdf2image import convert_from_path # type: ignore
+
+from utils.image_processor import enhance_image_for_ocr, quick_enhance_for_ocr, binarize_for_ocr, orient_and_deskew
+from utils.form_templates import recognize_template_fields
+from utils.line_segmentation import segment_text_lines, SEGMENT_MIN_CONFIDENCE
+from utils.batch_recognition import page_line_crops, recognize_crops, RECOG_BATCH_SIZE
+from utils.recognition_broker import BrokeredReader
+from utils.pdf_tools import (render_pdf_pages, pdf_page_count, pdf_info, choose_render_dpi, decode_image_bytes,
+                             extract_pdf_text, DEFAULT_DPI)
+
+# 캐스케이드 기본값: 1차 인식 신뢰도 기준, 페이지 전체를 다시 처리할 낮은 신뢰도 박스 비율, 박스 재인식 시 여백(px)
+CASCADE_MIN_CONFIDENCE = 0.5
+CASCADE_PAGE_RATIO = 0.3
+CASCADE_BOX_PADDING = 4
+
+# PDF 텍스트 레이어를 OCR 대신 쓰기 위한 페이지당 최소 글자 수(공백 제외)와 허용하는 깨진 글자 비율
+TEXT_LAYER_MIN_CHARS = 20
+TEXT_LAYER_MAX_BAD_RATIO = 0.05
+
+def save_pdf_as_images(pdf_path, save_dir, prefix, poppler_path, first_page=None, last_page=None,
+                       dpi=DEFAULT_DPI, gray=False, thread_count=1):
+    images = convert_from_path(pdf_path, poppler_path=poppler_path, first_page=first_page, last_page=last_page,
+                               dpi=dpi, grayscale=gray, thread_count=thread_count)
+    image_paths = []
+    for i, image in enumerate(images):
+        img_path = os.path.join(save_dir, f"{prefix}_page_{(first_page or 1)+i}.png")
+        image.save(img_path, 'PNG')
+        image_paths.append(img_path)
+    return image_paths
+
+class TextLayerPage:
+    """PDF 텍스트 레이어에서 바로 얻은 페이지 (래스터화/전처리/인식을 건너뜁니다)"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def results(self):
+        """OCR 페이지 결과와 같은 형식의 줄 목록. 위치 정보가 없으므로 box 는 None, 신뢰도는 1.0 입니다."""
+        return [{'box': None, 'text': line.strip(), 'confidence': 1.0}
+                for line in self.text.splitlines() if line.strip()]
+
+def usable_text_layer(text, min_chars=TEXT_LAYER_MIN_CHARS):
+    """
+    추출한 페이지 텍스트를 OCR 대신 쓸 수 있는지 판단합니다.
+    글자가 너무 적거나(스캔 페이지, 머리글만 있는 페이지) 글꼴 매핑이 깨져
+    대체 문자(U+FFFD)나 사용자 정의 영역 문자가 많은 페이지는 OCR 로 넘깁니다.
+    """
+    chars = [ch for ch in text if not ch.isspace()]
+    if len(chars) < min_chars:
+        return False
+    bad = sum(1 for ch in chars if ch == '\ufffd' or unicodedata.category(ch) in ('Co', 'Cc', 'Cn'))
+    return bad / len(chars) <= TEXT_LAYER_MAX_BAD_RATIO
+
+def text_layer_plan(doc, poppler_path):
+    """
+    PDF 페이지마다 텍스트 레이어를 쓸 수 있으면 TextLayerPage, OCR 이 필요하면 None 인 목록을 반환합니다.
+    doc['text_layer'] 가 꺼져 있거나 PDF 가 아니거나 추출에 실패하면 None 을 반환합니다.
+    """
+    if not (doc['is_pdf'] and doc.get('text_layer')):
+        return None
+    pdf = doc['data'] if 'data' in doc else doc['path']
+    try:
+        texts = extract_pdf_text(pdf, poppler_path)
+    except Exception as e:
+        print(f"⚠️ '{doc['name']}' 텍스트 레이어 추출 실패, 전체 페이지를 OCR 합니다: {e}")
+        return None
+    plan = [TextLayerPage(text) if usable_text_layer(text) else None for text in texts]
+    ocr_pages = [page_no for page_no, page in enumerate(plan, 1) if page is None]
+    print(f"📄 '{doc['name']}' 텍스트 레이어 사용 {len(plan) - len(ocr_pages)}/{len(plan)}페이지"
+          f"{f', OCR 대상 페이지: {ocr_pages}' if ocr_pages else ''}")
+    return plan
+
+def render_options(doc, poppler_path):
+    """
+    PDF 렌더링 옵션(dpi, gray, thread_count)을 정합니다.
+    doc['render'] 의 mode 가 'gray' 이면 흑백으로 렌더링하고, 첫 페이지 크기와
+    목표 글자 높이(text_pt 포인트 글자를 text_px 픽셀로)로 DPI 를 고릅니다.
+    그 외에는 기존과 같은 200 DPI 컬러 렌더링입니다.
+    """
+    render = doc.get('render') or {}
+    options = {'dpi': DEFAULT_DPI, 'gray': False, 'thread_count': render.get('threads', 1)}
+    if render.get('mode') == 'gray':
+        info = pdf_info(doc['data'] if 'data' in doc else doc['path'], poppler_path)
+        options['dpi'] = choose_render_dpi(info['page_size'], render.get('text_pt', 10.0), render.get('text_px', 28))
+        options['gray'] = True
+        print(f"🖨️ '{doc['name']}' 흑백 렌더링 (페이지 크기 {info['page_size']} pt → {options['dpi']} DPI)")
+    return options
+
+def _render_pdf_page(doc, save_dir, poppler_path, page_no, options):
+    """PDF 의 한 페이지만 래스터화합니다. (메모리 모드는 배열, 디스크 모드는 이미지 경로)"""
+    if 'data' in doc:
+        return render_pdf_pages(doc['data'], poppler_path, options['dpi'], page_no, page_no, options['gray'])[0]
+    return save_pdf_as_images(doc['path'], save_dir, doc['name'], poppler_path, page_no, page_no,
+                              options['dpi'], options['gray'])[0]
+
+def load_document_pages(doc, save_dir, poppler_path):
+    """
+    문서를 페이지 입력 목록으로 변환합니다.
+    doc 에 'data'(업로드 바이트)가 있으면 메모리 모드로 numpy 배열 목록을,
+    없으면 기존처럼 디스크의 이미지 파일 경로 목록을 반환합니다.
+    doc['text_layer'] 가 켜진 PDF 는 텍스트 레이어가 있는 페이지를 TextLayerPage 로 두고
+    나머지 페이지만 래스터화합니다.
+    """
+    if not doc['is_pdf']:
+        return [decode_image_bytes(doc['data'])] if 'data' in doc else [doc['path']]
+
+    plan = text_layer_plan(doc, poppler_path)
+    if plan and all(page is not None for page in plan):
+        return plan
+    options = render_options(doc, poppler_path)
+    if plan and any(page is not None for page in plan):
+        return [page if page is not None else _render_pdf_page(doc, save_dir, poppler_path, page_no, options)
+                for page_no, page in enumerate(plan, 1)]
+    if 'data' in doc:
+        return render_pdf_pages(doc['data'], poppler_path, **options)
+    return save_pdf_as_images(doc['path'], save_dir, doc['name'], poppler_path, **options)
+
+def page_enhance_names(doc, page_count):
+    """페이지별 전처리 결과 파일명 목록 (메모리 모드에서는 None 으로 저장을 생략)"""
+    if 'data' in doc:
+        return [None] * page_count
+    if not doc['is_pdf']:
+        return [f"enhanced_{doc['filename']}"]
+    # 확장자 강제 부여
+    return [f"enhanced_{doc['filename']}_page_{idx+1}.png" for idx in range(page_count)]
+
+def serialize_ocr_results(results):
+    """EasyOCR readtext 결과를 JSON 으로 저장 가능한 페이지 결과(박스, 텍스트, 신뢰도) 목록으로 바꿉니다."""
+    return [
+        {
+            'box': [[int(x), int(y)] for x, y in box],
+            'text': text,
+            'confidence': float(confidence),
+        }
+        for box, text, confidence in results
+    ]
+
+def pages_to_text(pages):
+    """페이지 결과 목록을 기존과 같은 줄바꿈 형식의 전체 텍스트로 합칩니다."""
+    return "\n".join("\n".join(item['text'] for item in page) for page in pages)
+
+def add_stage_timings(total, part):
+    """페이지별 전처리 단계 시간과 캐스케이드 집계값(part)을 문서 합계(total)에 더합니다."""
+    for stage, value in part.items():
+        value = total.get(stage, 0) + value
+        total[stage] = round(value, 4) if isinstance(value, float) else value
+    return total
+
+def readtext_page(reader, image, segmentation=None, timings=None):
+    """
+    전처리된 페이지(배열 또는 저장 경로)를 인식합니다.
+    segmentation 이 'projection' 이면 CRAFT 검출 대신 segment_text_lines 로 찾은 줄 박스를
+    reader.recognize 에 바로 넘기고, 분할 품질이 나쁘거나 평균 신뢰도가 낮으면 readtext(CRAFT)로 다시 인식합니다.
+    timings 에 segment(분할 시간), segment_pages / segment_fallback_pages(페이지 수)를 채웁니다.
+    """
+    if segmentation == 'projection':
+        timings = timings if timings is not None else {}
+        started = time.perf_counter()
+        gray = cv2.imread(image, cv2.IMREAD_GRAYSCALE) if isinstance(image, str) else image
+        if gray is not None and gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        boxes, reason = segment_text_lines(gray) if gray is not None else (None, 'unreadable')
+        timings['segment'] = round(time.perf_counter() - started, 4)
+        if boxes:
+            results = serialize_ocr_results(reader.recognize(gray, horizontal_list=boxes, free_list=[]))
+            if results and np.mean([item['confidence'] for item in results]) >= SEGMENT_MIN_CONFIDENCE:
+                timings['segment_pages'] = 1
+                return [item for item in results if item['text']]
+            reason = 'low_confidence'
+        timings['segment_fallback_pages'] = 1
+        print(f"⚠️ 투영 분할 결과가 좋지 않아({reason}) CRAFT 검출로 다시 인식합니다.")
+    return serialize_ocr_results(reader.readtext(image))
+
+def _box_crop(gray, box, padding=CASCADE_BOX_PADDING):
+    """박스 꼭짓점을 감싸는 영역을 여백과 함께 잘라냅니다."""
+    xs = [x for x, _ in box]
+    ys = [y for _, y in box]
+    h, w = gray.shape[:2]
+    x0, x1 = max(0, min(xs) - padding), min(w, max(xs) + padding)
+    y0, y1 = max(0, min(ys) - padding), min(h, max(ys) + padding)
+    return gray[y0:y1, x0:x1]
+
+def cascade_ocr_page(reader, page, enhance_name, profile, cascade, timings, segmentation=None):
+    """
+    빠른 1차 인식 후 신뢰도가 낮은 부분만 전체 전처리로 다시 인식합니다.
+    1) quick_enhance_for_ocr(방향 보정 + 흑백 + 이진화)로 전처리해 readtext
+    2) 박스가 없거나 신뢰도가 min_confidence 미만인 박스 비율이 page_ratio 를 넘으면
+       페이지 전체를 enhance_image_for_ocr 체인으로 다시 처리
+    3) 그 외에는 낮은 신뢰도 박스만 흑백 원본에서 잘라 노이즈 제거/이진화 후 reader.recognize 로
+       다시 인식하고, 신뢰도가 더 높은 결과를 채택
+    timings 에 cascade_* 집계(1차/재인식 시간, 박스 수, 건너뛴 페이지 수 등)를 채웁니다.
+    """
+    min_confidence = cascade.get('min_confidence', CASCADE_MIN_CONFIDENCE)
+    started = time.perf_counter()
+    quick = quick_enhance_for_ocr(page)
+    if quick is None:
+        return None, None
+    binary, gray = quick
+    results = readtext_page(reader, binary, segmentation, timings)
+    low = [idx for idx, item in enumerate(results) if item['confidence'] < min_confidence]
+    timings['cascade_fast'] = round(time.perf_counter() - started, 4)
+    timings['cascade_boxes'] = len(results)
+    timings['cascade_low_boxes'] = len(low)
+
+    if not results or len(low) > cascade.get('page_ratio', CASCADE_PAGE_RATIO) * len(results):
+        timings['cascade_full_pages'] = 1
+        return _full_ocr_page(reader, page, enhance_name, profile, timings, segmentation=segmentation)
+
+    started = time.perf_counter()
+    improved = 0
+    for idx in low:
+        crop = _box_crop(gray, results[idx]['box'])
+        if crop.size == 0:
+            continue
+        retry = reader.recognize(binarize_for_ocr(crop, profile))
+        if retry and retry[0][2] > results[idx]['confidence']:
+            results[idx] = dict(results[idx], text=retry[0][1], confidence=float(retry[0][2]))
+            improved += 1
+    timings['cascade_box_rerun'] = round(time.perf_counter() - started, 4)
+    timings['cascade_improved_boxes'] = improved
+    # 전체 전처리(기울기 보정 + 페이지 노이즈 제거)를 건너뛴 페이지 수
+    timings['cascade_skipped_pages'] = 1
+    return results, None
+
+def template_ocr_page(reader, deskewed, templates, timings, segmentation=None):
+    """
+    기울기 보정된 페이지가 등록된 양식 템플릿과 맞으면 템플릿 영역만 인식한 페이지 결과를, 아니면 None 을 반환합니다.
+    적중하면 페이지 전체 검출 없이 고정 필드 박스는 '라벨: 값' 으로 인식하고, 특약사항/계약내용처럼 템플릿이
+    자유 기재 영역(multiline)으로 표시한 곳만 readtext_page 로 줄 검출·인식합니다. (recognize_template_fields)
+    timings 에 template_match(매칭 시간), template_hits(적중 페이지 수)를 채웁니다.
+    """
+    started = time.perf_counter()
+    matched = templates.match(deskewed)
+    timings['template_match'] = round(time.perf_counter() - started, 4)
+    if matched is None:
+        return None
+    template, transform, score = matched
+    results = recognize_template_fields(reader, deskewed, template, transform,
+                                        lambda crop: readtext_page(reader, crop, segmentation, timings))
+    if results is None:
+        print(f"⚠️ 양식 '{template.title}' 과 맞지만(점수 {score:.2f}) 필드 인식 신뢰도가 낮아 페이지 전체를 인식합니다.")
+        return None
+    print(f"📋 양식 '{template.title}' 적중 (점수 {score:.2f}): 템플릿 영역 결과 {len(results)}줄")
+    timings['template_hits'] = 1
+    return results
+
+def _full_ocr_page(reader, page, enhance_name, profile, timings, templates=None, segmentation=None):
+    enhanced, deskewed = enhance_image_for_ocr(page, enhance_name, profile=profile, timings=timings)
+    if enhanced is None:
+        return None, None
+    enhanced_path = enhanced if enhance_name else None
+    results = template_ocr_page(reader, deskewed, templates, timings if timings is not None else {},
+                                segmentation) if templates else None
+    if results is None:
+        results = readtext_page(reader, enhanced, segmentation, timings)
+    return results, enhanced_path
+
+def _cascade_ocr_page(reader, page, enhance_name, profile, cascade, timings, templates=None, segmentation=None):
+    """
+    캐스케이드 처리 전에 양식 템플릿부터 확인합니다. 매칭에 필요한 방향/기울기 보정만 먼저 하고
+    (orient_and_deskew, 노이즈 제거 생략) 맞으면 템플릿 결과를, 맞지 않는 페이지는 cascade_ocr_page 로 처리합니다.
+    """
+    if templates:
+        started = time.perf_counter()
+        deskewed = orient_and_deskew(page)
+        timings['template_deskew'] = round(time.perf_counter() - started, 4)
+        results = template_ocr_page(reader, deskewed, templates, timings, segmentation) if deskewed is not None else None
+        if results is not None:
+            return results, None
+    return cascade_ocr_page(reader, page, enhance_name, profile, cascade, timings, segmentation)
+
+def ocr_page(reader, page, enhance_name, profile='quality', timings=None, cascade=None, templates=None,
+             segmentation=None):
+    """
+    페이지 한 장(파일 경로 또는 numpy 배열)을 전처리 후 인식합니다.
+    (페이지 결과 목록, 전처리 이미지 경로)를 반환하며, 전처리에 실패하면 페이지 결과가 None 입니다.
+    텍스트 레이어 페이지는 OCR 없이 추출한 텍스트를 그대로 반환합니다.
+    timings 딕셔너리를 넘기면 전처리 단계별 소요 시간이 채워집니다.
+    templates(TemplateRegistry)를 넘기면 먼저 알려진 양식인지 확인해 맞으면 템플릿 영역 결과(template_ocr_page)만 반환합니다.
+    cascade 설정({'min_confidence', 'page_ratio'})을 넘기면 양식과 맞지 않는 페이지를 cascade_ocr_page 로 처리합니다.
+    segmentation 은 readtext_page 의 줄 검출 방식('craft' / 'projection')입니다.
+    """
+    if isinstance(page, TextLayerPage):
+        return page.results(), None
+    if cascade:
+        return _cascade_ocr_page(reader, page, enhance_name, profile, cascade, timings if timings is not None else {},
+                                 templates, segmentation)
+    return _full_ocr_page(reader, page, enhance_name, profile, timings, templates, segmentation)
+
+def ocr_images(reader, pages, enhance_names, profile='quality', timings=None, cascade=None, page_stats=None,
+               templates=None, segmentation=None):
+    page_results = []
+    enhanced_paths = []
+    for page, enhance_name in zip(pages, enhance_names):
+        page_timings = {}
+        results, enhanced_path = ocr_page(reader, page, enhance_name, profile, page_timings, cascade, templates,
+                                          segmentation)
+        if timings is not None:
+            add_stage_timings(timings, page_timings)
+        if page_stats is not None:
+            page_stats.append(page_timings)
+        if results is None:
+            continue
+        if enhanced_path:
+            enhanced_paths.append(enhanced_path)
+        page_results.append(results)
+    return page_results, enhanced_paths
+
+def _page_paths(pages):
+    """정리(삭제) 대상이 되는 디스크 페이지 경로만 골라냅니다."""
+    return [page for page in pages if isinstance(page, str)]
+
+def ocr_document(reader, doc, save_dir, poppler_path, streaming=False, queue_size=2):
+    """
+    문서 하나(PDF 또는 이미지)를 순차적으로 OCR 합니다.
+    doc: {'name', 'filename', 'is_pdf'} 와 'path'(디스크) 또는 'data'(메모리) 를 가진 딕셔너리
+    streaming 이 True 이면 PDF 는 ocr_pdf_streaming 파이프라인으로 처리합니다.
+    """
+    if streaming and doc['is_pdf']:
+        return ocr_pdf_streaming(reader, doc, poppler_path, queue_size)
+
+    started = time.perf_counter()
+    pages = load_document_pages(doc, save_dir, poppler_path)
+    rasterized = time.perf_counter()
+    preprocess = {}
+    page_stats = []
+    page_results, enhanced_paths = ocr_images(reader, pages, page_enhance_names(doc, len(pages)),
+                                              doc.get('preprocess_profile', 'quality'), preprocess,
+                                              doc.get('cascade'), page_stats, doc.get('templates'),
+                                              doc.get('segmentation'))
+    finished = time.perf_counter()
+
+    return {
+        'text': pages_to_text(page_results),
+        'pages': page_results,
+        'image_paths': _page_paths(pages),
+        'enhanced_paths': enhanced_paths,
+        'page_stats': page_stats,
+        'timings': {
+            'rasterize': round(rasterized - started, 3),
+            'ocr': round(finished - rasterized, 3),
+            'total': round(finished - started, 3),
+            'preprocess': preprocess,
+        }
+    }
+
+_STREAM_END = object()
+
+def _put(q, item, stop):
+    """큐가 가득 차 있으면 기다리되, 파이프라인이 중단되면 포기합니다."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop):
+    """큐에서 항목을 꺼내되, 파이프라인이 중단되면 종료 표시를 돌려줍니다."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _STREAM_END
+
+def ocr_pdf_streaming(reader, doc, poppler_path, queue_size=2, on_page=None):
+    """
+    PDF 를 래스터화 → 전처리 → 인식의 3단계 파이프라인으로 처리합니다.
+    페이지는 poppler 의 first_page/last_page 로 한 장씩 렌더링되고,
+    단계 사이는 크기가 제한된 큐로 연결되어 있어 동시에 메모리에 올라가는 페이지 수가
+    전체 페이지 수와 무관하게 약 (queue_size * 2 + 3) 장 이내로 유지됩니다.
+    on_page(page_no, text) 를 넘기면 각 페이지 텍스트가 준비되는 즉시 호출됩니다.
+    텍스트 레이어를 쓸 수 있는 페이지는 렌더링/전처리/인식을 거치지 않고 그대로 흘려보냅니다.
+    """
+    pdf = doc['data'] if 'data' in doc else doc['path']
+    started = time.perf_counter()
+    plan = text_layer_plan(doc, poppler_path)
+    page_count = len(plan) if plan is not None else pdf_page_count(pdf, poppler_path)
+    options = render_options(doc, poppler_path)
+
+    raster_q = queue.Queue(maxsize=queue_size)
+    enhance_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    timings = {'rasterize': 0.0, 'enhance': 0.0, 'ocr': 0.0, 'first_page': None}
+    preprocess = {}
+    page_stats = []
+    profile = doc.get('preprocess_profile', 'quality')
+    cascade = doc.get('cascade')
+    templates = doc.get('templates')
+    segmentation = doc.get('segmentation')
+
+    def rasterize_stage():
+        try:
+            for page_no in range(1, page_count + 1):
+                if stop.is_set():
+                    return
+                if plan and plan[page_no - 1] is not None:
+                    page = plan[page_no - 1]
+                else:
+                    stage_start = time.perf_counter()
+                    page = render_pdf_pages(pdf, poppler_path, options['dpi'], page_no, page_no, options['gray'])[0]
+                    timings['rasterize'] += time.perf_counter() - stage_start
+                if not _put(raster_q, (page_no, page), stop):
+                    return
+        except Exception as e:
+            _put(raster_q, e, stop)
+        _put(raster_q, _STREAM_END, stop)
+
+    def enhance_stage():
+        while True:
+            item = _get(raster_q, stop)
+            if item is _STREAM_END or isinstance(item, Exception):
+                _put(enhance_q, item, stop)
+                if item is _STREAM_END:
+                    return
+                continue
+            page_no, page = item[:2]
+            # 캐스케이드는 인식 결과에 따라 전처리가 달라지므로 인식 단계에서 함께 처리합니다.
+            if isinstance(page, TextLayerPage) or cascade:
+                if not _put(enhance_q, item, stop):
+                    return
+                continue
+            try:
+                stage_start = time.perf_counter()
+                page_timings = {}
+                enhanced, deskewed = enhance_image_for_ocr(page, None, profile=profile, timings=page_timings)
+                timings['enhance'] += time.perf_counter() - stage_start
+            except Exception as e:
+                enhanced, deskewed, page_timings = e, None, {}
+            if not _put(enhance_q, (page_no, enhanced, deskewed, page_timings), stop):
+                return
+
+    workers = [
+        threading.Thread(target=rasterize_stage, name=f"{doc['name']}-rasterize", daemon=True),
+        threading.Thread(target=enhance_stage, name=f"{doc['name']}-enhance", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    page_results = []
+    try:
+        while True:
+            item = enhance_q.get()
+            if item is _STREAM_END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            page_no, enhanced = item[:2]
+            if isinstance(enhanced, Exception):
+                raise enhanced
+            if enhanced is None:
+                continue
+            if isinstance(enhanced, TextLayerPage):
+                results = enhanced.results()
+                page_stats.append({})
+            elif cascade:
+                # 캐스케이드: 전처리 전 페이지가 (page_no, page) 로 그대로 넘어옵니다.
+                stage_start = time.perf_counter()
+                page_timings = {}
+                results, _ = _cascade_ocr_page(reader, enhanced, None, profile, cascade, page_timings, templates,
+                                               segmentation)
+                timings['ocr'] += time.perf_counter() - stage_start
+                add_stage_timings(preprocess, page_timings)
+                page_stats.append(page_timings)
+                if results is None:
+                    continue
+            else:
+                deskewed, page_timings = item[2:]
+                stage_start = time.perf_counter()
+                results = template_ocr_page(reader, deskewed, templates, page_timings, segmentation) if templates else None
+                if results is None:
+                    results = readtext_page(reader, enhanced, segmentation, page_timings)
+                timings['ocr'] += time.perf_counter() - stage_start
+                add_stage_timings(preprocess, page_timings)
+                page_stats.append(page_timings)
+            page_results.append(results)
+            if timings['first_page'] is None:
+                timings['first_page'] = time.perf_counter() - started
+            if on_page:
+                on_page(page_no, pages_to_text([results]))
+    finally:
+        # 오류로 빠져나온 경우에도 앞 단계 스레드가 큐에서 멈춰 있지 않도록 중단 신호를 보냅니다.
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=1)
+
+    timings = {key: round(value, 3) if value is not None else None for key, value in timings.items()}
+    timings['total'] = round(time.perf_counter() - started, 3)
+    timings['preprocess'] = preprocess
+    print(f"⏱️ '{doc['name']}' 스트리밍 OCR 완료 ({page_count}페이지): {timings}")
+    return {
+        'text': pages_to_text(page_results),
+        'pages': page_results,
+        'image_paths': [],
+        'enhanced_paths': [],
+        'page_stats': page_stats,
+        'timings': timings,
+    }
+
+def _timed(func, *args):
+    """func 실행 결과와 함께 (시작, 종료) 시각을 반환합니다."""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, started, time.perf_counter()
+
+def ocr_documents_concurrently(reader, docs, save_dir, poppler_path, max_workers, streaming=False, queue_size=2):
+    """
+    여러 문서를 하나의 제한된 스레드 풀에서 동시에 처리합니다.
+    PDF 래스터화와 페이지별 전처리/인식이 모두 같은 풀에서 실행되며,
+    결과 텍스트는 문서별로 원래 페이지 순서대로 합쳐집니다.
+    OpenCV 와 torch 연산은 GIL 을 해제하므로 스레드만으로도 병렬 효과가 있습니다.
+    streaming 이 True 이면 PDF 문서는 각각 하나의 스트리밍 파이프라인 작업으로 실행됩니다.
+    """
+    started = time.perf_counter()
+    results = {}
+    page_futures = {}
+    stream_futures = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr') as executor:
+        def submit_pages(doc, pages):
+            results[doc['name']]['image_paths'] = _page_paths(pages)
+            profile = doc.get('preprocess_profile', 'quality')
+            page_futures[doc['name']] = [
+                (executor.submit(_timed, ocr_page, reader, page, name, profile, page_timings, doc.get('cascade'),
+                                 doc.get('templates'), doc.get('segmentation')), page_timings)
+                for page, name, page_timings in zip(pages, page_enhance_names(doc, len(pages)), [{} for _ in pages])
+            ]
+
+        # 1) PDF 는 래스터화부터 병렬로 시작하고, 이미지는 바로 페이지 작업으로 넘깁니다.
+        raster_futures = {}
+        for doc in docs:
+            results[doc['name']] = {'image_paths': [], 'timings': {'rasterize': 0.0}}
+            if doc['is_pdf'] and streaming:
+                stream_futures[doc['name']] = executor.submit(ocr_pdf_streaming, reader, doc, poppler_path, queue_size)
+            elif doc['is_pdf']:
+                future = executor.submit(_timed, load_document_pages, doc, save_dir, poppler_path)
+                raster_futures[future] = doc
+            else:
+                submit_pages(doc, load_document_pages(doc, save_dir, poppler_path))
+
+        # 2) 래스터화가 끝나는 문서부터 페이지 작업을 제출합니다.
+        for future in as_completed(raster_futures):
+            doc = raster_futures[future]
+            pages, raster_start, raster_end = future.result()
+            results[doc['name']]['timings']['rasterize'] = round(raster_end - raster_start, 3)
+            submit_pages(doc, pages)
+
+        # 3) 문서별로 페이지 순서를 유지하며 결과를 병합합니다.
+        for doc in docs:
+            if doc['name'] in stream_futures:
+                results[doc['name']] = stream_futures[doc['name']].result()
+                continue
+            page_results = []
+            enhanced_paths = []
+            ocr_seconds = 0.0
+            preprocess = {}
+            page_stats = []
+            finished = started
+            for future, page_timings in page_futures[doc['name']]:
+                (page_result, enhanced_path), page_start, page_end = future.result()
+                ocr_seconds += page_end - page_start
+                add_stage_timings(preprocess, page_timings)
+                page_stats.append(page_timings)
+                finished = max(finished, page_end)
+                if page_result is None:
+                    continue
+                if enhanced_path:
+                    enhanced_paths.append(enhanced_path)
+                page_results.append(page_result)
+
+            result = results[doc['name']]
+            result['text'] = pages_to_text(page_results)
+            result['pages'] = page_results
+            result['enhanced_paths'] = enhanced_paths
+            result['page_stats'] = page_stats
+            result['timings']['ocr'] = round(ocr_seconds, 3)
+            result['timings']['total'] = round(finished - started, 3)
+            result['timings']['preprocess'] = preprocess
+
+    wall = time.perf_counter() - started
+    serial = sum(r['timings']['rasterize'] + r['timings'].get('enhance', 0) + r['timings']['ocr'] for r in results.values())
+    print(f"⏱️ 동시 OCR 완료: 총 {wall:.2f}s (순차 실행 추정 {serial:.2f}s, 약 {serial / max(wall, 1e-6):.1f}배)")
+    return results
+
+def ocr_documents_batched(reader, docs, save_dir, poppler_path, batch_size=RECOG_BATCH_SIZE, broker=None):
+    """
+    요청의 모든 문서를 검출과 인식 두 단계로 나눠 처리합니다.
+    1) 문서마다 페이지를 래스터화/전처리하고 줄 박스를 검출(CRAFT 또는 투영 분할)해 줄 이미지만 모아 둡니다.
+    2) 모든 문서·페이지의 줄 이미지를 패딩 폭이 같은 것끼리 묶어 큰 배치로 인식한 뒤 페이지/줄 순서대로 되돌립니다.
+    텍스트 레이어 페이지와 양식 템플릿이 맞은 페이지(template_ocr_page)는 1단계에서 결과가 정해져 줄을 모으지 않습니다.
+    캐스케이드는 페이지 인식 결과에 따라 다음 처리가 달라지므로 이 방식에서는 쓰지 않습니다.
+    broker(RecognitionBroker)를 넘기면 2단계를 브로커에 맡겨 동시에 들어온 다른 요청의 줄과 함께 인식합니다.
+    """
+    started = time.perf_counter()
+    results = {}
+    crops = []
+    owners = []  # crops 와 같은 순서의 (문서 이름, 페이지 순번)
+    segmented = {}  # 투영 분할로 검출한 페이지의 전처리 이미지 (신뢰도가 낮으면 readtext 로 다시 인식)
+
+    for doc in docs:
+        doc_start = time.perf_counter()
+        pages = load_document_pages(doc, save_dir, poppler_path)
+        rasterized = time.perf_counter()
+        profile = doc.get('preprocess_profile', 'quality')
+        templates = doc.get('templates')
+        page_results = []
+        enhanced_paths = []
+        page_stats = []
+        for page, enhance_name in zip(pages, page_enhance_names(doc, len(pages))):
+            page_timings = {}
+            page_stats.append(page_timings)
+            if isinstance(page, TextLayerPage):
+                page_results.append(page.results())
+                continue
+            enhanced, deskewed = enhance_image_for_ocr(page, enhance_name, profile=profile, timings=page_timings)
+            if enhanced is None:
+                page_results.append(None)
+                continue
+            if enhance_name:
+                enhanced_paths.append(enhanced)
+            fields = template_ocr_page(reader, deskewed, templates, page_timings,
+                                       doc.get('segmentation')) if templates else None
+            if fields is not None:
+                page_results.append(fields)
+                continue
+            page_crops, projected = page_line_crops(reader, enhanced, doc.get('segmentation'), page_timings)
+            if projected:
+                segmented[(doc['name'], len(page_results))] = enhanced
+            crops += page_crops
+            owners += [(doc['name'], len(page_results))] * len(page_crops)
+            page_results.append([])
+        preprocess = {}
+        for page_timings in page_stats:
+            add_stage_timings(preprocess, page_timings)
+        results[doc['name']] = {
+            'pages': page_results,
+            'image_paths': _page_paths(pages),
+            'enhanced_paths': enhanced_paths,
+            'page_stats': page_stats,
+            'timings': {
+                'rasterize': round(rasterized - doc_start, 3),
+                'enhance_detect': round(time.perf_counter() - rasterized, 3),
+                'preprocess': preprocess,
+            },
+        }
+
+    recognize_start = time.perf_counter()
+    if broker is not None:
+        recognized = broker.recognize(crops)
+    else:
+        recognized, _ = recognize_crops(reader, crops, batch_size) if crops else ([], 0)
+    for (name, page_idx), item in zip(owners, serialize_ocr_results(recognized)):
+        results[name]['pages'][page_idx].append(item)
+    recognize_seconds = time.perf_counter() - recognize_start
+    print(f"⏱️ 배치 인식 완료: 줄 {len(crops)}개, {recognize_seconds:.2f}s" + (" (브로커)" if broker is not None else ""))
+
+    for (name, page_idx), enhanced in segmented.items():
+        page = results[name]['pages'][page_idx]
+        page_timings = results[name]['page_stats'][page_idx]
+        if page and sum(item['confidence'] for item in page) / len(page) >= SEGMENT_MIN_CONFIDENCE:
+            results[name]['pages'][page_idx] = [item for item in page if item['text']]
+            page_timings['segment_pages'] = 1
+        else:
+            print("⚠️ 투영 분할 결과가 좋지 않아(low_confidence) CRAFT 검출로 다시 인식합니다.")
+            results[name]['pages'][page_idx] = serialize_ocr_results(reader.readtext(enhanced))
+            page_timings['segment_fallback_pages'] = 1
+
+    finished = time.perf_counter()
+    for doc in docs:
+        result = results[doc['name']]
+        result['pages'] = [page for page in result['pages'] if page is not None]
+        result['text'] = pages_to_text(result['pages'])
+        result['timings'].update({
+            'recognize': round(recognize_seconds, 3),
+            'lines': sum(1 for name, _ in owners if name == doc['name']),
+            'total': round(finished - started, 3),
+        })
+    return results
+
+def _document_bytes(doc):
+    """캐시 키 계산용 업로드 원본 바이트"""
+    if 'data' in doc:
+        return doc['data']
+    with open(doc['path'], 'rb') as f:
+        return f.read()
+
+def _effective_cascade(doc, execution_mode):
+    """실제로 적용되는 캐스케이드 설정 (batched 실행 방식에서는 적용하지 않음, 양식 템플릿과 맞지 않는 페이지에 적용)"""
+    if execution_mode == 'batched':
+        return None
+    return doc.get('cascade')
+
+def _document_cache_options(doc, execution_mode='sequential'):
+    """
+    OCR 결과에 영향을 주는 문서별 처리 설정 (캐시 키에 포함)
+    설정값 그대로가 아니라 실제로 적용된 파이프라인을 씁니다. batched 는 줄 단위 배치 인식이고 캐스케이드를 쓰지 않으므로
+    같은 설정이라도 페이지 단위(sequential/concurrent) 결과와 캐시를 나눕니다. (streaming 은 결과가 같아 키에 넣지 않음)
+    """
+    render = doc.get('render') or {}
+    cascade = _effective_cascade(doc, execution_mode) or {}
+    templates = doc.get('templates')
+    return (doc['is_pdf'], bool(doc.get('text_layer')), doc.get('preprocess_profile', 'quality'),
+            render.get('mode', 'color'), render.get('text_pt'), render.get('text_px'),
+            'batched' if execution_mode == 'batched' else 'page',
+            bool(cascade), cascade.get('min_confidence'), cascade.get('page_ratio'),
+            templates.version if templates else None, doc.get('segmentation') or 'craft')
+
+def ocr_documents(reader, docs, save_dir, poppler_path, execution_mode='sequential', max_workers=1,
+                  streaming=False, queue_size=2, cache=None, cache_options=(), batch_size=RECOG_BATCH_SIZE,
+                  broker=None):
+    """
+    /ocr 의 문서 OCR 진입점입니다.
+    cache 가 주어지면 래스터화 전에 업로드 내용 해시로 결과를 먼저 조회하고,
+    캐시에 없는 문서만 설정된 실행 방식(sequential/concurrent/batched)으로 처리한 뒤 결과를 저장합니다.
+    batched 는 ocr_documents_batched 로 모든 문서의 줄을 모아 한 번에 인식하며 streaming / cascade 설정은 쓰지 않습니다.
+    캐시 키에는 실행 방식에 따라 실제로 적용된 처리(_document_cache_options)가 들어가므로
+    캐스케이드를 적용한 결과와 적용하지 않은 결과가 서로의 요청에 쓰이지 않습니다.
+    broker 가 있으면 실행 방식과 관계없이 모든 인식 호출(readtext, CRAFT 대체, 캐스케이드 재인식, 양식 필드)을
+    BrokeredReader 로 요청 간 마이크로 배칭 브로커에 맡겨, 요청 스레드들이 공유 인식 모델을 동시에 호출하지 않습니다.
+    """
+    if broker is not None:
+        reader = BrokeredReader(reader, broker)
+    results = {}
+    cache_keys = {}
+    if cache:
+        for doc in docs:
+            cache_keys[doc['name']] = cache.make_key(_document_bytes(doc), *_document_cache_options(doc, execution_mode),
+                                                     *cache_options)
+            pages = cache.get(cache_keys[doc['name']])
+            if pages is not None:
+                print(f"⚡ '{doc['name']}' OCR 캐시 적중 ({len(pages)}페이지)")
+                results[doc['name']] = {
+                    'text': pages_to_text(pages),
+                    'pages': pages,
+                    'image_paths': [],
+                    'enhanced_paths': [],
+                    'page_stats': [],
+                    'timings': {'cache_hit': True},
+                }
+
+    pending = [doc for doc in docs if doc['name'] not in results]
+    if pending:
+        if execution_mode == 'concurrent':
+            results.update(ocr_documents_concurrently(reader, pending, save_dir, poppler_path, max_workers,
+                                                      streaming=streaming, queue_size=queue_size))
+        elif execution_mode == 'batched':
+            ignored = [name for name, used in (('streaming', streaming),
+                                               ('cascade', any(doc.get('cascade') for doc in pending))) if used]
+            if ignored:
+                print(f"⚠️ batched 실행 방식은 {', '.join(ignored)} 설정을 쓰지 않습니다. (캐시 키도 실제 적용된 처리 기준)")
+            results.update(ocr_documents_batched(reader, pending, save_dir, poppler_path, batch_size, broker))
+        else:
+            for doc in pending:
+                results[doc['name']] = ocr_document(reader, doc, save_dir, poppler_path,
+                                                    streaming=streaming, queue_size=queue_size)
+
+    if cache:
+        for doc in pending:
+            # 인식 결과가 없는 문서(실패)는 저장하지 않아 다음 요청에서 다시 시도합니다.
+            if results[doc['name']]['text']:
+                cache.put(cache_keys[doc['name']], results[doc['name']]['pages'])
+        print(f"📊 OCR 캐시 통계: {cache.stats()}")
+
+    return results
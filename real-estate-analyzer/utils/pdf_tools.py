@@ -0,0 +1,132 @@
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+_PNM_WHITESPACE = b' \t\r\n'
+DEFAULT_DPI = 200
+
+def poppler_command(name, poppler_path=None):
+    """poppler 실행 파일 경로를 반환합니다. poppler_path 폴더가 없으면 PATH 에서 찾습니다."""
+    if poppler_path and os.path.isdir(poppler_path):
+        return os.path.join(poppler_path, name)
+    return name
+
+def parse_pnm_stream(buffer):
+    """
+    pdftoppm 이 표준출력으로 내보낸 PPM(P6)/PGM(P5) 이미지들을 numpy 배열 목록으로 변환합니다.
+    컬러 페이지는 OpenCV 와 같은 BGR 순서로, 흑백 페이지는 2차원 배열로 반환합니다.
+    """
+    pages = []
+    offset = 0
+    while offset < len(buffer):
+        # 헤더: 매직넘버, 너비, 높이, 최댓값 (공백으로 구분)
+        fields = []
+        pos = offset
+        while len(fields) < 4:
+            while buffer[pos] in _PNM_WHITESPACE:
+                pos += 1
+            start = pos
+            while buffer[pos] not in _PNM_WHITESPACE:
+                pos += 1
+            fields.append(buffer[start:pos])
+        pos += 1  # 헤더 끝의 공백 한 글자
+
+        magic, width, height = fields[0], int(fields[1]), int(fields[2])
+        channels = 3 if magic == b'P6' else 1
+        size = width * height * channels
+        page = np.frombuffer(buffer, dtype=np.uint8, count=size, offset=pos)
+        if channels == 3:
+            page = cv2.cvtColor(page.reshape(height, width, 3), cv2.COLOR_RGB2BGR)
+        else:
+            page = page.reshape(height, width).copy()
+        pages.append(page)
+        offset = pos + size
+    return pages
+
+def _pdf_source_args(pdf):
+    """PDF 가 바이트면 표준입력('-')으로, 경로면 파일 인자로 넘기기 위한 (인자, 입력) 쌍"""
+    if isinstance(pdf, (bytes, bytearray)):
+        return '-', pdf
+    return pdf, None
+
+def pdf_info(pdf, poppler_path=None):
+    """pdfinfo 로 PDF(바이트 또는 경로)의 전체 페이지 수와 첫 페이지 크기((가로, 세로) pt)를 구합니다."""
+    source, stdin = _pdf_source_args(pdf)
+    completed = subprocess.run([poppler_command('pdfinfo', poppler_path), source],
+                               input=stdin, capture_output=True, check=True)
+    match = re.search(rb'^Pages:\s+(\d+)', completed.stdout, re.MULTILINE)
+    if not match:
+        raise ValueError("PDF 페이지 수를 확인할 수 없습니다.")
+    size = re.search(rb'^Page size:\s+([\d.]+) x ([\d.]+) pts', completed.stdout, re.MULTILINE)
+    return {
+        'pages': int(match.group(1)),
+        'page_size': (float(size.group(1)), float(size.group(2))) if size else None,
+    }
+
+def pdf_page_count(pdf, poppler_path=None):
+    """pdfinfo 로 PDF(바이트 또는 경로)의 전체 페이지 수를 구합니다."""
+    return pdf_info(pdf, poppler_path)['pages']
+
+def choose_render_dpi(page_size, text_pt=10.0, text_px=28, min_dpi=100, max_dpi=300, max_side=2560):
+    """
+    본문 글자(text_pt 포인트)가 약 text_px 픽셀 높이로 렌더링되는 DPI 를 고릅니다.
+    페이지의 긴 변이 max_side 픽셀(EasyOCR 검출기 canvas_size 기본값)을 넘으면 검출기가
+    어차피 축소하므로 그만큼 DPI 를 낮추고, 결과는 [min_dpi, max_dpi] 범위로 제한합니다.
+    """
+    dpi = text_px * 72.0 / text_pt
+    if page_size:
+        dpi = min(dpi, max_side * 72.0 / max(page_size))
+    return int(round(min(max(dpi, min_dpi), max_dpi)))
+
+def render_pdf_pages(pdf, poppler_path=None, dpi=DEFAULT_DPI, first_page=None, last_page=None, gray=False, thread_count=1):
+    """
+    PDF(바이트 또는 경로)를 pdftoppm 으로 렌더링해 페이지 이미지를 메모리에서 바로 받아옵니다.
+    바이트는 표준입력으로 넘기므로 pdf2image.convert_from_bytes 와 달리 임시 파일을 만들지 않고,
+    PNG 인코딩도 거치지 않습니다. first_page/last_page 로 일부 페이지만 렌더링할 수 있습니다.
+    gray 가 True 이면 흑백(PGM)으로 렌더링해 2차원 배열을 받고,
+    thread_count 가 2 이상이면 페이지 구간을 나눠 pdftoppm 프로세스 여러 개로 동시에 렌더링합니다.
+    """
+    if thread_count > 1:
+        first = first_page or 1
+        last = last_page or pdf_page_count(pdf, poppler_path)
+        count = last - first + 1
+        if count > 1:
+            chunk = -(-count // min(thread_count, count))
+            ranges = [(start, min(start + chunk - 1, last)) for start in range(first, last + 1, chunk)]
+            with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix='pdftoppm') as executor:
+                parts = executor.map(lambda r: render_pdf_pages(pdf, poppler_path, dpi, r[0], r[1], gray), ranges)
+                return [page for part in parts for page in part]
+
+    source, stdin = _pdf_source_args(pdf)
+    command = [poppler_command('pdftoppm', poppler_path), '-r', str(dpi)]
+    if gray:
+        command.append('-gray')
+    if first_page is not None:
+        command.extend(['-f', str(first_page)])
+    if last_page is not None:
+        command.extend(['-l', str(last_page)])
+    command.append(source)
+    completed = subprocess.run(command, input=stdin, capture_output=True, check=True)
+    return parse_pnm_stream(completed.stdout)
+
+def extract_pdf_text(pdf, poppler_path=None):
+    """
+    pdftotext 로 PDF(바이트 또는 경로)에 포함된 텍스트 레이어를 페이지별 문자열 목록으로 추출합니다.
+    스캔본처럼 텍스트 레이어가 없는 페이지는 빈 문자열이 됩니다.
+    """
+    source, stdin = _pdf_source_args(pdf)
+    completed = subprocess.run([poppler_command('pdftotext', poppler_path), '-enc', 'UTF-8', source, '-'],
+                               input=stdin, capture_output=True, check=True)
+    # 각 페이지 끝에 form feed(\f)가 붙으므로 마지막 빈 조각은 버립니다.
+    text = completed.stdout.decode('utf-8', errors='replace')
+    pages = text.split('\f')
+    if text.endswith('\f'):
+        pages.pop()
+    return pages
+
+def decode_image_bytes(data):
+    """업로드된 이미지 바이트를 BGR numpy 배열로 디코딩합니다."""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
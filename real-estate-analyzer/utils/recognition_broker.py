@@ -0,0 +1,122 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from easyocr.utils import reformat_input # type: ignore
+
+from utils.batch_recognition import line_crops, recognize_crops, RECOG_BATCH_SIZE
+
+class RecognitionBroker:
+    """
+    여러 요청이 함께 쓰는 인식 모델 마이크로 배칭 브로커
+    요청 스레드는 recognize(crops) 로 줄 이미지 묶음을 넘기고 결과를 기다립니다.
+    브로커 스레드 하나가 인식 모델을 전담해, 첫 묶음이 도착한 뒤 window_ms 동안(또는 줄 수가 max_lines 에 이를 때까지)
+    들어온 다른 요청의 묶음을 합쳐 recognize_crops 한 번으로 실행하고 결과를 요청별로 나눠 돌려줍니다.
+    줄 이미지는 패딩 폭이 같은 것끼리만 한 배치가 되므로 합쳐도 요청별 입력 텐서는 바뀌지 않습니다.
+    """
+
+    def __init__(self, reader, window_ms=10, max_lines=256, batch_size=RECOG_BATCH_SIZE, name='recognizer'):
+        self.reader = reader
+        self.window = window_ms / 1000.0
+        self.max_lines = max_lines
+        self.batch_size = batch_size
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stats = {'rounds': 0, 'requests': 0, 'lines': 0, 'max_requests_per_round': 0}
+
+    def _ensure_worker(self):
+        """첫 요청이 들어올 때 브로커 스레드를 시작합니다. (lock 보유 상태에서 호출)"""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name=f"{self.name}-broker", daemon=True)
+            self._worker.start()
+
+    def recognize(self, crops):
+        """
+        줄 이미지 목록(batch_recognition.line_crops 형식)을 인식해 같은 순서의 (박스, 텍스트, 신뢰도) 목록을 반환합니다.
+        다른 요청의 줄과 합쳐 실행될 수 있으며, 인식 중 오류가 나면 같은 회차의 모든 요청에 예외가 전달됩니다.
+        """
+        if not crops:
+            return []
+        future = Future()
+        with self._lock:
+            self._ensure_worker()
+        self._queue.put((crops, future))
+        return future.result()
+
+    def _collect(self):
+        """첫 묶음을 기다린 뒤, 대기 시간 창 안에 들어온 묶음을 줄 수 한도까지 모읍니다."""
+        pending = [self._queue.get()]
+        line_count = len(pending[0][0])
+        deadline = time.perf_counter() + self.window
+        while line_count < self.max_lines:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            line_count += len(item[0])
+        return pending
+
+    def stats(self):
+        """지금까지의 실행 회차, 요청 수, 줄 수와 회차당 평균 요청 수"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['requests_per_round'] = round(stats['requests'] / stats['rounds'], 2) if stats['rounds'] else 0
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            crops = [crop for request_crops, _ in pending for crop in request_crops]
+            try:
+                results, _ = recognize_crops(self.reader, crops, self.batch_size)
+            except Exception as e:
+                print(f"🚨 인식 브로커 실행 실패 (요청 {len(pending)}건): {e}")
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for request_crops, future in pending:
+                future.set_result(results[offset:offset + len(request_crops)])
+                offset += len(request_crops)
+            with self._lock:
+                self._stats['rounds'] += 1
+                self._stats['requests'] += len(pending)
+                self._stats['lines'] += len(crops)
+                self._stats['max_requests_per_round'] = max(self._stats['max_requests_per_round'], len(pending))
+
+class BrokeredReader:
+    """
+    브로커가 켜져 있을 때 파이프라인에 reader 대신 넘기는 래퍼
+    검출(detect)은 원래 reader 로 하고, 인식은 readtext 의 인식 단계까지 모두 줄 이미지로 만들어 브로커에 맡깁니다.
+    그래서 readtext_page / CRAFT 대체 / 캐스케이드 재인식 / 양식 필드 인식도 브로커 스레드에서만 인식 모델을 호출합니다.
+    기본 인자로 호출한 reader.readtext / reader.recognize 와 같은 (박스, 텍스트, 신뢰도) 목록을 반환합니다.
+    """
+
+    def __init__(self, reader, broker):
+        self.reader = reader
+        self.broker = broker
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+    def recognize(self, image, horizontal_list=None, free_list=None):
+        """박스 목록이 모두 없으면 이미지 전체를 한 줄로 인식합니다. (reader.recognize 와 같음)"""
+        _, img_cv_grey = reformat_input(image)
+        if horizontal_list is None and free_list is None:
+            height, width = img_cv_grey.shape[:2]
+            horizontal_list, free_list = [[0, width, 0, height]], []
+        return self.broker.recognize(line_crops(img_cv_grey, horizontal_list or [], free_list or []))
+
+    def readtext(self, image):
+        img, img_cv_grey = reformat_input(image)
+        horizontal_list, free_list = self.reader.detect(img, reformat=False)
+        return self.broker.recognize(line_crops(img_cv_grey, horizontal_list[0], free_list[0]))